@@ -0,0 +1,354 @@
+import datetime as dt
+import functools
+import logging
+
+import numpy as np
+
+from . import constants, genhelpers, timeline
+from utils import strings
+
+logger = logging.getLogger(__name__)
+
+"""
+Vectorised CPF projection engine that advances many members at once.
+
+Each member profile occupies one element of the input arrays, and every simulated month is
+evaluated with array operations across all members. The month-by-month logic mirrors
+`cpfhelpers._calc_monthly_change` so that results match the scalar engine to the cent.
+"""
+
+###############################################################################
+#                                  RATE TABLES                                #
+###############################################################################
+
+@functools.lru_cache(maxsize=None)
+def _compile_cont_rates(rate_set: timeline.RateSet) -> dict:
+    """Compiles the contribution rates of a rate set into arrays indexed by contribution age bracket."""
+
+    rates = rate_set.coefficients_cont
+
+    return {
+        'thresholds': np.array(rate_set.age_thresholds_cont),
+        'tw_combined': np.array([r[1][constants.ENTITY_COMBINED] for r in rates]),
+        'tw_employee': np.array([r[1][constants.ENTITY_EMPLOYEE] for r in rates]),
+        'tw_misc_combined': np.array([r[2][constants.ENTITY_COMBINED] for r in rates]),
+        'tw_misc_employee': np.array([r[2][constants.ENTITY_EMPLOYEE] for r in rates]),
+        'tw_misc': np.array([r[2][constants.ENTITY_MISC] for r in rates]),
+        'ow_combined': np.array([r[3][constants.ENTITY_COMBINED] for r in rates]),
+        'ow_employee': np.array([r[3][constants.ENTITY_EMPLOYEE] for r in rates]),
+    }
+
+@functools.lru_cache(maxsize=None)
+def _compile_alloc_rates(rate_set: timeline.RateSet) -> dict:
+    """Compiles the allocation rates of a rate set into arrays indexed by allocation age bracket."""
+
+    rates = rate_set.coefficients_alloc
+
+    return {
+        'thresholds': np.array(rate_set.age_thresholds_alloc),
+        'sa_ratio': np.array([r[constants.ACCOUNT_INDEXES[strings.SA]] for r in rates]),
+        'ma_ratio': np.array([r[constants.ACCOUNT_INDEXES[strings.MA]] for r in rates]),
+    }
+
+###############################################################################
+#                                 ARRAY HELPERS                               #
+###############################################################################
+
+def _get_age_bracket_index(age: np.ndarray,
+                           thresholds: np.ndarray) -> np.ndarray:
+    """Vectorised equivalent of `genhelpers._get_age_bracket_index`.
+
+    Args:
+        age (ndarray): Ages of the members
+        thresholds (ndarray): Upper age limits of each bracket in ascending order
+    """
+
+    return np.minimum(np.searchsorted(thresholds, age, side='left'), len(thresholds) - 1)
+
+def _to_cents(n: np.ndarray) -> np.ndarray:
+    """Vectorised equivalent of `genhelpers._to_cents`, converting amounts into integer cents.
+
+    Args:
+        n (ndarray): input amounts in dollars
+    """
+
+    return np.floor(np.round(n * 100, 6) + 0.5).astype(np.int64)
+
+def _div_round_half_up(numerator: np.ndarray,
+                       denominator: int) -> np.ndarray:
+    """Vectorised equivalent of `genhelpers._div_round_half_up`."""
+
+    return (2 * numerator + denominator) // (2 * denominator)
+
+def _get_monthly_contribution_cents(salary: np.ndarray,
+                                    bonus: np.ndarray,
+                                    bracket: np.ndarray,
+                                    rates_cont: dict,
+                                    entity: str = strings.COMBINED) -> np.ndarray:
+    """Vectorised equivalent of `cpfhelpers._get_monthly_contribution_cents`.
+
+    Args:
+        salary (ndarray): Monthly salaries of the members
+        bonus (ndarray): Bonuses in the month represented as a multiplier of monthly salary
+        bracket (ndarray): Contribution age bracket indexes of the members
+        rates_cont (dict): Contribution rates in force in the month (see `_compile_cont_rates`)
+        entity (str): Either "combined" or "employee"
+    """
+
+    amount_ow = _to_cents(salary)
+    amount_aw = _to_cents(bonus * salary)
+    amount_tw = amount_ow + amount_aw
+
+    cont_tw = _div_round_half_up(rates_cont[f'tw_{entity}'][bracket] * amount_tw, constants.RATE_SCALE)
+    cont_tw_misc = _div_round_half_up(
+        rates_cont[f'tw_misc_{entity}'][bracket] * amount_tw
+            + rates_cont['tw_misc'][bracket] * (amount_tw - constants.INCOME_BRACKET_2 * 100),
+        constants.RATE_SCALE)
+
+    amount_ow_eligible_for_cpf = np.minimum(amount_ow, constants.CEILING_OW * 100)
+    ceiling_aw = constants.CEILING_AW * 100 - (amount_ow_eligible_for_cpf * 12)
+    amount_aw_eligible_for_cpf = np.where(amount_aw > 0, np.minimum(amount_aw, ceiling_aw), 0)
+    rate_ow = rates_cont[f'ow_{entity}'][bracket]
+    cont_ow_aw = rate_ow * amount_ow_eligible_for_cpf + rate_ow * amount_aw_eligible_for_cpf
+    if entity == strings.COMBINED:
+        cont_ow_aw = _div_round_half_up(cont_ow_aw, constants.RATE_SCALE * 100) * 100
+    else:
+        cont_ow_aw = cont_ow_aw // (constants.RATE_SCALE * 100) * 100
+
+    return np.select(
+        [amount_ow <= constants.INCOME_THRESHOLDS[0],
+         amount_ow <= constants.INCOME_THRESHOLDS[1],
+         amount_ow <= constants.INCOME_THRESHOLDS[2]],
+        [0, cont_tw, cont_tw_misc],
+        default=cont_ow_aw)
+
+def _calc_monthly_interest(oa: np.ndarray,
+                           sa: np.ndarray,
+                           ma: np.ndarray,
+                           int_rate_oa: np.ndarray = constants.INT_RATE_OA,
+                           int_rate_sa: np.ndarray = constants.INT_RATE_SA,
+                           int_rate_ma: np.ndarray = constants.INT_RATE_MA,
+                           int_extra: float = constants.INT_EXTRA) -> tuple:
+    """Vectorised equivalent of the `cpfhelpers._calc_monthly_interest_*` methods.
+
+    Extra 1% interest is earned on the first $60k of combined balance, with up to $20k coming
+    from OA; extra interest earned on OA is credited to SA.
+
+    Args:
+        oa (ndarray): Current amounts in OA
+        sa (ndarray): Current amounts in SA
+        ma (ndarray): Current amounts in MA
+        int_rate_oa (ndarray): Annual interest rates of the OA; defaults to `constants.INT_RATE_OA`
+        int_rate_sa (ndarray): Annual interest rates of the SA; defaults to `constants.INT_RATE_SA`
+        int_rate_ma (ndarray): Annual interest rates of the MA; defaults to `constants.INT_RATE_MA`
+        int_extra (float): Extra annual interest rate; defaults to `constants.INT_EXTRA`
+
+    Returns a tuple containing the interest for the month in the OA, SA and MA.
+    """
+
+    oa_interest = oa * (int_rate_oa / 12)
+
+    oa_eligible_for_extra_int = np.minimum(oa, constants.THRESHOLD_EXTRAINT_OA)
+    rem_amount_for_extra_int_sa_ma = constants.THRESHOLD_EXTRAINT_TOTAL - oa_eligible_for_extra_int
+    sa_interest = oa_eligible_for_extra_int * (int_extra / 12) + np.where(
+        sa > rem_amount_for_extra_int_sa_ma,
+        rem_amount_for_extra_int_sa_ma * ((int_rate_sa + int_extra) / 12)
+            + (sa - rem_amount_for_extra_int_sa_ma) * (int_rate_sa / 12),
+        sa * ((int_rate_sa + int_extra) / 12))
+
+    rem_amount_for_extra_int_ma = np.maximum(rem_amount_for_extra_int_sa_ma - sa, 0)
+    ma_interest = np.where(
+        ma > rem_amount_for_extra_int_ma,
+        rem_amount_for_extra_int_ma * ((int_rate_ma + int_extra) / 12)
+            + (ma - rem_amount_for_extra_int_ma) * (int_rate_ma / 12),
+        ma * ((int_rate_ma + int_extra) / 12))
+
+    return oa_interest, sa_interest, ma_interest
+
+###############################################################################
+#                                  MAIN METHOD                                #
+###############################################################################
+
+def _apply_ma_cap(oa: np.ndarray,
+                  sa: np.ndarray,
+                  ma: np.ndarray,
+                  age: np.ndarray,
+                  bhs: int):
+    """Vectorised equivalent of `cpfhelpers._apply_ma_cap`, which caps the MA at the BHS and moves
+    the overflow into the SA (below 55, up to the Full Retirement Sum) and then the OA.
+
+    Args:
+        oa (ndarray): Current amounts in OA; updated in place
+        sa (ndarray): Current amounts in SA; updated in place
+        ma (ndarray): Current amounts in MA; updated in place
+        age (ndarray): Ages of the members
+        bhs (int): Basic Healthcare Sum in force
+    """
+
+    ma_overflow = np.maximum(ma - bhs, 0)
+    sa_overflow = (np.minimum(ma_overflow, np.maximum(constants.RETIREMENT_SUM_FULL - sa, 0))
+                   * (age < constants.AGE_RA_CREATION))
+    ma -= ma_overflow
+    sa += sa_overflow
+    oa += ma_overflow - sa_overflow
+
+def calc_cpf_projection_batch(salary: np.ndarray,
+                              bonus: np.ndarray,
+                              yoy_increase_salary: np.ndarray,
+                              dob: list,
+                              base_oa: np.ndarray,
+                              base_sa: np.ndarray,
+                              base_ma: np.ndarray,
+                              n_years: int,
+                              bonus_month: int = 12,
+                              proj_start_date: dt = None,
+                              ma_cap: bool = False) -> dict:
+    """Calculates the projected CPF account balances of many members at once.
+
+    Equivalent to calling `main.calc_cpf_projection` once per member without any account deltas.
+    All members are projected over the same period.
+
+    Args:
+        salary (ndarray): Annual salaries of the members
+        bonus (ndarray): Bonuses represented as a multiplier of monthly salary
+        yoy_increase_salary (ndarray): Projected year-on-year percentage increases in salary
+        dob (list): Dates of birth of the members in YYYYMM format
+        base_oa (ndarray): Current amounts in OA
+        base_sa (ndarray): Current amounts in SA
+        base_ma (ndarray): Current amounts in MA
+        n_years (int): Number of years into the future to project
+        bonus_month (int): Month where bonus is received (1-12)
+        proj_start_date (date): Starting date of projection; defaults to today
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum
+
+    Returns a dict of arrays with shape (`n_years`, number of members), where row i holds the values
+    at the end of year i + 1:
+        - `age`: Age of the members in the last month of the year
+        - `salary`: Projected annual salary in the year
+        - `oa`, `sa`, `ma`: Account balances at the end of the year
+        - `oa_interest`, `sa_interest`, `ma_interest`: Interest earned in the year
+    """
+
+    salary = np.asarray(salary, dtype=float)
+    bonus = np.broadcast_to(np.asarray(bonus, dtype=float), salary.shape)
+    yoy_increase_salary = np.broadcast_to(np.asarray(yoy_increase_salary, dtype=float), salary.shape)
+    logger.info(f'calc_cpf_projection_batch() - {len(salary)} members over {n_years} years')
+
+    salary_paths = np.array([salary * np.power(1 + yoy_increase_salary, i) for i in range(n_years)])
+    bonus_paths = np.broadcast_to(bonus, salary_paths.shape)
+
+    return _project_paths(salary_paths, bonus_paths, dob, base_oa, base_sa, base_ma,
+                          bonus_month=bonus_month, proj_start_date=proj_start_date, ma_cap=ma_cap)
+
+def _project_paths(salary_paths: np.ndarray,
+                   bonus_paths: np.ndarray,
+                   dob: list,
+                   base_oa: np.ndarray,
+                   base_sa: np.ndarray,
+                   base_ma: np.ndarray,
+                   bonus_month: int = 12,
+                   proj_start_date: dt = None,
+                   int_rate_paths: tuple = None,
+                   deltas_index: genhelpers.AccountDeltaIndex = None,
+                   ma_cap: bool = False) -> dict:
+    """Projects the CPF account balances of many members along given paths of yearly inputs.
+
+    Args:
+        salary_paths (ndarray): Annual salaries of the members in each year, with shape (n_years, N)
+        bonus_paths (ndarray): Bonuses of the members in each year, with shape (n_years, N)
+        dob (list): Dates of birth of the members in YYYYMM format
+        base_oa (ndarray): Current amounts in OA
+        base_sa (ndarray): Current amounts in SA
+        base_ma (ndarray): Current amounts in MA
+        bonus_month (int): Month where bonus is received (1-12)
+        proj_start_date (date): Starting date of projection; defaults to today
+        int_rate_paths (tuple): Annual interest rates of the OA, SA and MA in each year, each with
+            shape (n_years, N); defaults to the rates in force in each month (see `timeline`)
+        deltas_index (AccountDeltaIndex): Index of the account deltas by month, applied to every member
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum
+
+    Returns a dict of arrays in the same format as `calc_cpf_projection_batch`.
+    """
+
+    n_years, n_members = salary_paths.shape
+    oa = np.broadcast_to(np.asarray(base_oa, dtype=float), (n_members,)).copy()
+    sa = np.broadcast_to(np.asarray(base_sa, dtype=float), (n_members,)).copy()
+    ma = np.broadcast_to(np.asarray(base_ma, dtype=float), (n_members,)).copy()
+
+    dob = np.array([int(e) for e in dob])
+    birth_year, birth_month = dob // 100, dob % 100
+
+    if proj_start_date is None:
+        proj_start_date = dt.date.today()
+
+    keys = [strings.AGE, strings.PARAM_SALARY,
+            strings.OA, strings.SA, strings.MA,
+            strings.OA_INTEREST, strings.SA_INTEREST, strings.MA_INTEREST]
+    results = {key: np.empty((n_years, n_members)) for key in keys}
+    no_bonus = np.zeros(n_members)
+    # rates in force in every month of the projection
+    month_index_start = genhelpers._get_month_index(proj_start_date.year, proj_start_date.month)
+    rate_sets = timeline.TIMELINE.build_schedule(month_index_start, n_years * 12 - month_index_start % 12)
+
+    for i in range(n_years):
+        year = proj_start_date.year + i
+        month_start = proj_start_date.month if i == 0 else 1
+        salary_proj, bonus = salary_paths[i], bonus_paths[i]
+        oa_interest_total, sa_interest_total, ma_interest_total = 0, 0, 0
+
+        for month in range(month_start, 13):
+            rate_set = rate_sets[genhelpers._get_month_index(year, month) - month_index_start]
+            rates_cont, rates_alloc = _compile_cont_rates(rate_set), _compile_alloc_rates(rate_set)
+            if int_rate_paths is not None:
+                int_rates = tuple(e[i] for e in int_rate_paths)
+            else:
+                int_rates = (rate_set.int_rate_oa, rate_set.int_rate_sa, rate_set.int_rate_ma)
+
+            month_diff = month - birth_month
+            age = (year - birth_year) + (month_diff > 0)
+            bracket_cont = _get_age_bracket_index(age, rates_cont['thresholds'])
+            bracket_alloc = _get_age_bracket_index(age, rates_alloc['thresholds'])
+
+            # add allocated amounts in this month to the accounts
+            bonus_in_month = bonus if month == bonus_month else no_bonus
+            cont_monthly = _get_monthly_contribution_cents(salary_proj / 12, bonus_in_month, bracket_cont, rates_cont)
+            sa_alloc = rates_alloc['sa_ratio'][bracket_alloc] * cont_monthly // constants.RATE_SCALE
+            ma_alloc = rates_alloc['ma_ratio'][bracket_alloc] * cont_monthly // constants.RATE_SCALE
+            oa_alloc = cont_monthly - sa_alloc - ma_alloc
+
+            oa += oa_alloc / 100
+            sa += sa_alloc / 100
+            ma += ma_alloc / 100
+
+            # add any topups/withdrawals in this month, if applicable
+            deltas = None if deltas_index is None else deltas_index.get(genhelpers._get_month_index(year, month))
+            if deltas is not None:
+                oa += deltas[0]
+                sa += deltas[1]
+                ma += deltas[2]
+
+            if ma_cap:
+                _apply_ma_cap(oa, sa, ma, age, rate_set.bhs)
+
+            oa_interest, sa_interest, ma_interest = _calc_monthly_interest(oa, sa, ma, *int_rates, rate_set.int_extra)
+            oa_interest_total += oa_interest
+            sa_interest_total += sa_interest
+            ma_interest_total += ma_interest
+
+        # interest added at the end of the year
+        oa += oa_interest_total
+        sa += sa_interest_total
+        ma += ma_interest_total
+        if ma_cap:
+            _apply_ma_cap(oa, sa, ma, age, rate_set.bhs)
+
+        results[strings.AGE][i] = age
+        results[strings.PARAM_SALARY][i] = salary_proj
+        results[strings.OA][i] = oa
+        results[strings.SA][i] = sa
+        results[strings.MA][i] = ma
+        results[strings.OA_INTEREST][i] = oa_interest_total
+        results[strings.SA_INTEREST][i] = sa_interest_total
+        results[strings.MA_INTEREST][i] = ma_interest_total
+
+    return results
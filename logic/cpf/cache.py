@@ -0,0 +1,93 @@
+import collections
+import logging
+from typing import Any, Hashable
+
+from utils import config, strings
+
+logger = logging.getLogger(__name__)
+
+"""
+Caches that are kept at module level, so that they persist across invocations of a warm Lambda container.
+"""
+
+class LRUCache(object):
+    """Least-recently-used cache with hit, miss and eviction counters.
+
+    Attributes:
+        maxsize (int): Maximum number of entries; the cache is disabled if 0
+        hits (int): Number of lookups that found an entry
+        misses (int): Number of lookups that did not find an entry
+        evictions (int): Number of entries dropped to make room for new ones
+    """
+
+    __slots__ = ('maxsize', 'hits', 'misses', 'evictions', '_entries')
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits, self.misses, self.evictions = 0, 0, 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """Returns the entry for the given key and marks it as recently used, or None if there is none."""
+
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """Adds an entry, evicting the least recently used entry if the cache is full."""
+
+        if self.maxsize <= 0:
+            return
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drops all entries and resets the counters."""
+
+        self._entries.clear()
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def stats(self) -> dict:
+        """Returns the counters of the cache.
+
+        Returns a dict:
+            - `hits`, `misses`, `evictions`: Counters since the cache was created or cleared
+            - `size`: Current number of entries
+            - `maxsize`: Maximum number of entries
+        """
+
+        return {
+            strings.HITS: self.hits,
+            strings.MISSES: self.misses,
+            strings.EVICTIONS: self.evictions,
+            strings.SIZE: len(self._entries),
+            strings.MAXSIZE: self.maxsize,
+        }
+
+# monthly allocations into the OA, SA and MA in cents, keyed by the wages in cents, the age
+# brackets and the contribution and allocation rates (see `cpfhelpers._get_allocation_amounts`)
+ALLOCATION_CACHE = LRUCache(config.ALLOCATION_CACHE_SIZE)
+
+def get_cache_stats() -> dict:
+    """Returns the counters of the caches of this Lambda container.
+
+    Returns a dict:
+        - `allocation`: Counters of the allocation cache (see `LRUCache.stats`)
+    """
+
+    return {
+        strings.ALLOCATION: ALLOCATION_CACHE.stats(),
+    }
@@ -17,6 +17,33 @@ INT_EXTRA = 0.01
 THRESHOLD_EXTRAINT_OA = 20000
 THRESHOLD_EXTRAINT_TOTAL = 60000
 
+# Retirement
+# the RA is created in the month of the 55th birthday, and paid out from the payout eligibility
+# age in level monthly payouts until the 95th birthday
+AGE_RA_CREATION = 55
+AGE_PAYOUT_START = 65
+AGE_PAYOUT_END = 95
+# statutory minimum retirement age, after which no more wages are assumed
+AGE_RETIREMENT = 62
+# Full Retirement Sum of members turning 55 in 2016
+RETIREMENT_SUM_FULL = 161000
+
+# MediSave
+# Basic Healthcare Sum in force from January of each year; when the MA is capped, balances above
+# it overflow into the SA (below 55, up to the Full Retirement Sum) and then the OA
+bhs = {
+    2016: 49800,
+    2017: 52000,
+    2018: 54500,
+    2019: 57200,
+    2020: 60000,
+    2021: 63000,
+    2022: 66000,
+    2023: 68500,
+    2024: 71500,
+    2025: 75500,
+}
+
 # CPF contribution rates
 rates_cont = {
     '55': [
@@ -104,3 +131,60 @@ rates_alloc = {
         'ma_ratio': 0.84,
     },
 }
+
+# Rate timeline
+# effective-dated rate sets in ascending order of the month (YYYYMM) from which they apply, each
+# applying until the next one takes effect; months before the first entry use the first entry
+# the tables above are the rates currently in force, which are the last entry; there is one entry
+# per year of the BHS
+rates_timeline = [
+    {
+        'effective': f'{year}01',
+        'rates_cont': rates_cont,
+        'rates_alloc': rates_alloc,
+        'int_rate_oa': INT_RATE_OA,
+        'int_rate_sa': INT_RATE_SA,
+        'int_rate_ma': INT_RATE_MA,
+        'int_rate_ra': INT_RATE_RA,
+        'int_extra': INT_EXTRA,
+        'bhs': bhs_year,
+    }
+    for year, bhs_year in sorted(bhs.items())
+]
+
+# Compiled rate tables
+# built once at import from the tables above, so that a bracket is found by bisecting a sorted
+# array of upper limits and a rate by indexing flat coefficient tuples
+# rates are held as integers in units of 1/RATE_SCALE, so that amounts in cents are exact
+RATE_SCALE = 10000
+ENTITY_COMBINED = 0
+ENTITY_EMPLOYEE = 1
+ENTITY_MISC = 2
+ENTITY_INDEXES = { 'combined': ENTITY_COMBINED, 'employee': ENTITY_EMPLOYEE, 'misc': ENTITY_MISC }
+ACCOUNT_INDEXES = { 'oa': 0, 'sa': 1, 'ma': 2 }
+
+# upper limits of the income brackets in cents, the last bracket being unbounded
+INCOME_THRESHOLDS = (INCOME_BRACKET_1 * 100, INCOME_BRACKET_2 * 100, INCOME_BRACKET_3 * 100)
+
+def _compile_rates_cont(rates: dict) -> tuple:
+    """Compiles a table in the format of `rates_cont` into [age bracket][income bracket] -> (combined, employee, misc) rates."""
+
+    return tuple(
+        tuple(tuple(round(e.get(entity, 0) * RATE_SCALE) for entity in ENTITY_INDEXES) for e in rates[key])
+        for key in sorted(rates, key=int))
+
+def _compile_rates_alloc(rates: dict) -> tuple:
+    """Compiles a table in the format of `rates_alloc` into [age bracket] -> (oa, sa, ma) ratios of the contribution amount."""
+
+    return tuple(
+        tuple(round(rates[key][f'{account}_ratio'] * RATE_SCALE) for account in ACCOUNT_INDEXES)
+        for key in sorted(rates, key=int))
+
+# upper limits of the age brackets and the corresponding keys in `rates_cont`/`rates_alloc`
+AGE_KEYS_CONT = tuple(sorted(rates_cont, key=int))
+AGE_KEYS_ALLOC = tuple(sorted(rates_alloc, key=int))
+AGE_THRESHOLDS_CONT = tuple(int(key) for key in AGE_KEYS_CONT)
+AGE_THRESHOLDS_ALLOC = tuple(int(key) for key in AGE_KEYS_ALLOC)
+
+COEFFICIENTS_CONT = _compile_rates_cont(rates_cont)
+COEFFICIENTS_ALLOC = _compile_rates_alloc(rates_alloc)
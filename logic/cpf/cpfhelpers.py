@@ -1,8 +1,11 @@
 import datetime as dt
+import decimal
+import functools
 import logging
-import math
+from typing import Callable, Iterator, Tuple
 
-from . import constants, genhelpers, main
+from . import cache, constants, genhelpers, tables, timeline
+from .state import ProjectionState
 from utils import strings
 
 logger = logging.getLogger(__name__)
@@ -18,60 +21,258 @@ Stores all CPF module helper methods that contain some element of CPF-related lo
 def _get_monthly_contribution_amount(salary: float,
                                      bonus: float,
                                      age: int,
-                                     entity: str) -> float:
+                                     entity: str,
+                                     age_bracket: int = None,
+                                     rates: timeline.RateSet = None) -> float:
     """Gets the monthly CPF contribution amount for the specified entity corresponding to the 
     correct age and income bracket.
 
-    OW Ceiling: $6k a month. \\
-    AW Ceiling: $102k - OW amount subject to CPF in the year.
+    Computed in cents by `_get_monthly_contribution_cents`.
 
     Args:
         salary (float): Monthly salary of employee
         bonus (float): Bonus represented as a multiplier of monthly salary
         age (int): Age of employee
         entity (str): Either "combined" or "employee"
+        age_bracket (int): Contribution age bracket index of employee, if already known
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
     
     Returns the CPF contribution amount for the month.
     """
+
+    return _get_monthly_contribution_cents(salary, bonus, age, entity, age_bracket, rates) / 100
+
+def _get_monthly_contribution_cents(salary: float,
+                                    bonus: float,
+                                    age: int,
+                                    entity: str,
+                                    age_bracket: int = None,
+                                    rates: timeline.RateSet = None) -> int:
+    """Gets the monthly CPF contribution amount in cents for the specified entity corresponding to
+    the correct age and income bracket.
+
+    OW Ceiling: $6k a month. \\
+    AW Ceiling: $102k - OW amount subject to CPF in the year, where the salary is assumed to be
+    the same in every month of the year.
+
+    The wages are rounded to the cent before the rates are applied, as they are paid in cents; the
+    monthly salary of a projection that grows year on year is generally not a whole number of cents.
+
+    Args:
+        salary (float): Monthly salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        age (int): Age of employee
+        entity (str): Either "combined" or "employee"
+        age_bracket (int): Contribution age bracket index of employee, if already known
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
+    
+    Returns the CPF contribution amount for the month in cents.
+    """
     
-    logger.info(f'_get_monthly_contribution_amount() - salary {round(salary, 2)}; bonus {round(bonus, 2)}')
+    logger.debug('_get_monthly_contribution_amount() - salary %.2f; bonus %.2f', salary, bonus)
 
-    age_bracket = genhelpers._get_age_bracket(age, strings.CONTRIBUTION)
-    rates = constants.rates_cont
-    amount_tw = salary + (bonus * salary) # only needed if income is in income brackets 2 or 3
+    if age_bracket is None:
+        age_bracket = genhelpers._get_age_bracket_index(age, strings.CONTRIBUTION, rates)
+    amount_ow = genhelpers._to_cents(salary)
 
-    if salary <= constants.INCOME_BRACKET_1:
+    return _get_contribution_cents_for_wages(
+        amount_ow,
+        genhelpers._to_cents(bonus * salary),
+        _get_ceiling_aw_cents(amount_ow),
+        age_bracket,
+        constants.ENTITY_INDEXES[entity],
+        rates)
+
+def _get_ceiling_aw_cents(amount_ow: int) -> int:
+    """Gets the AW Ceiling in cents, where the salary is assumed to be the same in every month of the year.
+
+    Args:
+        amount_ow (int): Ordinary wages paid in a month in cents
+    """
+
+    return constants.CEILING_AW * 100 - (min(amount_ow, constants.CEILING_OW * 100) * 12)
+
+def _get_contribution_amount_for_wages(amount_ow: float,
+                                       amount_aw: float,
+                                       ceiling_aw: float,
+                                       age_bracket: int,
+                                       entity: int,
+                                       rates: timeline.RateSet = None) -> float:
+    """Gets the CPF contribution amount in a month for the specified entity, given the wages paid
+    in the month and the AW Ceiling remaining.
+
+    Computed in cents by `_get_contribution_cents_for_wages`.
+
+    Args:
+        amount_ow (float): Ordinary wages paid in the month
+        amount_aw (float): Additional wages paid in the month
+        ceiling_aw (float): Amount of AW that is still subject to CPF in the year
+        age_bracket (int): Contribution age bracket index of employee
+        entity (int): Either `constants.ENTITY_COMBINED` or `constants.ENTITY_EMPLOYEE`
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
+
+    Returns the CPF contribution amount for the month.
+    """
+
+    cont = _get_contribution_cents_for_wages(
+        genhelpers._to_cents(amount_ow),
+        genhelpers._to_cents(amount_aw),
+        genhelpers._to_cents(ceiling_aw),
+        age_bracket,
+        entity,
+        rates)
+
+    return cont / 100
+
+def _use_lookup_table(rates: timeline.RateSet) -> bool:
+    """Returns whether the precomputed lookup tables apply to the given rates (see `tables.LOOKUP_TABLE`),
+    which is the case for every rate set with the same contribution and allocation rates as the current ones.
+
+    Args:
+        rates (RateSet): Rates in force in the month; None for the rates in `constants`
+    """
+
+    return tables.LOOKUP_TABLE is not None and (rates is None or rates.rates_key == timeline.RATES_LATEST.rates_key)
+
+def _get_contribution_cents_for_wages(amount_ow: int,
+                                      amount_aw: int,
+                                      ceiling_aw: int,
+                                      age_bracket: int,
+                                      entity: int,
+                                      rates: timeline.RateSet = None) -> int:
+    """Gets the CPF contribution amount in cents in a month for the specified entity, given the
+    wages paid in the month and the AW Ceiling remaining, all in cents.
+
+    The rates are looked up in the compiled rate tables (see `constants.COEFFICIENTS_CONT`), and
+    the amounts are computed exactly in integers:
+    - Below $750, the contribution is rounded to the nearest cent.
+    - From $750, the total contribution is rounded to the nearest dollar, and the employee's
+      share is rounded down to the dollar.
+    Months without AW are looked up in `tables.LOOKUP_TABLE` first if it is enabled.
+
+    Args:
+        amount_ow (int): Ordinary wages paid in the month in cents
+        amount_aw (int): Additional wages paid in the month in cents
+        ceiling_aw (int): Amount of AW that is still subject to CPF in the year in cents
+        age_bracket (int): Contribution age bracket index of employee
+        entity (int): Either `constants.ENTITY_COMBINED` or `constants.ENTITY_EMPLOYEE`
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
+
+    Returns the CPF contribution amount for the month in cents.
+    """
+
+    if amount_aw == 0 and _use_lookup_table(rates):
+        cont = tables.LOOKUP_TABLE.get_contribution(amount_ow, age_bracket, entity)
+        if cont is not None:
+            return cont
+
+    coefficients = constants.COEFFICIENTS_CONT if rates is None else rates.coefficients_cont
+    income_bracket = genhelpers._get_income_bracket_index(amount_ow)
+    rates = coefficients[age_bracket][income_bracket]
+    amount_tw = amount_ow + amount_aw # only needed if income is in income brackets 2 or 3
+
+    if income_bracket == 0:
         cont = 0
         logger.debug('Salary <=$50/month, total contribution is zero')
-    elif salary <= constants.INCOME_BRACKET_2:
-        cont = rates[age_bracket][1][entity] * amount_tw
-        logger.debug(f'Salary >$50 to <=$500/month, contribution from TW is {round(cont, 2)}')
-    elif salary <= constants.INCOME_BRACKET_3:
-        cont_from_tw = rates[age_bracket][2][entity] * amount_tw
-        cont_misc = rates[age_bracket][2][strings.MISC] * (amount_tw - 500)
-        cont = cont_from_tw + cont_misc
-        logger.debug(f'Salary >$500 to <=$749/month, contribution from OW is {round(cont, 2)}')
+    elif income_bracket == 1:
+        cont = genhelpers._div_round_half_up(rates[entity] * amount_tw, constants.RATE_SCALE)
+        logger.debug('Salary >$50 to <=$500/month, contribution from TW is %.2f', cont / 100)
+    elif income_bracket == 2:
+        cont_from_tw = rates[entity] * amount_tw
+        cont_misc = rates[constants.ENTITY_MISC] * (amount_tw - constants.INCOME_BRACKET_2 * 100)
+        cont = genhelpers._div_round_half_up(cont_from_tw + cont_misc, constants.RATE_SCALE)
+        logger.debug('Salary >$500 to <=$749/month, contribution from OW is %.2f', cont / 100)
     else:
-        amount_ow_eligible_for_cpf = min(salary, constants.CEILING_OW)
-        cont_from_ow = rates[age_bracket][3][entity] * amount_ow_eligible_for_cpf
-        logger.debug(f'Salary >=$750/month, contribution from OW is {round(cont_from_ow, 2)}')
+        amount_ow_eligible_for_cpf = min(amount_ow, constants.CEILING_OW * 100)
+        cont_from_ow = rates[entity] * amount_ow_eligible_for_cpf
+        logger.debug('Salary >=$750/month, contribution from OW is %.2f', cont_from_ow / constants.RATE_SCALE / 100)
 
         cont_from_aw = 0
-        if bonus > 0:
+        if amount_aw > 0:
             # need to consider AW
-            ceiling_aw = constants.CEILING_AW - (amount_ow_eligible_for_cpf * 12)
-            amount_aw_eligible_for_cpf = min(bonus * salary, ceiling_aw)
-            cont_from_aw = rates[age_bracket][3][entity] * amount_aw_eligible_for_cpf
-            logger.debug(f'Salary >=$750/month with bonus, contribution from AW is {round(cont_from_aw, 2)}')
+            amount_aw_eligible_for_cpf = min(amount_aw, ceiling_aw)
+            cont_from_aw = rates[entity] * amount_aw_eligible_for_cpf
+            logger.debug('Salary >=$750/month with bonus, contribution from AW is %.2f', cont_from_aw / constants.RATE_SCALE / 100)
 
         cont_total = cont_from_ow + cont_from_aw
-        if entity == strings.COMBINED:
-            cont = genhelpers._round_half_up(cont_total)
-        elif entity == strings.EMPLOYEE:
-            cont = math.floor(cont_total)
+        if entity == constants.ENTITY_COMBINED:
+            cont = genhelpers._div_round_half_up(cont_total, constants.RATE_SCALE * 100) * 100
+        elif entity == constants.ENTITY_EMPLOYEE:
+            cont = cont_total // (constants.RATE_SCALE * 100) * 100
 
     return cont
 
+def _get_annual_contribution_amount(salary: float,
+                                    bonus: float,
+                                    age: int,
+                                    entity: str) -> float:
+    """Gets the CPF contribution amount in a year for the specified entity, where the bonus is
+    received in one of the months.
+
+    The age and income brackets are fixed for the year, so the 11 months without bonus all
+    contribute the same amount and only the bonus month is evaluated separately. Each month is
+    still rounded on its own, as in `_get_monthly_contribution_amount`, and summed in cents, so
+    the total is identical to adding up 12 monthly contributions.
+
+    Args:
+        salary (float): Monthly salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        age (int): Age of employee
+        entity (str): Either "combined" or "employee"
+
+    Returns the CPF contribution amount for the year.
+    """
+
+    age_bracket = genhelpers._get_age_bracket_index(age, strings.CONTRIBUTION)
+    cont_month = _get_monthly_contribution_cents(salary, 0, age, entity, age_bracket=age_bracket)
+    cont_bonus_month = (cont_month if bonus == 0
+                        else _get_monthly_contribution_cents(salary, bonus, age, entity, age_bracket=age_bracket))
+
+    return (cont_month * 11 + cont_bonus_month) / 100
+
+def _get_contribution_amounts(salary: float,
+                              bonus: float,
+                              age: int,
+                              period: str) -> Tuple[float, float]:
+    """Gets the CPF contribution amounts of the employee and employer for the year/month.
+
+    Args:
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        age (int): Age of employee
+        period (str): Time period of contribution; either "year" or "month"
+
+    Returns a tuple containing the contribution amounts of the employee and employer.
+    """
+
+    cont_total, cont_employee = 0, 0
+
+    if period == strings.MONTH:
+        cont_total += _get_monthly_contribution_amount(
+            salary / 12,
+            bonus,
+            age,
+            entity=strings.COMBINED)
+        cont_employee += _get_monthly_contribution_amount(
+            salary / 12,
+            bonus,
+            age,
+            entity=strings.EMPLOYEE)
+    elif period == strings.YEAR:
+        # bonus is only applicable in one of the months
+        cont_total += _get_annual_contribution_amount(
+            salary / 12,
+            bonus,
+            age,
+            entity=strings.COMBINED)
+        cont_employee += _get_annual_contribution_amount(
+            salary / 12,
+            bonus,
+            age,
+            entity=strings.EMPLOYEE)
+
+    return cont_employee, cont_total - cont_employee
+
 def _get_contribution_rates(salary: float,
                             age: int) -> dict:
     """Returns the contribution rates of the employee and employer.
@@ -130,23 +331,118 @@ def _get_contribution_rates(salary: float,
 ###############################################################################
 
 def _get_allocation_amount(age: int,
-                           cont: int,
-                           account: str) -> float:
+                           cont: float,
+                           account: str,
+                           age_bracket: int = None,
+                           rates: timeline.RateSet = None) -> float:
     """Gets the amount allocated into the specified CPF account in a month.
     
     Returned amount is truncated to 2 decimal places.
 
     Args:
         age (int): Age of employee
-        cont (int): Total CPF contribution for the month
+        cont (float): Total CPF contribution for the month
         account (str): Either "SA" or "MA"
+        age_bracket (int): Allocation age bracket index of employee, if already known
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
 
     Returns the amount allocated into the specified account.
     """
 
-    age_bracket = genhelpers._get_age_bracket(age, strings.ALLOCATION)
-    alloc = genhelpers._truncate(constants.rates_alloc[age_bracket][f'{account}_{strings.RATIO}'] * cont)
-    return alloc
+    if age_bracket is None:
+        age_bracket = genhelpers._get_age_bracket_index(age, strings.ALLOCATION, rates)
+    coefficients = constants.COEFFICIENTS_ALLOC if rates is None else rates.coefficients_alloc
+    ratio = coefficients[age_bracket][constants.ACCOUNT_INDEXES[account]]
+    return genhelpers._div_truncate(ratio * genhelpers._to_cents(cont), constants.RATE_SCALE) / 100
+
+def _get_allocation_amounts(salary: float,
+                            bonus: float,
+                            age_bracket_cont: int,
+                            age_bracket_alloc: int,
+                            rates: timeline.RateSet = None,
+                            exact: bool = False) -> Tuple[float, float, float]:
+    """Gets the amounts allocated into the 3 CPF accounts in a month.
+
+    Steps for calculation:
+    1. From the total contribution amount, derive the amount allocated into SA and MA using the respective multiplier corresponding to the age, truncated to the cent.
+    2. OA allocation = Total contribution - SA allocation - MA allocation.
+
+    The allocations are computed exactly in cents, so that they always add up to the contribution.
+    They only depend on the wages in cents, and on the age and month through the age brackets and
+    the contribution and allocation rates in force, so they are cached on these in
+    `cache.ALLOCATION_CACHE`, which persists across requests (see `genhelpers.AgeSchedule`).
+    Rate sets with the same rates share the same entries (see `RateSet.rates_key`).
+
+    Args:
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        age_bracket_cont (int): Contribution age bracket index of employee
+        age_bracket_alloc (int): Allocation age bracket index of employee
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
+        exact (bool): Whether to return the amounts as Decimals rather than floats
+
+    Returns a tuple containing the amounts allocated into the OA, SA and MA in the month.
+    """
+
+    salary_monthly = salary / 12
+    amount_ow = genhelpers._to_cents(salary_monthly)
+    amount_aw = genhelpers._to_cents(bonus * salary_monthly)
+    rates_key = (rates if rates is not None else timeline.RATES_LATEST).rates_key
+    key = (amount_ow, amount_aw, age_bracket_cont, age_bracket_alloc, rates_key)
+
+    allocs = cache.ALLOCATION_CACHE.get(key)
+    if allocs is None:
+        allocs = _get_allocation_cents(amount_ow, amount_aw, age_bracket_cont, age_bracket_alloc, rates)
+        cache.ALLOCATION_CACHE.put(key, allocs)
+
+    oa_alloc, sa_alloc, ma_alloc = allocs
+    if exact:
+        return (genhelpers._cents_to_decimal(oa_alloc),
+                genhelpers._cents_to_decimal(sa_alloc),
+                genhelpers._cents_to_decimal(ma_alloc))
+    return oa_alloc / 100, sa_alloc / 100, ma_alloc / 100
+
+def _get_allocation_cents(amount_ow: int,
+                          amount_aw: int,
+                          age_bracket_cont: int,
+                          age_bracket_alloc: int,
+                          rates: timeline.RateSet = None) -> Tuple[int, int, int]:
+    """Gets the amounts allocated into the 3 CPF accounts in a month in cents (see `_get_allocation_amounts`).
+
+    Args:
+        amount_ow (int): Ordinary wages paid in the month in cents
+        amount_aw (int): Additional wages paid in the month in cents
+        age_bracket_cont (int): Contribution age bracket index of employee
+        age_bracket_alloc (int): Allocation age bracket index of employee
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
+
+    Returns a tuple containing the amounts allocated into the OA, SA and MA in the month in cents.
+    """
+
+    if amount_aw == 0 and _use_lookup_table(rates):
+        allocs = tables.LOOKUP_TABLE.get_allocation(amount_ow, age_bracket_cont, age_bracket_alloc)
+        if allocs is not None:
+            return allocs
+
+    # get contribution amount for the month first
+    cont_monthly = _get_contribution_cents_for_wages(
+        amount_ow,
+        amount_aw,
+        _get_ceiling_aw_cents(amount_ow),
+        age_bracket_cont,
+        constants.ENTITY_COMBINED,
+        rates)
+    logger.debug('Total CPF monthly contribution is %.2f', cont_monthly / 100)
+
+    # then, get the individual amounts allocated to each account
+    coefficients = constants.COEFFICIENTS_ALLOC if rates is None else rates.coefficients_alloc
+    _, sa_ratio, ma_ratio = coefficients[age_bracket_alloc]
+    sa_alloc = genhelpers._div_truncate(sa_ratio * cont_monthly, constants.RATE_SCALE)
+    ma_alloc = genhelpers._div_truncate(ma_ratio * cont_monthly, constants.RATE_SCALE)
+    oa_alloc = cont_monthly - sa_alloc - ma_alloc
+    logger.debug('Allocation amounts: OA = %.2f, SA = %.2f, MA = %.2f', oa_alloc / 100, sa_alloc / 100, ma_alloc / 100)
+
+    return oa_alloc, sa_alloc, ma_alloc
 
 def _get_allocation_rates(age: int) -> dict:
     """Returns the allocation rates into the 3 CPF accounts.
@@ -181,19 +477,23 @@ def _get_allocation_rates(age: int) -> dict:
 #                                 CPF INTEREST                                #
 ###############################################################################
 
-def _calc_monthly_interest_oa(oa_accumulated: float) -> float:
+def _calc_monthly_interest_oa(oa_accumulated: float,
+                              int_rate_oa: float = constants.INT_RATE_OA) -> float:
     """Calculates the interest to be added to the OA in a month period.
 
     Args:
         oa_accumulated (float): Current amount in OA
+        int_rate_oa (float): Annual interest rate of the OA
     """
 
-    oa_interest = oa_accumulated * (constants.INT_RATE_OA / 12)
+    oa_interest = oa_accumulated * (int_rate_oa / 12)
     return oa_interest
 
 def _calc_monthly_interest_sa(oa_accumulated: float,
                                    sa_accumulated: float,
-                                   rem_amount_for_extra_int_sa_ma: float) -> float:
+                                   rem_amount_for_extra_int_sa_ma: float,
+                                   int_rate_sa: float = constants.INT_RATE_SA,
+                                   int_extra: float = constants.INT_EXTRA) -> float:
     """Calculates the interest to be added to the SA in a month period.
     
     Extra 1% interest earned on OA, if any, is credited to the SA.
@@ -202,38 +502,402 @@ def _calc_monthly_interest_sa(oa_accumulated: float,
         oa_accumulated (float): Current amount in OA
         sa_accumulated (float): Current amount in SA
         rem_amount_for_extra_int_sa_ma (float): Remaining amount in SA and MA that is applicable for 1% extra interest
+        int_rate_sa (float): Annual interest rate of the SA
+        int_extra (float): Extra annual interest rate
     """
 
     # first, add the extra 1% interest earned on OA 
-    sa_interest = min(oa_accumulated, constants.THRESHOLD_EXTRAINT_OA) * (constants.INT_EXTRA / 12)
+    sa_interest = min(oa_accumulated, constants.THRESHOLD_EXTRAINT_OA) * (int_extra / 12)
 
     # then, add the interest earned on SA
     if sa_accumulated > rem_amount_for_extra_int_sa_ma:
-        sa_interest += rem_amount_for_extra_int_sa_ma * ((constants.INT_RATE_SA + constants.INT_EXTRA) / 12)
-        sa_interest += (sa_accumulated - rem_amount_for_extra_int_sa_ma) * (constants.INT_RATE_SA / 12)
+        sa_interest += rem_amount_for_extra_int_sa_ma * ((int_rate_sa + int_extra) / 12)
+        sa_interest += (sa_accumulated - rem_amount_for_extra_int_sa_ma) * (int_rate_sa / 12)
     else:
-        sa_interest += sa_accumulated * ((constants.INT_RATE_SA + constants.INT_EXTRA) / 12)
+        sa_interest += sa_accumulated * ((int_rate_sa + int_extra) / 12)
 
     return sa_interest
 
 def _calc_monthly_interest_ma(ma_accumulated: float,
-                                   rem_amount_for_extra_int_ma: float) -> float:
+                                   rem_amount_for_extra_int_ma: float,
+                                   int_rate_ma: float = constants.INT_RATE_MA,
+                                   int_extra: float = constants.INT_EXTRA) -> float:
     """Calculates the interest to be added to the MA in a month period.
 
     Args:
         ma_accumulated (float): Current amount in MA
         rem_amount_for_extra_int_ma (float): Remaining amount in MA that is applicable for 1% extra interest
+        int_rate_ma (float): Annual interest rate of the MA
+        int_extra (float): Extra annual interest rate
     """
 
     ma_interest = 0
     if ma_accumulated > rem_amount_for_extra_int_ma:
-        ma_interest += rem_amount_for_extra_int_ma * ((constants.INT_RATE_MA + constants.INT_EXTRA) / 12)
-        ma_interest += (ma_accumulated - rem_amount_for_extra_int_ma) * (constants.INT_RATE_MA / 12)
+        ma_interest += rem_amount_for_extra_int_ma * ((int_rate_ma + int_extra) / 12)
+        ma_interest += (ma_accumulated - rem_amount_for_extra_int_ma) * (int_rate_ma / 12)
     else:
-        ma_interest += ma_accumulated * ((constants.INT_RATE_MA + constants.INT_EXTRA) / 12)
+        ma_interest += ma_accumulated * ((int_rate_ma + int_extra) / 12)
     
     return ma_interest
 
+def _apply_ma_cap(state: ProjectionState,
+                  age: int,
+                  bhs: int):
+    """Caps the MA at the Basic Healthcare Sum (BHS), moving the overflow into the SA up to the
+    Full Retirement Sum while below 55, and the rest into the OA.
+
+    Only applied to projections that opt into the cap (see `ProjectionState.ma_cap`), with the BHS
+    of the rate set in force. The step is written without branches, so that it costs the same
+    whether or not the member is at the cap, and mirrors `batch._apply_ma_cap`.
+
+    Args:
+        state (ProjectionState): Current projection state; updated in place
+        age (int): Age of employee
+        bhs (int): Basic Healthcare Sum in force
+    """
+
+    ma_overflow = max(state.ma - bhs, 0)
+    sa_overflow = (min(ma_overflow, max(constants.RETIREMENT_SUM_FULL - state.sa, 0))
+                   * (age < constants.AGE_RA_CREATION))
+    state.ma -= ma_overflow
+    state.sa += sa_overflow
+    state.oa += ma_overflow - sa_overflow
+
+def _calc_monthly_change(state: ProjectionState,
+                         salary: float,
+                         bonus: float,
+                         schedule: genhelpers.AgeSchedule,
+                         month_index: int,
+                         account_deltas: Tuple[float, float, float] = None):
+    """Adds the allocations and account deltas in a month to the account balances, and
+    accumulates the interest earned in the month.
+
+    Args:
+        state (ProjectionState): Current projection state; updated in place
+        salary (float): Annual salary of employee
+        bonus (float): Bonus in the month represented as a multiplier of monthly salary
+        schedule (AgeSchedule): Age, age brackets and rates of employee by month
+        month_index (int): Index of the month (see `genhelpers._get_month_index`)
+        account_deltas (tuple): Total deltas to the OA, SA and MA in the month, if any
+    """
+
+    age, age_bracket_cont, age_bracket_alloc = schedule.get(month_index)
+    rates = schedule.get_rates(month_index)
+    state.age = age
+
+    # add allocated amounts in this month to the accounts
+    oa_alloc, sa_alloc, ma_alloc = _get_allocation_amounts(
+        salary, bonus, age_bracket_cont, age_bracket_alloc, rates, state.exact)
+    state.oa += oa_alloc
+    state.sa += sa_alloc
+    state.ma += ma_alloc
+
+    # add any topups/withdrawals in this month, if applicable
+    if account_deltas is not None:
+        oa_delta, sa_delta, ma_delta = account_deltas
+        if state.exact:
+            # deltas are paid in whole cents
+            oa_delta, sa_delta, ma_delta = (genhelpers._cents_to_decimal(genhelpers._to_cents(delta))
+                                            for delta in account_deltas)
+        state.oa += oa_delta
+        state.sa += sa_delta
+        state.ma += ma_delta
+
+    # MA balances above the BHS overflow into the other accounts before interest is earned
+    if state.ma_cap:
+        _apply_ma_cap(state, age, rates.bhs)
+
+    oa_interest, sa_interest, ma_interest = _calc_monthly_interest(state.oa, state.sa, state.ma, rates, state.exact)
+    state.oa_interest += oa_interest
+    state.sa_interest += sa_interest
+    state.ma_interest += ma_interest
+
+def _calc_monthly_interest(oa: float,
+                           sa: float,
+                           ma: float,
+                           rates: timeline.RateSet = None,
+                           exact: bool = False) -> Tuple[float, float, float]:
+    """Calculates the interest earned in a month in the 3 CPF accounts for the given balances.
+
+    Args:
+        oa (float): Current amount in OA
+        sa (float): Current amount in SA
+        ma (float): Current amount in MA
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
+        exact (bool): Whether the balances are Decimals, in which case the interest is computed in Decimals
+
+    Returns a tuple containing the interest earned in the OA, SA and MA in the month.
+    """
+
+    ###########################################################################################
+    #                                   INTEREST CALCULATION                                  #
+    # Interest is calculated at the end of each month based on the lowest balance amount in   #
+    # the month.                                                                              # 
+    # But, it is only credited at the end of the year.                                        # 
+    #                                                                                         #
+    # Extra 1% interest is earned on first $60k of combined balance, with up to $20k coming   #
+    # from OA.                                                                                #
+    # Extra 1% interest earned on OA is credited to SA, not OA.                               #
+    # Order priority: 1. OA, 2. SA, 3. MA                                                     #
+    ###########################################################################################
+
+    if exact:
+        int_rate_oa, int_rate_sa, int_rate_ma, int_extra = _get_exact_interest_rates(rates)
+    elif rates is None:
+        int_rate_oa, int_rate_sa, int_rate_ma, int_extra = \
+            constants.INT_RATE_OA, constants.INT_RATE_SA, constants.INT_RATE_MA, constants.INT_EXTRA
+    else:
+        int_rate_oa, int_rate_sa, int_rate_ma, int_extra = \
+            rates.int_rate_oa, rates.int_rate_sa, rates.int_rate_ma, rates.int_extra
+
+    # first priority is OA
+    oa_interest = _calc_monthly_interest_oa(oa, int_rate_oa)
+
+    # remaining amount available for extra interest to be received in SA/MA has a minimum of $40k
+    rem_amount_for_extra_int_sa_ma = (constants.THRESHOLD_EXTRAINT_TOTAL -
+                                        min(oa, constants.THRESHOLD_EXTRAINT_OA))
+    # second priority is SA
+    sa_interest = _calc_monthly_interest_sa(
+        oa,
+        sa,
+        rem_amount_for_extra_int_sa_ma,
+        int_rate_sa,
+        int_extra)
+
+    # remaining amount available for extra interest to be received in MA depends on the amount in SA 
+    rem_amount_for_extra_int_ma = max(rem_amount_for_extra_int_sa_ma - sa, 0)
+    # last priority is MA
+    ma_interest = _calc_monthly_interest_ma(
+        ma,
+        rem_amount_for_extra_int_ma,
+        int_rate_ma,
+        int_extra)
+
+    return oa_interest, sa_interest, ma_interest
+
+@functools.lru_cache(maxsize=None)
+def _get_exact_interest_rates(rates: timeline.RateSet = None) -> Tuple[decimal.Decimal, ...]:
+    """Returns the OA, SA, MA and extra interest rates of a rate set as Decimals.
+
+    Args:
+        rates (RateSet): Rates in force in the month; defaults to the rates in `constants`
+    """
+
+    if rates is None:
+        int_rates = constants.INT_RATE_OA, constants.INT_RATE_SA, constants.INT_RATE_MA, constants.INT_EXTRA
+    else:
+        int_rates = rates.int_rate_oa, rates.int_rate_sa, rates.int_rate_ma, rates.int_extra
+
+    return tuple(genhelpers._to_decimal(int_rate) for int_rate in int_rates)
+
+def _is_contribution_free(salary: float) -> bool:
+    """Returns True if no CPF contributions are made at the given salary, regardless of bonus.
+
+    Args:
+        salary (float): Annual salary of employee
+    """
+
+    return salary / 12 <= constants.INCOME_BRACKET_1
+
+def _accumulate_interest(state: ProjectionState,
+                         rates: timeline.RateSet,
+                         n_months: int):
+    """Accumulates the interest earned over `n_months` months in which the balances stay constant.
+
+    Args:
+        state (ProjectionState): Current projection state; updated in place
+        rates (RateSet): Rates in force in the months
+        n_months (int): Number of months
+    """
+
+    oa_interest, sa_interest, ma_interest = _calc_monthly_interest(
+        state.oa, state.sa, state.ma, rates, state.exact)
+    state.oa_interest += oa_interest * n_months
+    state.sa_interest += sa_interest * n_months
+    state.ma_interest += ma_interest * n_months
+
+def _fast_forward_months(state: ProjectionState,
+                         schedule: genhelpers.AgeSchedule,
+                         month_index_start: int,
+                         n_months: int,
+                         accumulate_interest: Callable = _accumulate_interest):
+    """Accumulates the interest over `n_months` months within a year without any contributions or account deltas.
+
+    Balances stay constant within the year as interest is only credited at the end of it,
+    so the interest earned in each month is the same while the same rates are in force, and is
+    evaluated only once per run of months under the same rate set (see `AgeSchedule.get_rates_end`).
+
+    Args:
+        state (ProjectionState): Current projection state; updated in place
+        schedule (AgeSchedule): Age, age brackets and rates of employee by month
+        month_index_start (int): Index of the first month (see `genhelpers._get_month_index`)
+        n_months (int): Number of months to advance by
+        accumulate_interest (callable): Accumulates the interest of a number of months into the state,
+            given the state, the rates in force and the number of months; defaults to `_accumulate_interest`
+    """
+
+    month_index_end = month_index_start + n_months
+    state.age = schedule.get(month_index_end - 1)[0]
+
+    month_index = month_index_start
+    while month_index < month_index_end:
+        month_index_next = min(schedule.get_rates_end(month_index), month_index_end)
+        accumulate_interest(state, schedule.get_rates(month_index), month_index_next - month_index)
+        month_index = month_index_next
+
+def _fast_forward_years(state: ProjectionState,
+                        schedule: genhelpers.AgeSchedule,
+                        month_index_start: int,
+                        n_years: int) -> Iterator[int]:
+    """Advances the projection from `month_index_start` to the end of the `n_years`-th year, in years
+    without any contributions or account deltas.
+
+    Each year is evaluated in one step: the monthly interest on the balances at the start of the
+    year is compounded into the balances at the end of it (see `_fast_forward_months`), without
+    simulating the months. As with `_iter_annual_change`, the interest accumulators are only cleared
+    when a year starts from January.
+
+    Args:
+        state (ProjectionState): Current projection state; updated in place
+        schedule (AgeSchedule): Age, age brackets and rates of employee by month
+        month_index_start (int): Index of the first month (see `genhelpers._get_month_index`)
+        n_years (int): Number of years to advance by, including the year of the first month
+
+    Yields the month index of December of every year, once its interest is credited.
+    """
+
+    month_index = month_index_start
+    for _ in range(n_years):
+        if month_index % 12 == 0:
+            state.reset_interest()
+        month_index_end = month_index - month_index % 12 + 12
+
+        if state.ma_cap:
+            # balances must be within the BHS for them to stay constant through the year
+            _apply_ma_cap(state, schedule.get(month_index)[0], schedule.get_rates(month_index).bhs)
+        _fast_forward_months(state, schedule, month_index, month_index_end - month_index)
+        state.credit_interest()
+        if state.ma_cap:
+            _apply_ma_cap(state, state.age, schedule.get_rates(month_index_end - 1).bhs)
+
+        yield month_index_end - 1
+        month_index = month_index_end
+
+def _iter_annual_change(state: ProjectionState,
+                        salary: float,
+                        bonus: float,
+                        schedule: genhelpers.AgeSchedule,
+                        deltas_index: genhelpers.AccountDeltaIndex,
+                        bonus_month: int,
+                        date_start: dt) -> Iterator[int]:
+    """Simulates the months from `date_start` to the end of the year and credits the interest
+    earned in the year, yielding after every simulated month.
+
+    Interest accumulated in the year is only credited into the balances before the last yield.
+    Years that are fast-forwarded (see `_fast_forward_years`) are evaluated in one step, and only
+    yield once for the last month.
+
+    The interest accumulators are cleared when starting from January; otherwise, interest
+    accumulated in the earlier months of the year is carried on, which allows a projection to be
+    resumed from a state in the middle of the year.
+
+    Args:
+        state (ProjectionState): Current projection state; updated in place
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        schedule (AgeSchedule): Age, age brackets and rates of employee by month
+        deltas_index (AccountDeltaIndex): Index of the account deltas by month
+        bonus_month (int): Month where bonus is received (1-12)
+        date_start (date): Start date of the year to calculate from
+
+    Yields the month index (see `genhelpers._get_month_index`) of the month just simulated.
+    """
+
+    month_start = date_start.month
+    month_index_start = genhelpers._get_month_index(date_start.year, month_start)
+    month_index_end = genhelpers._get_month_index(date_start.year, 12)
+    logger.info('calc_annual_change() - from "%d/%d" to "12/%d"', month_start, date_start.year, date_start.year)
+
+    if _is_contribution_free(salary) and not deltas_index.has_deltas_between(month_index_start, month_index_end):
+        # nothing is added to the accounts in the year, so the whole year can be evaluated at once
+        logger.debug('No contributions or account deltas in the year, fast-forwarding')
+        yield from _fast_forward_years(state, schedule, month_index_start, 1)
+        return
+
+    if month_start == 1:
+        state.reset_interest()
+
+    # iterate through the months in the year
+    for month in range(month_start, 13):
+        month_index = genhelpers._get_month_index(date_start.year, month)
+        bonus_in_month = bonus if month == bonus_month else 0
+
+        # get any topups/withdrawals in this month, if applicable
+        deltas = deltas_index.get(month_index)
+        if deltas is not None:
+            logger.debug('Month = %d; OA delta = %.2f, SA delta = %.2f, MA delta = %.2f', month, *deltas)
+
+        _calc_monthly_change(state, salary, bonus_in_month, schedule, month_index, deltas)
+        logger.debug('Month = %d; OA = %.2f, SA = %.2f, MA = %.2f', month, state.oa, state.sa, state.ma)
+
+        if month == 12:
+            # interest added at the end of the year
+            logger.debug('Interest in year: OA = %.2f, SA = %.2f, MA = %.2f', state.oa_interest, state.sa_interest, state.ma_interest)
+            state.credit_interest()
+            if state.ma_cap:
+                _apply_ma_cap(state, state.age, schedule.get_rates(month_index).bhs)
+
+        yield month_index
+
+def _calc_annual_change(state: ProjectionState,
+                        salary: float,
+                        bonus: float,
+                        schedule: genhelpers.AgeSchedule,
+                        deltas_index: genhelpers.AccountDeltaIndex,
+                        bonus_month: int,
+                        date_start: dt):
+    """Simulates the months from `date_start` to the end of the year and credits the interest
+    earned in the year.
+
+    On return, the balances in `state` are those at the end of the year, and the interest
+    accumulators hold the interest earned in the year.
+
+    Args:
+        state (ProjectionState): Current projection state; updated in place
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        schedule (AgeSchedule): Age, age brackets and rates of employee by month
+        deltas_index (AccountDeltaIndex): Index of the account deltas by month
+        bonus_month (int): Month where bonus is received (1-12)
+        date_start (date): Start date of the year to calculate from
+    """
+
+    for _ in _iter_annual_change(state, salary, bonus, schedule, deltas_index, bonus_month, date_start):
+        pass
+
+def _format_annual_change(state: ProjectionState,
+                          salary: float,
+                          bonus: float) -> dict:
+    """Formats the projection state at the end of a year into the response format.
+
+    Args:
+        state (ProjectionState): Projection state at the end of the year
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+    """
+
+    return {
+        strings.AGE: str(state.age),
+        strings.PARAM_SALARY: str(round(salary, 2)),
+        strings.PARAM_BONUS: str(round(salary / 12 * bonus, 2)),
+        strings.OA: genhelpers._format_amount(state.oa),
+        strings.SA: genhelpers._format_amount(state.sa),
+        strings.MA: genhelpers._format_amount(state.ma),
+        strings.OA_INTEREST: genhelpers._format_amount(state.oa_interest),
+        strings.SA_INTEREST: genhelpers._format_amount(state.sa_interest),
+        strings.MA_INTEREST: genhelpers._format_amount(state.ma_interest),
+    }
+
 def calc_annual_change(salary: float,
                        bonus: float,
                        dob: str,
@@ -242,14 +906,15 @@ def calc_annual_change(salary: float,
                        ma_curr: float,
                        account_deltas: list = None,
                        bonus_month: int = 12,
-                       date_start: dt = None) -> dict:
+                       date_start: dt = None,
+                       ma_cap: bool = False) -> dict:
     """Calculates the total contributions and interest earned for the current year.
 
     Adds the interest, along with the contributions in the year, to the CPF account balances. \\
     Returns the projected amount in the CPF accounts at the end of the year.
 
     Age variable is updated every month. \\
-    Result of `calc_cpf_allocation` function call is cached to avoid repeated calculations.
+    Result of `_get_allocation_amounts` function call is cached to avoid repeated calculations.
 
     Args:
         salary (float): Annual salary of employee
@@ -261,6 +926,7 @@ def calc_annual_change(salary: float,
         account_deltas (list): List of topups/withdrawals to be made to the accounts
         bonus_month (int): Month where bonus is received (1-12)
         date_start (date): Start date of the year to calculate from
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum
 
     Returns a dict:
         - `oa`: OA balance at the end of the year
@@ -271,91 +937,83 @@ def calc_annual_change(salary: float,
         - `ma_interest`: Interest earned in MA in the year
     """
 
-    oa_accumulated, sa_accumulated, ma_accumulated = oa_curr, sa_curr, ma_curr
-    oa_interest_total, sa_interest_total, ma_interest_total = 0, 0, 0
+    if date_start is None:
+        date_start = dt.date(dt.date.today().year, 1, 1)
 
-    # iterate through the months in the year
-    month_start = date_start.month if date_start is not None else 1
-    logger.info(f'calc_annual_change() - from "{month_start}/{date_start.year}" to "12/{date_start.year}"')
-    for month in range(month_start, 13):
-        # wrap the date in a datetime object
-        date_start_iter = dt.date(date_start.year, month, 1)
-        age = genhelpers._get_age(dob, date_start_iter)
+    state = ProjectionState(oa_curr, sa_curr, ma_curr, ma_cap=ma_cap)
+    month_index_start = genhelpers._get_month_index(date_start.year, date_start.month)
+    _calc_annual_change(
+        state,
+        salary,
+        bonus,
+        genhelpers._build_age_schedule(dob, month_index_start, 13 - date_start.month),
+        genhelpers._index_account_deltas(account_deltas if account_deltas is not None else []),
+        bonus_month,
+        date_start)
 
-        # add allocated amounts in this month to the accounts
-        bonus_in_month = bonus if month == bonus_month else 0
-        allocation = main.calc_cpf_allocation(salary, bonus_in_month, None, age=age)
-            
-        oa_accumulated += float(allocation[strings.VALUES][strings.OA]) / 12
-        sa_accumulated += float(allocation[strings.VALUES][strings.SA]) / 12
-        ma_accumulated += float(allocation[strings.VALUES][strings.MA]) / 12
-
-        # add any topups/withdrawals in this month, if applicable
-        account_deltas_month = [e for e in account_deltas if int(e[strings.PERIOD][4:6]) == month]
-        if account_deltas_month:
-            oa_delta, sa_delta, ma_delta = genhelpers._extract_account_deltas(account_deltas_month)
-            logger.debug(f'Month = {month}; OA delta = {round(oa_delta, 2)}, SA delta = {round(sa_delta, 2)}, MA delta = {round(ma_delta, 2)}')
-            
-            oa_accumulated += oa_delta
-            sa_accumulated += sa_delta
-            ma_accumulated += ma_delta
-
-        ###########################################################################################
-        #                                   INTEREST CALCULATION                                  #
-        # Interest is calculated at the end of each month based on the lowest balance amount in   #
-        # the month.                                                                              # 
-        # But, it is only credited at the end of the year.                                        # 
-        #                                                                                         #
-        # Extra 1% interest is earned on first $60k of combined balance, with up to $20k coming   #
-        # from OA.                                                                                #
-        # Extra 1% interest earned on OA is credited to SA, not OA.                               #
-        # Order priority: 1. OA, 2. SA, 3. MA                                                     #
-        ###########################################################################################
-
-        # first priority is OA
-        oa_interest = _calc_monthly_interest_oa(oa_accumulated)
-        oa_interest_total += oa_interest
-
-        # remaining amount available for extra interest to be received in SA/MA has a minimum of $40k
-        rem_amount_for_extra_int_sa_ma = (constants.THRESHOLD_EXTRAINT_TOTAL -
-                                            min(oa_accumulated, constants.THRESHOLD_EXTRAINT_OA))
-        # second priority is SA
-        sa_interest = _calc_monthly_interest_sa(
-            oa_accumulated,
-            sa_accumulated, 
-            rem_amount_for_extra_int_sa_ma)
-        sa_interest_total += sa_interest
-
-        # remaining amount available for extra interest to be received in MA depends on the amount in SA 
-        rem_amount_for_extra_int_ma = max(rem_amount_for_extra_int_sa_ma - sa_accumulated, 0)
-        # last priority is MA
-        ma_interest = _calc_monthly_interest_ma(
-            ma_accumulated,
-            rem_amount_for_extra_int_ma)
-        ma_interest_total += ma_interest
-
-        if month == bonus_month:
-            logger.debug(f'Month = {month} (bonus); OA = {round(oa_accumulated, 2)}, SA = {round(sa_accumulated, 2)}, MA = {round(ma_accumulated, 2)}')
-            logger.debug(f'Month = {month} (bonus); OA int = {round(oa_interest, 2)}, SA int = {round(sa_interest, 2)}, MA int = {round(ma_interest, 2)}')
-        else:
-            logger.debug(f'Month = {month}; OA = {round(oa_accumulated, 2)}, SA = {round(sa_accumulated, 2)}, MA = {round(ma_accumulated, 2)}')
-            logger.debug(f'Month = {month}; OA int = {round(oa_interest, 2)}, SA int = {round(sa_interest, 2)}, MA int = {round(ma_interest, 2)}')
-
-    # interest added at the end of the year
-    logger.debug(f'Interest in year: OA = {round(oa_interest_total, 2)}, SA = {round(sa_interest_total, 2)}, MA = {round(ma_interest_total, 2)}')
-    oa_new = oa_accumulated + oa_interest_total
-    sa_new = sa_accumulated + sa_interest_total
-    ma_new = ma_accumulated + ma_interest_total
+    return _format_annual_change(state, salary, bonus)
+
+###############################################################################
+#                           CPF PROJECTION CHECKPOINTS                        #
+###############################################################################
+
+def _create_checkpoint(state: ProjectionState,
+                       month_index: int,
+                       n_years_projected: int,
+                       deltas_index: genhelpers.AccountDeltaIndex) -> dict:
+    """Creates a serializable checkpoint of the projection engine at the end of a year.
+
+    Balances are stored as numbers rather than strings so that a projection resumed from the
+    checkpoint produces identical results; in exact mode, they are stored as strings of the
+    Decimals, which convert back without any loss.
+
+    Args:
+        state (ProjectionState): Projection state at the end of the year
+        month_index (int): Index of the next month to be simulated (see `genhelpers._get_month_index`)
+        n_years_projected (int): Number of years projected so far, which determines the projected salary
+        deltas_index (AccountDeltaIndex): Index of the account deltas by month
+
+    Returns a dict:
+        - `period`: Next month to be simulated in YYYYMM format
+        - `year`: Number of years projected so far
+        - `oa`, `sa`, `ma`: Account balances
+        - `account_deltas`: Account deltas that are still pending (see `AccountDeltaIndex.to_dict`)
+    """
+
+    balances = (state.oa, state.sa, state.ma)
+    if state.exact:
+        balances = tuple(str(balance) for balance in balances)
 
     return {
-        strings.AGE: str(age),
-        strings.PARAM_SALARY: str(round(salary, 2)),
-        strings.PARAM_BONUS: str(round(salary / 12 * bonus, 2)),
-        # strings.DELTAS: {k:v for k,v in account_deltas.items() if v},
-        strings.OA: str(round(oa_new, 2)),
-        strings.SA: str(round(sa_new, 2)),
-        strings.MA: str(round(ma_new, 2)),
-        strings.OA_INTEREST: str(round(oa_interest_total, 2)),
-        strings.SA_INTEREST: str(round(sa_interest_total, 2)),
-        strings.MA_INTEREST: str(round(ma_interest_total, 2)),
+        strings.PERIOD: genhelpers._get_period(month_index),
+        strings.YEAR: n_years_projected,
+        strings.OA: balances[0],
+        strings.SA: balances[1],
+        strings.MA: balances[2],
+        strings.PARAM_ACCOUNT_DELTAS: deltas_index.to_dict(month_index),
     }
+
+def _restore_checkpoint(checkpoint: dict,
+                        exact: bool = False) \
+                        -> Tuple[ProjectionState, genhelpers.AccountDeltaIndex, int, int]:
+    """Restores the projection engine from a checkpoint created by `_create_checkpoint`.
+
+    Args:
+        checkpoint (dict): Checkpoint of the projection engine
+        exact (bool): Whether to restore the balances as Decimals
+
+    Returns a tuple containing the projection state, the account deltas index, the index of the
+    next month to be simulated and the number of years projected so far.
+    """
+
+    period = checkpoint[strings.PERIOD]
+    month_index = genhelpers._get_month_index(int(period[:4]), int(period[4:6]))
+    to_amount = genhelpers._to_decimal if exact else float
+    state = ProjectionState(
+        to_amount(checkpoint[strings.OA]),
+        to_amount(checkpoint[strings.SA]),
+        to_amount(checkpoint[strings.MA]),
+        exact=exact)
+    deltas_index = genhelpers.AccountDeltaIndex.from_dict(checkpoint[strings.PARAM_ACCOUNT_DELTAS])
+
+    return state, deltas_index, month_index, int(checkpoint[strings.YEAR])
@@ -1,10 +1,12 @@
+import bisect
 import datetime as dt
 from dateutil.relativedelta import relativedelta
+import decimal
 import logging
 import math
-from typing import Tuple
+from typing import NamedTuple, Tuple
 
-from . import constants
+from . import constants, timeline
 from utils import strings
 
 logger = logging.getLogger(__name__)
@@ -47,64 +49,176 @@ def _get_age_bracket(age: int,
     Args:
         age (int): Age of employee
         purpose (str): Either "contribution" or "allocation"
+
+    Returns the key of the age bracket in `constants.rates_cont` or `constants.rates_alloc`.
+    """
+
+    keys = constants.AGE_KEYS_CONT if purpose == strings.CONTRIBUTION else constants.AGE_KEYS_ALLOC
+    return keys[_get_age_bracket_index(age, purpose)]
+
+def _get_age_bracket_index(age: int,
+                           purpose: str,
+                           rates: timeline.RateSet = None) -> int:
+    """Gets the index of the age bracket for the specified purpose and age in the compiled rate
+    tables, i.e. `constants.COEFFICIENTS_CONT` or `constants.COEFFICIENTS_ALLOC`.
+
+    Ages above the last bracket fall into the last bracket.
+
+    Args:
+        age (int): Age of employee
+        purpose (str): Either "contribution" or "allocation"
+        rates (RateSet): Rate set whose tables to look up; defaults to the tables in `constants`
     """
 
     if purpose == strings.CONTRIBUTION:
-        keys = constants.rates_cont.keys()
+        thresholds = constants.AGE_THRESHOLDS_CONT if rates is None else rates.age_thresholds_cont
     elif purpose == strings.ALLOCATION:
-        keys = constants.rates_alloc.keys()
+        thresholds = constants.AGE_THRESHOLDS_ALLOC if rates is None else rates.age_thresholds_alloc
 
-    # keys are sorted in ascending order
-    for key in keys:
-        if age <= int(key):
-            return key
-    
-    return max(keys) # return max by default
+    # brackets are inclusive of their upper limit
+    return min(bisect.bisect_left(thresholds, age), len(thresholds) - 1)
 
-def _get_num_projection_years(target_year: int) -> int:
-    """Returns the number of years between this year and the target year (inclusive).
+def _get_income_bracket_index(amount_ow: int) -> int:
+    """Gets the index of the income bracket for the given OW in the month, from 0 for <=$50 to 3 for
+    >=$750 (see `constants.INCOME_THRESHOLDS`).
+
+    Args:
+        amount_ow (int): Ordinary wages paid in the month in cents
+    """
+
+    return bisect.bisect_left(constants.INCOME_THRESHOLDS, amount_ow)
+
+def _get_num_projection_years(target_year: int,
+                              start_year: int = None) -> int:
+    """Returns the number of years between the start year and the target year (inclusive).
 
     Args:
         target_year (int): Target year in the future to project for
+        start_year (int): First year of the projection; defaults to this year
     """
 
-    return target_year - dt.date.today().year + 1
+    if start_year is None:
+        start_year = dt.date.today().year
 
-###############################################################################
-#                         ACCOUNT DELTAS HANDLING METHODS                     #
-###############################################################################
+    return target_year - start_year + 1
+
+def _get_year_at_age(dob: str,
+                     age: int) -> int:
+    """Returns the first year at the end of which the employee is of the given age (see `_get_age`).
 
-def _decompress_account_deltas(account_deltas: list) -> list:
-    """Decompresses recurring deltas into its individual delta entry.
-    
     Args:
-        account_deltas (list): List of topups/withdrawals to be made to the accounts
+        dob (str): Date of birth of employee in YYYYMM format
+        age (int): Age of employee
     """
 
-    account_deltas_new = []
+    birth_year, birth_month = int(dob[0:4]), int(dob[4:6])
+    # employees born in December only turn a year older in the following year
+    return birth_year + age - (1 if birth_month < 12 else 0)
+
+class AgeSchedule(object):
+    """Age, age brackets and rates of an employee in every month of a projection.
+
+    Built once per projection so that the month loop does not need to re-derive the age from
+    the date of birth, nor search the rate timeline for the rates in force.
+
+    Attributes:
+        start (int): Month index of the first month in the schedule (see `_get_month_index`)
+        ages (list): Age in each month
+        brackets_cont (list): Contribution age bracket index in each month
+        brackets_alloc (list): Allocation age bracket index in each month
+        rate_sets (list): `RateSet` in force in each month
+        rate_changes (list): Month indexes in which the rate set differs from the previous month, in ascending order
+    """
 
-    for delta in account_deltas:
-        recurrence = delta.get(strings.RECURRENCE, None)
-        if not recurrence:
-            account_deltas_new.append(delta)
-        else:
-            del delta[strings.RECURRENCE]   # remove `recurrence` key
-            start_period = delta[strings.PERIOD]
-                
-            for i in range(0, int(recurrence[strings.DURATION])):
-                if recurrence[strings.FREQUENCY] == strings.MONTHLY:
-                    curr_period = _increment_period(
-                        start_period, add_months=i)
-                elif recurrence[strings.FREQUENCY] == strings.ANNUALLY:
-                    curr_period = _increment_period(
-                        start_period, add_years=i)
-                
-                account_deltas_new.append({
-                    **delta,
-                    **{strings.PERIOD: curr_period} # replace `period` key
-                })
-
-    return account_deltas_new
+    __slots__ = ('start', 'ages', 'brackets_cont', 'brackets_alloc', 'rate_sets', 'rate_changes')
+
+    def __init__(self,
+                 start: int,
+                 ages: list,
+                 brackets_cont: list,
+                 brackets_alloc: list,
+                 rate_sets: list):
+        self.start = start
+        self.ages = ages
+        self.brackets_cont = brackets_cont
+        self.brackets_alloc = brackets_alloc
+        self.rate_sets = rate_sets
+        self.rate_changes = [start + i for i in range(1, len(rate_sets)) if rate_sets[i] is not rate_sets[i - 1]]
+
+    def get(self, month_index: int) -> Tuple[int, int, int]:
+        """Returns the age, contribution age bracket index and allocation age bracket index in the given month.
+
+        Args:
+            month_index (int): Month index (see `_get_month_index`)
+        """
+
+        i = month_index - self.start
+        return self.ages[i], self.brackets_cont[i], self.brackets_alloc[i]
+
+    def get_rates(self, month_index: int) -> timeline.RateSet:
+        """Returns the rate set in force in the given month.
+
+        Args:
+            month_index (int): Month index (see `_get_month_index`)
+        """
+
+        return self.rate_sets[month_index - self.start]
+
+    def get_rates_end(self, month_index: int) -> int:
+        """Returns the month index after the last month in which the rate set of the given month
+        stays in force, or after the end of the schedule.
+
+        Args:
+            month_index (int): Month index (see `_get_month_index`)
+        """
+
+        i = bisect.bisect_right(self.rate_changes, month_index)
+        return self.rate_changes[i] if i < len(self.rate_changes) else self.start + len(self.rate_sets)
+
+def _build_age_schedule(dob: str,
+                        month_index_start: int,
+                        n_months: int,
+                        rates_timeline: timeline.RateTimeline = None,
+                        rate_sets: list = None) -> AgeSchedule:
+    """Builds the age schedule of an employee over `n_months` months.
+
+    Ages follow the same logic as `_get_age`, and the age brackets are only looked up once per
+    distinct age and rate set.
+
+    Args:
+        dob (str): Date of birth of employee in YYYYMM format
+        month_index_start (int): Month index of the first month (see `_get_month_index`)
+        n_months (int): Number of months in the schedule
+        rates_timeline (RateTimeline): Timeline of the rates; defaults to `timeline.TIMELINE`
+        rate_sets (list): Rate set in force in every month, if already built from the timeline,
+            e.g. to share it between the members of a household
+    """
+
+    if rates_timeline is None:
+        rates_timeline = timeline.TIMELINE
+
+    birth_month_index = _get_month_index(int(dob[0:4]), int(dob[4:6]))
+    if rate_sets is None:
+        rate_sets = rates_timeline.build_schedule(month_index_start, n_months)
+    ages, brackets_cont, brackets_alloc = [], [], []
+    brackets = {}
+
+    for month_index, rates in zip(range(month_index_start, month_index_start + n_months), rate_sets):
+        # age increases in the month after the birthday month
+        age = (month_index - birth_month_index + 11) // 12
+        if (age, rates) not in brackets:
+            brackets[age, rates] = (_get_age_bracket_index(age, strings.CONTRIBUTION, rates),
+                                    _get_age_bracket_index(age, strings.ALLOCATION, rates))
+
+        ages.append(age)
+        brackets_cont.append(brackets[age, rates][0])
+        brackets_alloc.append(brackets[age, rates][1])
+
+    return AgeSchedule(month_index_start, ages, brackets_cont, brackets_alloc, rate_sets)
+
+###############################################################################
+#                         ACCOUNT DELTAS HANDLING METHODS                     #
+###############################################################################
 
 def _extract_account_deltas(account_deltas: list) \
                             -> Tuple[float, float, float]:
@@ -138,6 +252,211 @@ def _extract_account_deltas(account_deltas: list) \
         
     return oa_delta, sa_delta, ma_delta
 
+class RecurringDelta(NamedTuple):
+    """Compact form of a recurring account delta.
+
+    Attributes:
+        start (int): Month index of the first occurrence (see `_get_month_index`)
+        stride (int): Number of months between occurrences
+        count (int): Number of occurrences
+        deltas (tuple): Deltas to the OA, SA and MA on each occurrence
+    """
+
+    start: int
+    stride: int
+    count: int
+    deltas: Tuple[float, float, float]
+
+    def occurs_in(self, month_index: int) -> bool:
+        """Returns True if the delta occurs in the given month."""
+
+        offset = month_index - self.start
+        return 0 <= offset < self.stride * self.count and offset % self.stride == 0
+
+    def next_occurrence(self, month_index: int) -> int:
+        """Returns the month index of the first occurrence on or after the given month, or None if there is none."""
+
+        offset = max(month_index - self.start, 0)
+        n = -(-offset // self.stride)   # number of occurrences before the given month
+        return self.start + n * self.stride if n < self.count else None
+
+class AccountDeltaIndex(object):
+    """Index of account deltas by absolute month.
+
+    One-off deltas are pre-aggregated by month, while recurring deltas are kept in their compact
+    form and evaluated on demand, so a long recurrence costs the same memory as a single delta.
+
+    Attributes:
+        one_off (dict): Maps a month index to the total one-off deltas to the OA, SA and MA in that month
+        recurring (list): List of `RecurringDelta`
+    """
+
+    __slots__ = ('one_off', 'recurring', '_one_off_months')
+
+    def __init__(self,
+                 one_off: dict = None,
+                 recurring: list = None):
+        self.one_off = one_off if one_off is not None else {}
+        self.recurring = recurring if recurring is not None else []
+        self._one_off_months = sorted(self.one_off)
+
+    def get(self, month_index: int) -> Tuple[float, float, float]:
+        """Returns the total deltas to the OA, SA and MA in the given month, or None if there are none.
+
+        Args:
+            month_index (int): Month index (see `_get_month_index`)
+        """
+
+        deltas = self.one_off.get(month_index)
+        for recurring_delta in self.recurring:
+            if recurring_delta.occurs_in(month_index):
+                deltas = recurring_delta.deltas if deltas is None else _add_deltas(deltas, recurring_delta.deltas)
+
+        return deltas
+
+    def to_dict(self, month_index_from: int = None) -> dict:
+        """Serializes the deltas that are still pending from the given month onwards.
+
+        Recurring deltas are kept in their compact form, starting from their next occurrence.
+
+        Args:
+            month_index_from (int): Month index of the first month to include; includes all months if None
+        """
+
+        one_off = [[month_index, *deltas] for month_index, deltas in sorted(self.one_off.items())
+                   if month_index_from is None or month_index >= month_index_from]
+
+        recurring = []
+        for recurring_delta in self.recurring:
+            start = recurring_delta.start
+            if month_index_from is not None:
+                start = recurring_delta.next_occurrence(month_index_from)
+                if start is None:
+                    continue
+            count = recurring_delta.count - (start - recurring_delta.start) // recurring_delta.stride
+            recurring.append([start, recurring_delta.stride, count, *recurring_delta.deltas])
+
+        return {
+            strings.ONE_OFF: one_off,
+            strings.RECURRING: recurring,
+        }
+
+    @classmethod
+    def from_dict(cls, deltas: dict) -> 'AccountDeltaIndex':
+        """Restores an index serialized by `to_dict`."""
+
+        one_off = {e[0]: tuple(e[1:4]) for e in deltas[strings.ONE_OFF]}
+        recurring = [RecurringDelta(e[0], e[1], e[2], tuple(e[3:6])) for e in deltas[strings.RECURRING]]
+        return cls(one_off, recurring)
+
+    def has_deltas_between(self,
+                           month_index_first: int,
+                           month_index_last: int) -> bool:
+        """Returns True if any delta occurs between the two months (inclusive).
+
+        Args:
+            month_index_first (int): Month index of the first month (see `_get_month_index`)
+            month_index_last (int): Month index of the last month
+        """
+
+        i = bisect.bisect_left(self._one_off_months, month_index_first)
+        if i < len(self._one_off_months) and self._one_off_months[i] <= month_index_last:
+            return True
+
+        for recurring_delta in self.recurring:
+            next_month = recurring_delta.next_occurrence(month_index_first)
+            if next_month is not None and next_month <= month_index_last:
+                return True
+
+        return False
+
+def _index_account_deltas(account_deltas: list) -> AccountDeltaIndex:
+    """Compiles the account deltas into an index keyed by absolute month.
+
+    One-off deltas falling in the same month are pre-aggregated, so that the projection only
+    needs a single lookup per month. Recurring deltas are not expanded; they are stored as a
+    `RecurringDelta` instead.
+
+    Args:
+        account_deltas (list): List of topups/withdrawals to be made to the accounts
+    """
+
+    one_off, recurring = {}, []
+
+    for delta in account_deltas:
+        period = delta[strings.PERIOD]
+        month_index = _get_month_index(int(period[:4]), int(period[4:6]))
+        deltas = _extract_account_deltas([delta])
+        recurrence = delta.get(strings.RECURRENCE, None)
+
+        if recurrence:
+            stride = 12 if recurrence[strings.FREQUENCY] == strings.ANNUALLY else 1
+            recurring.append(RecurringDelta(
+                month_index, stride, int(recurrence[strings.DURATION]), deltas))
+        elif month_index in one_off:
+            one_off[month_index] = _add_deltas(one_off[month_index], deltas)
+        else:
+            one_off[month_index] = deltas
+
+    return AccountDeltaIndex(one_off, recurring)
+
+def _split_transfers(transfers: list,
+                     n_members: int) -> list:
+    """Splits transfers between the members of a household into the account deltas of each member.
+
+    A transfer is paid out of the OA of the giving member, and credited into the account of the
+    receiving member given by its type (e.g. "sa_topup").
+
+    Args:
+        transfers (list): List of transfers, which are account deltas with the additional keys
+            `from` and `to` holding the indexes of the giving and receiving members
+        n_members (int): Number of members in the household
+
+    Returns a list with the account deltas of each member.
+
+    Raises a ValueError if a transfer is not between members of the household, is not into the OA,
+    SA or MA, or is not of a positive amount, and a KeyError if it is missing any of these keys.
+    """
+
+    account_deltas = [[] for _ in range(n_members)]
+
+    for i, transfer in enumerate(transfers):
+        index_from, index_to = int(transfer[strings.FROM]), int(transfer[strings.TO])
+        if not (0 <= index_from < n_members and 0 <= index_to < n_members):
+            raise ValueError(f'Transfer {i} is not between members 0 to {n_members - 1}')
+        if transfer[strings.TYPE] not in (strings.OA_TOPUP, strings.SA_TOPUP, strings.MA_TOPUP):
+            raise ValueError(f'Transfer {i} is not into one of the accounts')
+        if not float(transfer[strings.AMOUNT]) > 0:
+            raise ValueError(f'Transfer {i} is not of a positive amount')
+
+        delta = {k:v for k,v in transfer.items() if k not in (strings.FROM, strings.TO)}
+        account_deltas[index_from].append({**delta, strings.TYPE: strings.OA_WITHDRAWAL})
+        account_deltas[index_to].append({**delta, strings.IS_SA_TOPUP_FROM_OA: False})
+
+    return account_deltas
+
+def _add_deltas(deltas_1: Tuple[float, float, float],
+                deltas_2: Tuple[float, float, float]) -> Tuple[float, float, float]:
+    """Returns the sum of two (OA, SA, MA) delta tuples."""
+
+    return (deltas_1[0] + deltas_2[0], deltas_1[1] + deltas_2[1], deltas_1[2] + deltas_2[2])
+
+def _has_decreasing_deltas(deltas_index: AccountDeltaIndex,
+                           account: str) -> bool:
+    """Returns True if any of the deltas in the index reduces the balance of the given account.
+
+    Args:
+        deltas_index (AccountDeltaIndex): Index of the account deltas by month
+        account (str): Either "oa", "sa", "ma", or "total" for the combined balance of the 3 accounts
+    """
+
+    deltas_all = list(deltas_index.one_off.values()) + [e.deltas for e in deltas_index.recurring]
+    if account == strings.TOTAL:
+        return any(sum(deltas) < 0 for deltas in deltas_all)
+
+    i = [strings.OA, strings.SA, strings.MA].index(account)
+    return any(deltas[i] < 0 for deltas in deltas_all)
+
 ###############################################################################
 #                                  MISC METHODS                               #
 ###############################################################################
@@ -158,26 +477,130 @@ def _increment_period(period: str,
     new_date = date + relativedelta(years=add_years, months=add_months)
     return str(new_date.year) + str(new_date.month).zfill(2)
 
+def _get_month_index(year: int,
+                     month: int) -> int:
+    """Returns the absolute index of the given month, i.e. the number of months since year 0.
+
+    Args:
+        year (int): Year of the month
+        month (int): Month of the year (1-12)
+    """
+
+    return year * 12 + (month - 1)
+
+def _get_period(month_index: int) -> str:
+    """Returns the month with the given index (see `_get_month_index`) in YYYYMM format.
+
+    Args:
+        month_index (int): Month index
+    """
+
+    year, month = divmod(month_index, 12)
+    return str(year) + str(month + 1).zfill(2)
+
+# float amounts carry representation errors far below a millionth of a cent
+_SNAP_DECIMALS = 6
+
 def _round_half_up(n: float,
-                   decimals: int = 0) -> int:
-    """Rounds the given monetary amount to the nearest dollar.
+                   decimals: int = 0) -> float:
+    """Rounds the given monetary amount to the specified number of decimal places.
     
-    An amount of 50 cents will be regarded as an additional dollar.
+    An amount of 50 cents will be regarded as an additional dollar. The scaled amount is first
+    snapped to `_SNAP_DECIMALS` decimal places, so that float products just below a half,
+    e.g. 0.37 * 4050 = 1498.4999999999998, are rounded up as they would be on paper.
 
     Args:
         n (float): input amount
+        decimals (int): Number of decimal places to round to
     """
 
     multiplier = 10 ** decimals
-    return math.floor(n * multiplier + 0.5) / multiplier
+    return math.floor(round(n * multiplier, _SNAP_DECIMALS) + 0.5) / multiplier
 
 def _truncate(n: float,
               decimals: int = 2) -> float:
     """Truncates the given monetary amount to the specified number of decimal places.
 
+    The scaled amount is first snapped to `_SNAP_DECIMALS` decimal places (see `_round_half_up`).
+
     Args:
         n (float): input amount
+        decimals (int): Number of decimal places to truncate to
+    """
+
+    multiplier = 10 ** decimals
+    return math.trunc(round(n * multiplier, _SNAP_DECIMALS)) / multiplier
+
+###############################################################################
+#                                  CENTS METHODS                              #
+###############################################################################
+
+def _to_cents(n: float) -> int:
+    """Converts the given monetary amount into integer cents, rounding half a cent up.
+
+    Args:
+        n (float): input amount in dollars
+    """
+
+    return math.floor(round(n * 100, _SNAP_DECIMALS) + 0.5)
+
+def _div_round_half_up(numerator: int,
+                       denominator: int) -> int:
+    """Divides two integers exactly, rounding a remainder of half the denominator up.
+
+    Args:
+        numerator (int): Dividend
+        denominator (int): Divisor; must be positive
+    """
+
+    return (2 * numerator + denominator) // (2 * denominator)
+
+def _div_truncate(numerator: int,
+                  denominator: int) -> int:
+    """Divides two integers exactly, dropping the remainder (rounding towards zero).
+
+    Args:
+        numerator (int): Dividend
+        denominator (int): Divisor; must be positive
+    """
+
+    quotient = abs(numerator) // denominator
+    return quotient if numerator >= 0 else -quotient
+
+###############################################################################
+#                                 DECIMAL METHODS                             #
+###############################################################################
+
+_CENT = decimal.Decimal('0.01')
+
+def _to_decimal(n) -> decimal.Decimal:
+    """Converts the given number into a Decimal through its shortest string representation,
+    so that e.g. a rate of 0.025 is exactly 0.025 rather than its binary approximation.
+
+    Args:
+        n (float|str): input number
+    """
+
+    return decimal.Decimal(str(n))
+
+def _cents_to_decimal(cents: int) -> decimal.Decimal:
+    """Converts an amount in integer cents into an exact Decimal amount in dollars.
+
+    Args:
+        cents (int): input amount in cents
+    """
+
+    return decimal.Decimal(cents) / 100
+
+def _format_amount(n) -> str:
+    """Formats a monetary amount with 2 decimal places.
+
+    Decimal amounts are rounded half up to the cent; float amounts are rounded as by `round`.
+
+    Args:
+        n (float|Decimal): input amount
     """
 
-    before_dec, after_dec = str(n).split('.')
-    return float('.'.join((before_dec, after_dec[0:2])))
+    if isinstance(n, decimal.Decimal):
+        return str(n.quantize(_CENT, rounding=decimal.ROUND_HALF_UP))
+    return str(round(n, 2))
@@ -0,0 +1,168 @@
+import datetime as dt
+import logging
+
+from . import cpfhelpers, genhelpers, main
+from .state import ProjectionState
+from utils import strings
+
+logger = logging.getLogger(__name__)
+
+"""
+Incremental CPF projections, for interactive use where the account deltas are edited one at a time.
+"""
+
+class IncrementalProjection(object):
+    """CPF projection that keeps the state of every simulated month, so that it can be recomputed
+    from the earliest month affected when the account deltas change.
+
+    Takes the same arguments as `main.calc_cpf_projection`.
+
+    Attributes:
+        account_deltas (list): Current list of topups/withdrawals to be made to the accounts
+        n_years (int): Number of years projected
+        values (dict): Projected values, in the same format as the `values` in `main.calc_cpf_projection`
+    """
+
+    def __init__(self,
+                 salary: float,
+                 bonus: float,
+                 yoy_increase_salary: float,
+                 dob: str,
+                 base_cpf: dict,
+                 bonus_month: int,
+                 n_years: int,
+                 target_year: int,
+                 account_deltas: list,
+                 proj_start_date: dt = None):
+        self.salary = salary
+        self.bonus = bonus
+        self.yoy_increase_salary = yoy_increase_salary
+        self.bonus_month = bonus_month
+        self.account_deltas = list(account_deltas)
+
+        state, deltas_index, self._schedule, self._month_index_start, _, self.n_years = main._setup_projection(
+            dob, base_cpf, n_years, target_year, account_deltas, proj_start_date=proj_start_date)
+        self._base_state = state.copy()
+
+        # state after each simulated month, or None if the month was fast-forwarded
+        self._trail = []
+        self.values = {}
+        self._run(state, deltas_index, self._month_index_start)
+
+    @property
+    def results(self) -> dict:
+        """Returns the projection results in the same format as `main.calc_cpf_projection`."""
+
+        return {
+            strings.VALUES: self.values,
+        }
+
+    def update_account_deltas(self, account_deltas: list) -> dict:
+        """Replaces the account deltas and recomputes the projection from the earliest month affected.
+
+        The states of the months before that are reused unchanged.
+
+        Args:
+            account_deltas (list): New list of topups/withdrawals to be made to the accounts
+
+        Returns the projection results in the same format as `main.calc_cpf_projection`.
+        """
+
+        month_index_affected = _get_first_affected_month(self.account_deltas, account_deltas)
+        self.account_deltas = list(account_deltas)
+        if month_index_affected is None:
+            logger.debug('Account deltas are unchanged, nothing to recompute')
+            return self.results
+
+        month_index_resume = self._get_resume_month(month_index_affected)
+        logger.debug(f'Recomputing projection from {genhelpers._get_period(month_index_resume)}')
+
+        if month_index_resume == self._month_index_start:
+            state = self._base_state.copy()
+        else:
+            state = self._trail[month_index_resume - self._month_index_start - 1].copy()
+        self._run(state, genhelpers._index_account_deltas(account_deltas), month_index_resume)
+
+        return self.results
+
+    def _get_resume_month(self, month_index_affected: int) -> int:
+        """Returns the month to resume the projection from, given the earliest month affected.
+
+        The projection is resumed from the month right after the latest available state before the
+        affected month. In years that may be fast-forwarded (see `cpfhelpers._fast_forward_years`),
+        it is resumed from the start of the year instead, so that the results are identical to those
+        of a full projection.
+
+        Args:
+            month_index_affected (int): Index of the earliest month affected
+        """
+
+        month_index_affected = min(max(month_index_affected, self._month_index_start),
+                                   self._month_index_start + len(self._trail))
+
+        n_years_prev = month_index_affected // 12 - self._month_index_start // 12
+        salary_proj = self.salary * pow(1 + self.yoy_increase_salary, n_years_prev)
+        if cpfhelpers._is_contribution_free(salary_proj):
+            month_index_affected = max(month_index_affected - month_index_affected % 12, self._month_index_start)
+
+        i = month_index_affected - self._month_index_start
+        while i > 0 and self._trail[i - 1] is None:
+            i -= 1
+
+        return self._month_index_start + i
+
+    def _run(self,
+             state: ProjectionState,
+             deltas_index: genhelpers.AccountDeltaIndex,
+             month_index_start: int):
+        """Runs the projection from the given month to the end, recording the state of every month.
+
+        Args:
+            state (ProjectionState): Projection state before the first month to simulate
+            deltas_index (AccountDeltaIndex): Index of the account deltas by month
+            month_index_start (int): Index of the first month to simulate
+        """
+
+        del self._trail[month_index_start - self._month_index_start:]
+        n_years_prev = month_index_start // 12 - self._month_index_start // 12
+
+        months = main._iter_projection(
+            self.salary,
+            self.bonus,
+            self.yoy_increase_salary,
+            state,
+            self._schedule,
+            deltas_index,
+            self.bonus_month,
+            self.n_years - n_years_prev,
+            month_index_start,
+            n_years_prev)
+
+        for i, month_index, salary_proj in months:
+            # months that were fast-forwarded have no state of their own
+            self._trail.extend([None] * (month_index - self._month_index_start - len(self._trail)))
+            self._trail.append(state.copy())
+
+            if month_index % 12 == 11:
+                year = n_years_prev + i
+                # set key to "final" if it is the last year
+                key = strings.FINAL if year == (self.n_years - 1) else str(year + 1)
+                self.values[key] = cpfhelpers._format_annual_change(state, salary_proj, self.bonus)
+
+def _get_first_affected_month(account_deltas_old: list,
+                              account_deltas_new: list) -> int:
+    """Returns the index of the earliest month affected by a change in the account deltas,
+    or None if the account deltas are unchanged.
+
+    Args:
+        account_deltas_old (list): Previous list of topups/withdrawals
+        account_deltas_new (list): New list of topups/withdrawals
+    """
+
+    deltas_changed = ([e for e in account_deltas_old if e not in account_deltas_new]
+                      + [e for e in account_deltas_new if e not in account_deltas_old])
+    if not deltas_changed:
+        return None
+
+    return min(genhelpers._get_month_index(int(e[strings.PERIOD][:4]), int(e[strings.PERIOD][4:6]))
+               for e in deltas_changed)
@@ -0,0 +1,386 @@
+import datetime as dt
+import logging
+from typing import Tuple
+
+from . import constants, cpfhelpers, genhelpers, timeline
+from .state import LifetimeState
+from utils import strings
+
+logger = logging.getLogger(__name__)
+
+"""
+Lifetime CPF projection engine, from the start of the projection through the payout phase up to age 95.
+
+Before the Retirement Account (RA) is created, every month is simulated by the same steps as
+`cpfhelpers._calc_monthly_change`, so results match `main.calc_cpf_projection` up to then.
+In the month of the 55th birthday, the RA is created with savings from the SA and then the OA,
+up to the retirement sum. From the payout eligibility age, the RA is drawn down in level monthly
+payouts that run until the 95th birthday; the last payout empties the RA, together with the interest
+it has earned in the year so far.
+
+Years without contributions or RA creation are fast-forwarded by `cpfhelpers._fast_forward_months`,
+as the balances stay constant within them apart from the level payouts out of the RA.
+"""
+
+def _create_ra(state: LifetimeState,
+               retirement_sum: float):
+    """Creates the RA with savings transferred from the SA and then the OA, up to the retirement sum.
+
+    Args:
+        state (LifetimeState): Current projection state; updated in place
+        retirement_sum (float): Amount to set aside in the RA
+    """
+
+    from_sa = min(max(state.sa, 0), retirement_sum)
+    from_oa = min(max(state.oa, 0), retirement_sum - from_sa)
+    state.sa -= from_sa
+    state.oa -= from_oa
+    state.ra = from_sa + from_oa
+    logger.debug(f'RA created with {round(from_sa, 2)} from SA and {round(from_oa, 2)} from OA')
+
+def _get_monthly_payout(ra: float,
+                        int_rate_ra: float,
+                        n_months: int) -> float:
+    """Returns the level monthly payout that draws the RA down to zero over `n_months` months,
+    while the remaining balance earns interest at the base RA interest rate.
+
+    Args:
+        ra (float): Amount in RA at the start of the payouts
+        int_rate_ra (float): Annual interest rate of the RA
+        n_months (int): Number of monthly payouts
+    """
+
+    if n_months <= 0:
+        return ra
+
+    rate_monthly = int_rate_ra / 12
+    if rate_monthly == 0:
+        return ra / n_months
+    return ra * rate_monthly / (1 - (1 + rate_monthly) ** -n_months)
+
+def _revise_payout(state: LifetimeState,
+                   rates: timeline.RateSet,
+                   n_months: int):
+    """Sets the level monthly payout that draws the RA down to zero over the remaining payouts.
+
+    Args:
+        state (LifetimeState): Current projection state; updated in place
+        rates (RateSet): Rates in force in the month
+        n_months (int): Number of monthly payouts remaining
+    """
+
+    payout_start = state.payout_monthly is None
+    state.payout_monthly = _get_monthly_payout(state.ra, rates.int_rate_ra, n_months)
+    if payout_start:
+        logger.debug(f'RA payouts start at {round(state.payout_monthly, 2)} per month')
+
+def _calc_monthly_interest_ra(oa: float,
+                              sa: float,
+                              ma: float,
+                              ra: float,
+                              rates: timeline.RateSet) -> Tuple[float, float, float, float]:
+    """Calculates the interest earned in a month in the 4 CPF accounts once the RA is created.
+
+    Extra interest is earned on the first $60k of combined balance, taken from the RA first, then
+    from the OA (up to $20k), the SA and the MA; extra interest earned on OA is credited to the RA,
+    or to the SA once the RA has been emptied by the payouts.
+
+    Args:
+        oa (float): Current amount in OA
+        sa (float): Current amount in SA
+        ma (float): Current amount in MA
+        ra (float): Current amount in RA
+        rates (RateSet): Rates in force in the month
+
+    Returns a tuple containing the interest earned in the OA, SA, MA and RA in the month.
+    """
+
+    rem_amount_for_extra_int = constants.THRESHOLD_EXTRAINT_TOTAL
+    ra_eligible_for_extra_int = min(ra, rem_amount_for_extra_int)
+    rem_amount_for_extra_int -= ra_eligible_for_extra_int
+    oa_eligible_for_extra_int = min(oa, constants.THRESHOLD_EXTRAINT_OA, rem_amount_for_extra_int)
+    rem_amount_for_extra_int -= oa_eligible_for_extra_int
+    sa_eligible_for_extra_int = min(sa, rem_amount_for_extra_int)
+    rem_amount_for_extra_int -= sa_eligible_for_extra_int
+    ma_eligible_for_extra_int = min(ma, rem_amount_for_extra_int)
+
+    if ra <= 0:
+        sa_eligible_for_extra_int += oa_eligible_for_extra_int
+        oa_eligible_for_extra_int = 0
+
+    int_extra = rates.int_extra / 12
+    oa_interest = oa * (rates.int_rate_oa / 12)
+    sa_interest = sa * (rates.int_rate_sa / 12) + sa_eligible_for_extra_int * int_extra
+    ma_interest = ma * (rates.int_rate_ma / 12) + ma_eligible_for_extra_int * int_extra
+    ra_interest = ra * (rates.int_rate_ra / 12) + (ra_eligible_for_extra_int + oa_eligible_for_extra_int) * int_extra
+
+    return oa_interest, sa_interest, ma_interest, ra_interest
+
+def _accumulate_interest_ra(state: LifetimeState,
+                            rates: timeline.RateSet,
+                            n_months: int):
+    """Accumulates the interest earned over `n_months` months in which the balances stay constant,
+    once the RA is created (see `cpfhelpers._accumulate_interest`).
+
+    Args:
+        state (LifetimeState): Current projection state; updated in place
+        rates (RateSet): Rates in force in the months
+        n_months (int): Number of months
+    """
+
+    oa_interest, sa_interest, ma_interest, ra_interest = _calc_monthly_interest_ra(
+        state.oa, state.sa, state.ma, state.ra, rates)
+    state.oa_interest += oa_interest * n_months
+    state.sa_interest += sa_interest * n_months
+    state.ma_interest += ma_interest * n_months
+    state.ra_interest += ra_interest * n_months
+
+def _accumulate_payouts(state: LifetimeState,
+                        rates: timeline.RateSet,
+                        n_months: int):
+    """Makes the RA payouts over `n_months` months without contributions, and accumulates the
+    interest earned in them. Only the RA changes from month to month, by the level payout.
+
+    Args:
+        state (LifetimeState): Current projection state; updated in place
+        rates (RateSet): Rates in force in the months
+        n_months (int): Number of months
+    """
+
+    for _ in range(n_months):
+        payout = min(state.payout_monthly, state.ra)
+        state.ra -= payout
+        state.payout += payout
+        oa_interest, sa_interest, ma_interest, ra_interest = _calc_monthly_interest_ra(
+            state.oa, state.sa, state.ma, state.ra, rates)
+        state.oa_interest += oa_interest
+        state.sa_interest += sa_interest
+        state.ma_interest += ma_interest
+        state.ra_interest += ra_interest
+
+def _apply_ma_cap_ra(state: LifetimeState,
+                     bhs: int,
+                     retirement_sum: float):
+    """Caps the MA at the Basic Healthcare Sum once the RA is created, moving the overflow into the
+    RA up to the retirement sum until the payouts start, and the rest into the OA
+    (see `cpfhelpers._apply_ma_cap`).
+
+    Args:
+        state (LifetimeState): Current projection state; updated in place
+        bhs (int): Basic Healthcare Sum in force
+        retirement_sum (float): Amount to set aside in the RA
+    """
+
+    ma_overflow = max(state.ma - bhs, 0)
+    ra_overflow = min(ma_overflow, max(retirement_sum - state.ra, 0)) * (state.payout_monthly is None)
+    state.ma -= ma_overflow
+    state.ra += ra_overflow
+    state.oa += ma_overflow - ra_overflow
+
+def _apply_ma_cap_lifetime(state: LifetimeState,
+                           rates: timeline.RateSet,
+                           retirement_sum: float):
+    """Caps the MA at the Basic Healthcare Sum, with the overflow going into the RA if it is created.
+
+    Args:
+        state (LifetimeState): Current projection state; updated in place
+        rates (RateSet): Rates in force in the month
+        retirement_sum (float): Amount to set aside in the RA
+    """
+
+    if state.ra is None:
+        cpfhelpers._apply_ma_cap(state, state.age, rates.bhs)
+    else:
+        _apply_ma_cap_ra(state, rates.bhs, retirement_sum)
+
+def _calc_monthly_change_ra(state: LifetimeState,
+                            salary: float,
+                            bonus: float,
+                            schedule: genhelpers.AgeSchedule,
+                            month_index: int,
+                            retirement_sum: float):
+    """Adds the allocations in a month to the account balances, makes the RA payout and
+    accumulates the interest earned in the month, once the RA is created.
+
+    Allocations into the SA go into the RA instead, until it reaches the retirement sum, and the MA
+    is capped at the BHS if the projection opts into the cap (see `_apply_ma_cap_ra`).
+
+    Args:
+        state (LifetimeState): Current projection state; updated in place
+        salary (float): Annual salary of employee
+        bonus (float): Bonus in the month represented as a multiplier of monthly salary
+        schedule (AgeSchedule): Age, age brackets and rates of employee by month
+        month_index (int): Index of the month (see `genhelpers._get_month_index`)
+        retirement_sum (float): Amount to set aside in the RA
+    """
+
+    age, age_bracket_cont, age_bracket_alloc = schedule.get(month_index)
+    rates = schedule.get_rates(month_index)
+    state.age = age
+
+    if not cpfhelpers._is_contribution_free(salary):
+        oa_alloc, sa_alloc, ma_alloc = cpfhelpers._get_allocation_amounts(
+            salary, bonus, age_bracket_cont, age_bracket_alloc, rates)
+        ra_alloc = min(sa_alloc, max(retirement_sum - state.ra, 0))
+        state.oa += oa_alloc
+        state.sa += sa_alloc - ra_alloc
+        state.ma += ma_alloc
+        state.ra += ra_alloc
+
+    if state.ma_cap:
+        _apply_ma_cap_ra(state, rates.bhs, retirement_sum)
+
+    if state.payout_monthly:
+        payout = min(state.payout_monthly, state.ra)
+        state.ra -= payout
+        state.payout += payout
+
+    oa_interest, sa_interest, ma_interest, ra_interest = _calc_monthly_interest_ra(
+        state.oa, state.sa, state.ma, state.ra, rates)
+    state.oa_interest += oa_interest
+    state.sa_interest += sa_interest
+    state.ma_interest += ma_interest
+    state.ra_interest += ra_interest
+
+def _format_lifetime_change(state: LifetimeState,
+                            salary: float,
+                            bonus: float) -> dict:
+    """Formats the projection state at the end of a year into the response format.
+
+    Args:
+        state (LifetimeState): Projection state at the end of the year
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+    """
+
+    return {
+        **cpfhelpers._format_annual_change(state, salary, bonus),
+        strings.RA: genhelpers._format_amount(state.ra if state.ra is not None else 0.0),
+        strings.RA_INTEREST: genhelpers._format_amount(float(state.ra_interest)),
+        strings.PAYOUT: genhelpers._format_amount(float(state.payout)),
+    }
+
+def calc_cpf_lifetime(salary: float,
+                      bonus: float,
+                      yoy_increase_salary: float,
+                      dob: str,
+                      base_cpf: dict,
+                      bonus_month: int = 12,
+                      retirement_age: int = constants.AGE_RETIREMENT,
+                      retirement_sum: float = constants.RETIREMENT_SUM_FULL,
+                      ma_cap: bool = False,
+                      proj_start_date: dt = None) -> dict:
+    """Calculates the projected account balances in the CPF accounts every year until the end of
+    the year of the last RA payout, in the month before the 95th birthday.
+
+    Args:
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        yoy_increase_salary (float): Projected year-on-year percentage increase in salary
+        dob (str): Date of birth of employee in YYYYMM format
+        base_cpf (dict): Contains the current balance in the CPF accounts
+            - `oa`: current amount in OA
+            - `sa`: current amount in SA
+            - `ma`: current amount in MA
+            - `ra`: current amount in RA, if it has been created
+        bonus_month (int): Month where bonus is received (1-12)
+        retirement_age (int): Age from which no more wages are received
+        retirement_sum (float): Amount to set aside in the RA at 55
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum (see `cpfhelpers._apply_ma_cap`)
+        proj_start_date (date): Starting date of projection; defaults to today
+
+    Returns a dict:
+        - `values`: a dict containing keys (1, 2, ..., "final") corresponding to the projected years,
+                    where each child object contains the same values as in `main.calc_cpf_projection`,
+                    as well as the RA balance at the end of that year, and the interest earned in RA
+                    and the RA payouts in that year
+    """
+
+    if proj_start_date is None:
+        proj_start_date = dt.date.today()
+    month_index_start = genhelpers._get_month_index(proj_start_date.year, proj_start_date.month)
+    birth_month_index = genhelpers._get_month_index(int(dob[0:4]), int(dob[4:6]))
+
+    # milestones are reached in the month of the birthday
+    month_index_ra = birth_month_index + constants.AGE_RA_CREATION * 12
+    month_index_payout_start = birth_month_index + constants.AGE_PAYOUT_START * 12
+    month_index_payout_end = birth_month_index + constants.AGE_PAYOUT_END * 12
+    month_index_retirement = birth_month_index + retirement_age * 12
+    # the projection ends in December of the year of the last payout
+    month_index_end = ((month_index_payout_end - 1) // 12) * 12 + 11
+
+    ra = base_cpf.get(strings.RA)
+    state = LifetimeState(
+        float(base_cpf[strings.OA]),
+        float(base_cpf[strings.SA]),
+        float(base_cpf[strings.MA]),
+        float(ra) if ra is not None else None,
+        ma_cap=ma_cap)
+    schedule = genhelpers._build_age_schedule(dob, month_index_start, month_index_end - month_index_start + 1)
+    logger.info(f'calc_cpf_lifetime() - from "{genhelpers._get_period(month_index_start)}" to "{genhelpers._get_period(month_index_end)}"')
+
+    values = {}
+    year_start = month_index_start // 12
+    n_years = month_index_end // 12 - year_start + 1
+
+    for i in range(n_years):
+        month_index_first = max(month_index_start, (year_start + i) * 12)
+        month_index_last = (year_start + i) * 12 + 11
+        if month_index_first % 12 == 0:
+            state.reset_interest()
+
+        salary_year = salary * pow(1 + yoy_increase_salary, i)
+        no_wages = month_index_first >= month_index_retirement or cpfhelpers._is_contribution_free(salary_year)
+        if state.ra is None:
+            accumulate_interest = cpfhelpers._accumulate_interest if month_index_last < month_index_ra else None
+        elif month_index_last < month_index_payout_start:
+            accumulate_interest = _accumulate_interest_ra
+        elif month_index_payout_start <= month_index_first and month_index_last < month_index_payout_end - 1:
+            accumulate_interest = _accumulate_payouts
+        else:
+            accumulate_interest = None
+
+        if no_wages and accumulate_interest is not None:
+            rates = schedule.get_rates(month_index_first)
+            state.age = schedule.get(month_index_first)[0]
+            if accumulate_interest is _accumulate_payouts:
+                # the payouts are revised every year, after the interest of the previous year is credited
+                _revise_payout(state, rates, month_index_payout_end - month_index_first)
+            if state.ma_cap:
+                _apply_ma_cap_lifetime(state, rates, retirement_sum)
+            cpfhelpers._fast_forward_months(
+                state, schedule, month_index_first, month_index_last - month_index_first + 1, accumulate_interest)
+        else:
+            for month_index in range(month_index_first, month_index_last + 1):
+                salary_proj = salary_year if month_index < month_index_retirement else 0.0
+                bonus_in_month = bonus if month_index % 12 + 1 == bonus_month else 0
+
+                if state.ra is None and month_index >= month_index_ra:
+                    _create_ra(state, retirement_sum)
+                if state.ra is not None and month_index_payout_start <= month_index < month_index_payout_end:
+                    if month_index == month_index_payout_end - 1:
+                        # the last payout empties the RA, with the interest earned in the year so far
+                        state.credit_interest_ra()
+                        state.payout_monthly = state.ra
+                    elif state.payout_monthly is None or month_index % 12 == 0:
+                        # the payouts are revised every year, after the interest of the previous year is credited
+                        _revise_payout(state, schedule.get_rates(month_index), month_index_payout_end - month_index)
+                elif month_index >= month_index_payout_end:
+                    state.payout_monthly = 0
+
+                if state.ra is None:
+                    cpfhelpers._calc_monthly_change(state, salary_proj, bonus_in_month, schedule, month_index)
+                else:
+                    _calc_monthly_change_ra(state, salary_proj, bonus_in_month, schedule, month_index, retirement_sum)
+
+        state.credit_interest()
+        if state.ma_cap:
+            _apply_ma_cap_lifetime(state, schedule.get_rates(month_index_last), retirement_sum)
+        # set key to "final" if it is the last year
+        key = strings.FINAL if i == (n_years - 1) else str(i + 1)
+        values[key] = _format_lifetime_change(
+            state, salary_year if month_index_last < month_index_retirement else 0.0, bonus)
+
+    return {
+        strings.VALUES: values,
+    }
@@ -1,8 +1,11 @@
 import datetime as dt
-import functools
 import logging
+from typing import Iterator, Tuple
 
-from . import constants, cpfhelpers, genhelpers
+import numpy as np
+
+from . import batch, cache, constants, cpfhelpers, genhelpers, timeline
+from .state import ProjectionState
 from utils import strings
 
 logger = logging.getLogger(__name__)
@@ -11,15 +14,39 @@ logger = logging.getLogger(__name__)
 Main file serving as the entry point to the CPF module.
 """
 
+# number of decimal places solved for, and the initial and maximum upper bounds, of each goal seek variable
+_GOAL_SEEK_DIGITS = {
+    strings.OA_TOPUP: 2,
+    strings.SA_TOPUP: 2,
+    strings.MA_TOPUP: 2,
+    strings.PARAM_YOY_INCREASE_SALARY: 4,
+}
+_GOAL_SEEK_INITIAL_UPPER = {
+    strings.OA_TOPUP: 100,
+    strings.SA_TOPUP: 100,
+    strings.MA_TOPUP: 100,
+    strings.PARAM_YOY_INCREASE_SALARY: 0.05,
+}
+_GOAL_SEEK_MAX_UPPER = {
+    strings.OA_TOPUP: 1000000,
+    strings.SA_TOPUP: 1000000,
+    strings.MA_TOPUP: 1000000,
+    strings.PARAM_YOY_INCREASE_SALARY: 1,
+}
+
 def calc_cpf_contribution(salary: float,
                           bonus: float,
                           dob: str,
                           period: str,
+                          precision: str = strings.FAST,
                           age: int = None) -> dict:
     """Calculates the CPF contribution for the year/month.
     
     Takes into account the Ordinary Wage (OW) Ceiling and Additional Wage (AW) Ceiling.
 
+    Contributions are computed exactly in integer cents in both precision modes; in exact mode,
+    they are also returned through Decimals, so the amounts are always formatted to the cent.
+
     Reference: <https://www.cpf.gov.sg/Assets/employers/Documents/Table%201_Pte%20and%20Npen%20CPF%20contribution%20rates%20for%20Singapore%20Citizens%20and%203rd%20year%20SPR%20Jan%202016.pdf>
 
     Steps for calculation:
@@ -32,6 +59,7 @@ def calc_cpf_contribution(salary: float,
         bonus (float): Bonus represented as a multiplier of monthly salary
         dob (str): Date of birth of employee in YYYYMM format
         period (str): Time period of contribution; either "year" or "month"
+        precision (str): Either "fast" (floats) or "exact" (Decimals)
         age (int): Age of employee (*only used for testing purposes*)
 
     Returns a dict:
@@ -43,44 +71,20 @@ def calc_cpf_contribution(salary: float,
         age = genhelpers._get_age(dob)
 
     cont_rates = cpfhelpers._get_contribution_rates(salary / 12, age)
-    cont_total, cont_employee = 0, 0
-
-    if period == strings.MONTH:
-        cont_total += cpfhelpers._get_monthly_contribution_amount(
-            salary / 12,
-            bonus,
-            age,
-            entity=strings.COMBINED)
-        cont_employee += cpfhelpers._get_monthly_contribution_amount(
-            salary / 12,
-            bonus,
-            age,
-            entity=strings.EMPLOYEE)
-    elif period == strings.YEAR:
-        for i in range(1, 13):
-            # default `bonus_in_month` to only be applicable in Dec
-            bonus_in_month = bonus if i == 12 else 0
-
-            cont_total += cpfhelpers._get_monthly_contribution_amount(
-                salary / 12,
-                bonus_in_month,
-                age,
-                entity=strings.COMBINED)
-            cont_employee += cpfhelpers._get_monthly_contribution_amount(
-                salary / 12,
-                bonus_in_month,
-                age,
-                entity=strings.EMPLOYEE)
+    cont_employee, cont_employer = cpfhelpers._get_contribution_amounts(salary, bonus, age, period)
+    if precision == strings.EXACT:
+        # the amounts are whole cents, so they convert back into cents without any loss
+        cont_employee = genhelpers._cents_to_decimal(genhelpers._to_cents(cont_employee))
+        cont_employer = genhelpers._cents_to_decimal(genhelpers._to_cents(cont_employer))
 
     return {
         strings.VALUES: {
-            strings.CONT_EMPLOYEE: str(round(cont_employee, 2)), 
-            strings.CONT_EMPLOYER: str(round(cont_total - cont_employee, 2)),
+            strings.CONT_EMPLOYEE: genhelpers._format_amount(cont_employee),
+            strings.CONT_EMPLOYER: genhelpers._format_amount(cont_employer),
         },
         strings.RATES: cont_rates,
     }
 
-@functools.lru_cache(maxsize=100)
 def calc_cpf_allocation(salary: float,
                         bonus: float,
                         dob: str,
@@ -108,25 +112,14 @@ def calc_cpf_allocation(salary: float,
     if age is None:
         age = genhelpers._get_age(dob)
 
-    # get contribution amount for the month first
-    cont_monthly = cpfhelpers._get_monthly_contribution_amount(
-        salary / 12,
+    # get the individual amounts allocated to each account in the month
+    oa_alloc, sa_alloc, ma_alloc = cpfhelpers._get_allocation_amounts(
+        salary,
         bonus,
-        age,
-        entity=strings.COMBINED)
-    logger.info(f'Total CPF monthly contribution is {cont_monthly}')
-
-    # then, get the individual amounts allocated to each account
-    sa_alloc = cpfhelpers._get_allocation_amount(
-        age,
-        cont_monthly,
-        account=strings.SA)
-    ma_alloc = cpfhelpers._get_allocation_amount(
-        age,
-        cont_monthly,
-        account=strings.MA)
-    oa_alloc = cont_monthly - sa_alloc - ma_alloc
-    logger.debug(f'Allocation amounts: OA = {round(oa_alloc, 2)}, SA = {sa_alloc}, MA = {ma_alloc}')
+        genhelpers._get_age_bracket_index(age, strings.CONTRIBUTION),
+        genhelpers._get_age_bracket_index(age, strings.ALLOCATION))
+
+    logger.debug(f'Allocation cache: {cache.ALLOCATION_CACHE.stats()}')
 
     # get the allocation rates
     alloc_rates = cpfhelpers._get_allocation_rates(age)
@@ -149,12 +142,20 @@ def calc_cpf_projection(salary: float,
                         n_years: int,
                         target_year: int,
                         account_deltas: list,
+                        checkpoint_years: list = None,
+                        checkpoint: dict = None,
+                        precision: str = strings.FAST,
+                        ma_cap: bool = False,
                         age: int = None,
                         proj_start_date: dt = None) -> dict: 
     """Calculates the projected account balance in the CPF accounts after `n_years` or in `target_year`.
 
     Reference <https://www.cpf.gov.sg/Assets/common/Documents/InterestRate.pdf/>
 
+    In "fast" mode, balances and interest are kept as floats. In "exact" mode, they are kept as
+    Decimals, and interest is computed on the exact rates, for audit-grade results at a fraction of
+    the throughput (see `precision.compare_precision` for the deviation between the two modes).
+
     Args:
         salary (float): Annual salary of employee
         bonus (float): Bonus represented as a multiplier of monthly salary
@@ -168,6 +169,10 @@ def calc_cpf_projection(salary: float,
         n_years (int): Number of years into the future to project
         target_year (int): Target end year of projection
         account_deltas (list): List of topups/withdrawals to be made to the accounts
+        checkpoint_years (list): Years (1, 2, ...) at the end of which to create a checkpoint
+        checkpoint (dict): Checkpoint to resume the projection from, in place of `base_cpf` and `account_deltas`
+        precision (str): Either "fast" (floats) or "exact" (Decimals)
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum (see `cpfhelpers._apply_ma_cap`)
         age (int): Age of employee (*only used for testing purposes*)
         proj_start_date (date): Starting date of projection (*only used for testing purposes*)
 
@@ -175,56 +180,605 @@ def calc_cpf_projection(salary: float,
         - `values`: a dict containing keys (1, 2, ..., "final") corresponding 
                     to n projected years, where each child object contains the
                     OA, SA, MA balances at the end of that year as well as the
-                    interest accumulated in OA, SA, MA in that year  
+                    interest accumulated in OA, SA, MA in that year;
+                    if resumed from a checkpoint, keys continue from the year of the checkpoint
+        - `checkpoints`: a dict containing the checkpoints created at the end of `checkpoint_years`,
+                         keyed by the same keys as `values` (only if `checkpoint_years` is specified)
     """
     
+    values, checkpoints = {}, {}
+
+    state, deltas_index, schedule, month_index_start, n_years_prev, n_years = _setup_projection(
+        dob, base_cpf, n_years, target_year, account_deltas, checkpoint, proj_start_date, precision, ma_cap)
+    months = _iter_projection(
+        salary,
+        bonus,
+        yoy_increase_salary,
+        state,
+        schedule,
+        deltas_index,
+        bonus_month,
+        n_years,
+        month_index_start,
+        n_years_prev)
+
+    for i, month_index, salary_proj in months:
+        if month_index % 12 != 11:
+            continue
+
+        # set key to "final" if it is the last year
+        key = strings.FINAL if i == (n_years - 1) else str(n_years_prev + i + 1)
+        values[key] = cpfhelpers._format_annual_change(state, salary_proj, bonus)
+
+        if checkpoint_years is not None and (n_years_prev + i + 1) in checkpoint_years:
+            checkpoints[key] = cpfhelpers._create_checkpoint(state, month_index + 1, n_years_prev + i + 1, deltas_index)
+
+    results = {
+        strings.VALUES: values,
+    }
+    if checkpoint_years is not None:
+        results[strings.CHECKPOINTS] = checkpoints
+
+    return results
+
+def iter_cpf_projection(salary: float,
+                        bonus: float,
+                        yoy_increase_salary: float,
+                        dob: str,
+                        base_cpf: dict,
+                        bonus_month: int,
+                        n_years: int,
+                        target_year: int,
+                        account_deltas: list,
+                        period: str = strings.YEAR,
+                        checkpoint: dict = None,
+                        ma_cap: bool = False,
+                        proj_start_date: dt = None) -> Iterator[Tuple[str, dict]]:
+    """Generator variant of `calc_cpf_projection` that yields the projected values as they are computed.
+
+    Nothing is retained between yields, so the caller can stop iterating as soon as it has the
+    values it needs, e.g. once a balance crosses a threshold.
+
+    Args:
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        yoy_increase_salary (float): Projected year-on-year percentage increase in salary
+        dob (str): Date of birth of employee in YYYYMM format
+        base_cpf (dict): Contains the current balance in the CPF accounts
+        bonus_month (int): Month where bonus is received (1-12)
+        n_years (int): Number of years into the future to project
+        target_year (int): Target end year of projection
+        account_deltas (list): List of topups/withdrawals to be made to the accounts
+        period (str): Either "year" or "month"; determines how often values are yielded
+        checkpoint (dict): Checkpoint to resume the projection from, in place of `base_cpf` and `account_deltas`
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum (see `cpfhelpers._apply_ma_cap`)
+        proj_start_date (date): Starting date of projection (*only used for testing purposes*)
+
+    Yields a tuple of (key, values):
+        - if `period` is "year": key is the same as in `calc_cpf_projection`, and values are
+          the balances at the end of the year and the interest earned in the year
+        - if `period` is "month": key is the month in YYYYMM format, and values are the balances
+          at the end of the month and the interest accumulated in the year so far; interest is only
+          credited into the balances in December, and years without any contributions or account
+          deltas are only yielded once for December
+    """
+
+    state, deltas_index, schedule, month_index_start, n_years_prev, n_years = _setup_projection(
+        dob, base_cpf, n_years, target_year, account_deltas, checkpoint, proj_start_date, ma_cap=ma_cap)
+    months = _iter_projection(
+        salary,
+        bonus,
+        yoy_increase_salary,
+        state,
+        schedule,
+        deltas_index,
+        bonus_month,
+        n_years,
+        month_index_start,
+        n_years_prev)
+
+    for i, month_index, salary_proj in months:
+        if period == strings.MONTH:
+            yield genhelpers._get_period(month_index), cpfhelpers._format_annual_change(state, salary_proj, bonus)
+        elif period == strings.YEAR and month_index % 12 == 11:
+            # set key to "final" if it is the last year
+            key = strings.FINAL if i == (n_years - 1) else str(n_years_prev + i + 1)
+            yield key, cpfhelpers._format_annual_change(state, salary_proj, bonus)
+
+def calc_cpf_projection_sweep(salary: float,
+                              bonus_grid: list,
+                              yoy_increase_salary_grid: list,
+                              dob: str,
+                              base_cpf: dict,
+                              bonus_month: int,
+                              n_years: int,
+                              target_year: int,
+                              account_deltas: list,
+                              ma_cap: bool = False,
+                              proj_start_date: dt = None) -> dict:
+    """Calculates the projected account balances in the CPF accounts for every combination of
+    bonus and year-on-year salary increase in the given grids.
+
+    Equivalent to calling `calc_cpf_projection` once per combination, but the account deltas and
+    age schedule are only prepared once, and all combinations are simulated together with the
+    vectorised engine in `batch`.
+
+    Args:
+        salary (float): Annual salary of employee
+        bonus_grid (list): Bonuses represented as a multiplier of monthly salary
+        yoy_increase_salary_grid (list): Projected year-on-year percentage increases in salary
+        dob (str): Date of birth of employee in YYYYMM format
+        base_cpf (dict): Contains the current balance in the CPF accounts
+            - `oa`: current amount in OA
+            - `sa`: current amount in SA
+            - `ma`: current amount in MA
+        bonus_month (int): Month where bonus is received (1-12)
+        n_years (int): Number of years into the future to project
+        target_year (int): Target end year of projection
+        account_deltas (list): List of topups/withdrawals to be made to the accounts
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum (see `cpfhelpers._apply_ma_cap`)
+        proj_start_date (date): Starting date of projection (*only used for testing purposes*)
+
+    Returns a dict:
+        - `bonus_grid`: the bonuses swept over
+        - `yoy_increase_salary_grid`: the year-on-year salary increases swept over
+        - `values`: a dict containing keys (1, 2, ..., "final") corresponding to n projected years,
+                    where each child object contains the age at the end of that year, and the OA,
+                    SA, MA balances at the end of that year as a matrix, with one row per
+                    year-on-year salary increase and one column per bonus
+    """
+
+    state, deltas_index, schedule, month_index_start, _, n_years = _setup_projection(
+        dob, base_cpf, n_years, target_year, account_deltas, proj_start_date=proj_start_date)
+    logger.info(f'calc_cpf_projection_sweep() - {len(yoy_increase_salary_grid)} x {len(bonus_grid)} scenarios')
+
+    # one column per combination, with the bonus varying fastest
+    yoy_increase_salary = np.repeat(np.asarray(yoy_increase_salary_grid, dtype=float), len(bonus_grid))
+    bonus = np.tile(np.asarray(bonus_grid, dtype=float), len(yoy_increase_salary_grid))
+    salary_paths = np.array([salary * np.power(1 + yoy_increase_salary, i) for i in range(n_years)])
+
+    results_batch = batch._project_paths(
+        salary_paths,
+        np.broadcast_to(bonus, salary_paths.shape),
+        [dob] * len(bonus),
+        state.oa,
+        state.sa,
+        state.ma,
+        bonus_month=bonus_month,
+        proj_start_date=dt.date(month_index_start // 12, month_index_start % 12 + 1, 1),
+        deltas_index=deltas_index,
+        ma_cap=ma_cap)
+
     values = {}
-    
-    # get base amounts in OA, SA, MA
-    oa, sa, ma = float(base_cpf[strings.OA]), float(base_cpf[strings.SA]), float(base_cpf[strings.MA])
-    # get number of years to project for
-    n_years = genhelpers._get_num_projection_years(target_year) if n_years is None else n_years
-    # decompress recurring deltas
-    account_deltas = genhelpers._decompress_account_deltas(account_deltas)
+    for i in range(n_years):
+        # set key to "final" if it is the last year
+        key = strings.FINAL if i == (n_years - 1) else str(i + 1)
+        age, _, _ = schedule.get((month_index_start // 12 + i) * 12 + 11)
+        values[key] = {strings.AGE: str(age)}
+        for account in [strings.OA, strings.SA, strings.MA]:
+            balances = results_batch[account][i].reshape(len(yoy_increase_salary_grid), len(bonus_grid))
+            values[key][account] = [[str(round(e, 2)) for e in row] for row in balances]
+
+    return {
+        strings.PARAM_BONUS_GRID: list(bonus_grid),
+        strings.PARAM_YOY_INCREASE_SALARY_GRID: list(yoy_increase_salary_grid),
+        strings.VALUES: values,
+    }
+
+def calc_cpf_projection_household(members: list,
+                                  transfers: list,
+                                  n_years: int,
+                                  target_year: int,
+                                  proj_start_date: dt = None) -> dict:
+    """Calculates the projected account balances in the CPF accounts of every member of a household,
+    and of the household as a whole.
+
+    Equivalent to calling `calc_cpf_projection` once per member, but all members are advanced
+    year by year in one loop that shares the projection period and the rates in force in every month.
+    Transfers between members are split into the account deltas of the giving and receiving members
+    (see `genhelpers._split_transfers`).
+
+    Args:
+        members (list): Members of the household, where each member is a dict:
+            - `salary`: Annual salary of the member
+            - `bonus`: Bonus represented as a multiplier of monthly salary; defaults to 0
+            - `yoy_increase_salary`: Projected year-on-year percentage increase in salary; defaults to 0
+            - `dob`: Date of birth of the member in YYYYMM format
+            - `base_cpf`: Contains the current balance in the CPF accounts of the member
+            - `bonus_month`: Month where bonus is received (1-12); defaults to 12
+            - `account_deltas`: List of topups/withdrawals to be made to the accounts of the member
+        transfers (list): List of transfers between members, e.g. SA top-ups to a spouse from the OA
+        n_years (int): Number of years into the future to project
+        target_year (int): Target end year of projection
+        proj_start_date (date): Starting date of projection (*only used for testing purposes*)
+
+    Returns a dict:
+        - `values`: a dict containing keys (1, 2, ..., "final") corresponding to n projected years,
+                    where each child object contains:
+            - `members`: the values of each member at the end of that year, as in `calc_cpf_projection`
+            - `total`: the sum of the salaries, balances and interest of all members
+    """
+
+    if proj_start_date is None:
+        proj_start_date = dt.date.today()
+    month_index_start = genhelpers._get_month_index(proj_start_date.year, proj_start_date.month)
+    if n_years is None:
+        n_years = genhelpers._get_num_projection_years(target_year, month_index_start // 12)
+    n_months = n_years * 12 - month_index_start % 12
+    logger.info(f'calc_cpf_projection_household() - {len(members)} members')
+
+    # the rates in force in every month are shared by all members
+    rate_sets = timeline.TIMELINE.build_schedule(month_index_start, n_months)
+    transfer_deltas = genhelpers._split_transfers(transfers, len(members))
+
+    states, schedules, deltas_indexes = [], [], []
+    for member, member_transfer_deltas in zip(members, transfer_deltas):
+        base_cpf = member[strings.PARAM_BASE_CPF]
+        states.append(ProjectionState(float(base_cpf[strings.OA]), float(base_cpf[strings.SA]), float(base_cpf[strings.MA])))
+        schedules.append(genhelpers._build_age_schedule(
+            member[strings.PARAM_DOB], month_index_start, n_months, rate_sets=rate_sets))
+        deltas_indexes.append(genhelpers._index_account_deltas(
+            member.get(strings.PARAM_ACCOUNT_DELTAS, []) + member_transfer_deltas))
+
+    values = {}
+    year_start, month_start = month_index_start // 12, month_index_start % 12 + 1
 
     for i in range(n_years):
+        # the first year starts from the starting month; the subsequent years start from January
+        date_start = dt.date(year_start + i, month_start if i == 0 else 1, 1)
+        values_members, salary_total = [], 0
+
+        for member, state, schedule, deltas_index in zip(members, states, schedules, deltas_indexes):
+            yoy_increase_salary = float(member.get(strings.PARAM_YOY_INCREASE_SALARY, 0))
+            salary_proj = float(member[strings.PARAM_SALARY]) * pow(1 + yoy_increase_salary, i)
+            bonus = float(member.get(strings.PARAM_BONUS, 0))
+            cpfhelpers._calc_annual_change(
+                state,
+                salary_proj,
+                bonus,
+                schedule,
+                deltas_index,
+                int(member.get(strings.PARAM_BONUS_MONTH, 12)),
+                date_start)
+            values_members.append(cpfhelpers._format_annual_change(state, salary_proj, bonus))
+            salary_total += salary_proj
+
+        # set key to "final" if it is the last year
+        key = strings.FINAL if i == (n_years - 1) else str(i + 1)
+        values[key] = {
+            strings.PARAM_MEMBERS: values_members,
+            strings.TOTAL: {
+                strings.PARAM_SALARY: str(round(salary_total, 2)),
+                **{attr: genhelpers._format_amount(sum(getattr(state, attr) for state in states))
+                   for attr in [strings.OA, strings.SA, strings.MA,
+                                strings.OA_INTEREST, strings.SA_INTEREST, strings.MA_INTEREST]},
+            },
+        }
+
+    return {
+        strings.VALUES: values,
+    }
+
+def calc_cpf_goal_seek(salary: float,
+                       bonus: float,
+                       yoy_increase_salary: float,
+                       dob: str,
+                       base_cpf: dict,
+                       bonus_month: int,
+                       account_deltas: list,
+                       variable: str,
+                       target_account: str,
+                       target_amount: float,
+                       target_year: int,
+                       target_age: int = None,
+                       topup_start: str = None,
+                       max_evaluations: int = 64,
+                       ma_cap: bool = False,
+                       proj_start_date: dt = None) -> dict:
+    """Finds the smallest value of an input for which the projected balance reaches a target.
+
+    The input is either a monthly topup made from `topup_start` to the end of the target year, or
+    the year-on-year increase in salary. Projected balances never decrease as the input increases,
+    so the solution is bracketed and then bisected over a grid of `_GOAL_SEEK_DIGITS` decimal places.
+    The bracket never grows past `_GOAL_SEEK_MAX_UPPER`; a target that is still not reached there is
+    reported as unreachable.
+
+    Each evaluation is a projection that starts from the state just before the first year affected
+    by the input, which is computed only once, and ends at the target year. It exits early once the
+    target is reached if the balance can no longer fall below it.
+
+    Args:
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        yoy_increase_salary (float): Projected year-on-year percentage increase in salary;
+            ignored if it is the `variable` to solve for
+        dob (str): Date of birth of employee in YYYYMM format
+        base_cpf (dict): Contains the current balance in the CPF accounts
+            - `oa`: current amount in OA
+            - `sa`: current amount in SA
+            - `ma`: current amount in MA
+        bonus_month (int): Month where bonus is received (1-12)
+        account_deltas (list): List of topups/withdrawals to be made to the accounts
+        variable (str): Input to solve for; one of "oa_topup", "sa_topup", "ma_topup" or "yoy_increase_salary"
+        target_account (str): Account whose balance is targeted; one of "oa", "sa", "ma" or "total"
+        target_amount (float): Target balance at the end of the target year
+        target_year (int): Target year of projection
+        target_age (int): Target age of employee, in place of `target_year`; the target year is
+            the first year at the end of which the employee is of this age
+        topup_start (str): First month of the monthly topup in YYYYMM format; defaults to the
+            start of the projection
+        max_evaluations (int): Maximum number of projections to run
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum (see `cpfhelpers._apply_ma_cap`)
+        proj_start_date (date): Starting date of projection (*only used for testing purposes*)
+
+    Returns a dict:
+        - `variable`: the input solved for
+        - `value`: the smallest value of the input found to reach the target, or None if not converged
+        - `converged`: whether the solution was found within `max_evaluations` projections; False
+                       if the target is unreachable, e.g. an MA target above the BHS with `ma_cap`,
+                       or the target year is already over
+        - `n_evaluations`: the number of projections run, which never exceeds `max_evaluations`
+        - `values`: the projected values at the end of the target year for `value`, in the same
+                    format as the values of each year in `calc_cpf_projection`, or None if not converged
+    """
+
+    if target_year is None:
+        target_year = genhelpers._get_year_at_age(dob, target_age)
+
+    state, deltas_index, schedule, month_index_start, _, n_years = _setup_projection(
+        dob, base_cpf, None, target_year, account_deltas, proj_start_date=proj_start_date, ma_cap=ma_cap)
+    logger.info(f'calc_cpf_goal_seek() - solving for {variable} to reach {target_amount} in {target_account}')
+
+    result = {
+        strings.VARIABLE: variable,
+        strings.VALUE: None,
+        strings.CONVERGED: False,
+        strings.N_EVALUATIONS: 0,
+        strings.VALUES: None,
+    }
+    if n_years < 1:
+        logger.error(f'calc_cpf_goal_seek() - target year {target_year} is already over')
+        return result
+    if ma_cap and target_account == strings.MA and target_amount > schedule.get_rates(target_year * 12 + 11).bhs:
+        logger.error(f'calc_cpf_goal_seek() - target of {target_amount} in MA is above the BHS')
+        return result
+
+    # find the first year affected by the variable; years before that are only projected once
+    if variable == strings.PARAM_YOY_INCREASE_SALARY:
+        n_years_prefix = 1
+    else:
+        month_index_topup = month_index_start
+        if topup_start is not None:
+            month_index_topup = max(genhelpers._get_month_index(int(topup_start[:4]), int(topup_start[4:6])),
+                                    month_index_start)
+        n_years_prefix = month_index_topup // 12 - month_index_start // 12
+        topup_delta = {
+            strings.TYPE: variable,
+            strings.PERIOD: genhelpers._get_period(month_index_topup),
+            strings.IS_SA_TOPUP_FROM_OA: False,
+            strings.RECURRENCE: {
+                strings.FREQUENCY: strings.MONTHLY,
+                strings.DURATION: str(target_year * 12 + 11 - month_index_topup + 1),
+            },
+        }
+    n_years_prefix = min(n_years_prefix, n_years - 1)
+
+    months = _iter_projection(salary, bonus, yoy_increase_salary, state, schedule, deltas_index,
+                              bonus_month, n_years_prefix, month_index_start, 0)
+    for _ in months:
+        pass
+    month_index_resume = month_index_start if n_years_prefix == 0 else (month_index_start // 12 + n_years_prefix) * 12
+    is_monotonic = not genhelpers._has_decreasing_deltas(deltas_index, target_account)
+
+    digits = _GOAL_SEEK_DIGITS[variable]
+    n_evaluations = 0
+
+    def _evaluate(units: int, early_exit: bool = True) -> Tuple[float, ProjectionState, float]:
+        """Projects up to the target year with the variable set to `units` / 10^`digits`, returning
+        the targeted balance, the projection state and the projected salary at the point of exit."""
+
+        nonlocal n_evaluations
+        n_evaluations += 1
+        value = round(units / 10 ** digits, digits)
+
+        state_eval = state.copy()
+        deltas_index_eval, yoy_increase_salary_eval = deltas_index, yoy_increase_salary
+        if variable == strings.PARAM_YOY_INCREASE_SALARY:
+            yoy_increase_salary_eval = value
+        else:
+            deltas_index_eval = genhelpers._index_account_deltas(
+                account_deltas + [{**topup_delta, strings.AMOUNT: str(value)}])
+
+        months = _iter_projection(salary, bonus, yoy_increase_salary_eval, state_eval, schedule, deltas_index_eval,
+                                  bonus_month, n_years - n_years_prefix, month_index_resume, n_years_prefix)
+        for _, _, salary_proj in months:
+            balance = _get_target_balance(state_eval, target_account)
+            if early_exit and is_monotonic and balance >= target_amount:
+                break
+
+        return balance, state_eval, salary_proj
+
+    # bracket the solution between `units_low`, which falls short, and `units_high`, which reaches the target;
+    # values are counted in units of the last decimal place, and the variable cannot be negative.
+    # One evaluation is kept in reserve for the final projection of the solution
+    units_low, units_high = -1, 0
+    units_max = _GOAL_SEEK_MAX_UPPER[variable] * 10 ** digits
+    converged = True
+    while True:
+        if n_evaluations >= max_evaluations - 1:
+            converged = False
+            break
+        if _evaluate(units_high)[0] >= target_amount:
+            break
+        if units_high >= units_max:
+            logger.info(f'calc_cpf_goal_seek() - target is unreachable with {variable} up to {units_max}')
+            converged = False
+            break
+        units_low, units_high = units_high, min(max(units_high * 2, _GOAL_SEEK_INITIAL_UPPER[variable] * 10 ** digits),
+                                                units_max)
+
+    # bisect down to a single unit
+    while converged and units_high - units_low > 1:
+        if n_evaluations >= max_evaluations - 1:
+            converged = False
+            break
+        units_mid = (units_low + units_high) // 2
+        if _evaluate(units_mid)[0] < target_amount:
+            units_low = units_mid
+        else:
+            units_high = units_mid
+
+    result[strings.CONVERGED] = converged
+    if converged:
+        _, state_final, salary_proj = _evaluate(units_high, early_exit=False)
+        result[strings.VALUE] = str(round(units_high / 10 ** digits, digits))
+        result[strings.VALUES] = cpfhelpers._format_annual_change(
+            state_final,
+            salary_proj,
+            bonus)
+    result[strings.N_EVALUATIONS] = n_evaluations
+
+    return result
+
+def _get_target_balance(state: ProjectionState,
+                        target_account: str) -> float:
+    """Returns the balance of the targeted account, or of all 3 accounts if the target is "total"."""
+
+    if target_account == strings.TOTAL:
+        return state.oa + state.sa + state.ma
+    return getattr(state, target_account)
+
+def _setup_projection(dob: str,
+                      base_cpf: dict,
+                      n_years: int,
+                      target_year: int,
+                      account_deltas: list,
+                      checkpoint: dict = None,
+                      proj_start_date: dt = None,
+                      precision: str = strings.FAST,
+                      ma_cap: bool = False) \
+                      -> Tuple[ProjectionState, genhelpers.AccountDeltaIndex, genhelpers.AgeSchedule, int, int, int]:
+    """Sets up the projection engine, either from the base balances or from a checkpoint.
+
+    Args:
+        dob (str): Date of birth of employee in YYYYMM format
+        base_cpf (dict): Contains the current balance in the CPF accounts
+        n_years (int): Number of years into the future to project
+        target_year (int): Target end year of projection
+        account_deltas (list): List of topups/withdrawals to be made to the accounts
+        checkpoint (dict): Checkpoint to resume the projection from
+        proj_start_date (date): Starting date of projection
+        precision (str): Either "fast" (floats) or "exact" (Decimals)
+        ma_cap (bool): Whether to cap the MA at the Basic Healthcare Sum
+
+    Returns a tuple containing the projection state, the account deltas index, the age schedule,
+    the index of the first month to simulate, the number of years projected before this projection
+    and the number of years to project for.
+    """
+
+    exact = precision == strings.EXACT
+    if checkpoint is not None:
+        state, deltas_index, month_index_start, n_years_prev = cpfhelpers._restore_checkpoint(checkpoint, exact)
+    else:
+        # get base amounts in OA, SA, MA
+        to_amount = genhelpers._to_decimal if exact else float
+        state = ProjectionState(
+            to_amount(base_cpf[strings.OA]),
+            to_amount(base_cpf[strings.SA]),
+            to_amount(base_cpf[strings.MA]),
+            exact=exact)
+        # index the deltas by month; recurring deltas are evaluated lazily
+        deltas_index = genhelpers._index_account_deltas(account_deltas)
+
+        if proj_start_date is None:
+            proj_start_date = dt.date.today()
+        month_index_start = genhelpers._get_month_index(proj_start_date.year, proj_start_date.month)
+        n_years_prev = 0
+    state.ma_cap = ma_cap
+
+    # get number of years to project for
+    if n_years is None:
+        n_years = genhelpers._get_num_projection_years(target_year, month_index_start // 12)
+    # precompute the age, age brackets and rates in every month of the projection
+    schedule = genhelpers._build_age_schedule(
+        dob,
+        month_index_start,
+        n_years * 12 - month_index_start % 12)
+
+    return state, deltas_index, schedule, month_index_start, n_years_prev, n_years
+
+def _iter_projection(salary: float,
+                     bonus: float,
+                     yoy_increase_salary: float,
+                     state: ProjectionState,
+                     schedule: genhelpers.AgeSchedule,
+                     deltas_index: genhelpers.AccountDeltaIndex,
+                     bonus_month: int,
+                     n_years: int,
+                     month_index_start: int,
+                     n_years_prev: int) -> Iterator[Tuple[int, int, float]]:
+    """Runs the projection engine, yielding after every simulated month (see `cpfhelpers._iter_annual_change`).
+
+    Runs of years without any contributions or account deltas are fast-forwarded together, and only
+    yield for December of each year (see `cpfhelpers._fast_forward_years`).
+
+    Args:
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        yoy_increase_salary (float): Projected year-on-year percentage increase in salary
+        state (ProjectionState): Current projection state; updated in place
+        schedule (AgeSchedule): Age, age brackets and rates of employee by month
+        deltas_index (AccountDeltaIndex): Index of the account deltas by month
+        bonus_month (int): Month where bonus is received (1-12)
+        n_years (int): Number of years to project for
+        month_index_start (int): Index of the first month to simulate
+        n_years_prev (int): Number of years projected before the first month
+
+    Yields a tuple containing the index of the year in this projection (0, 1, ...), the index of
+    the month just simulated and the projected annual salary in the year.
+    """
+
+    year_start, month_start = month_index_start // 12, month_index_start % 12 + 1
+
+    i = 0
+    while i < n_years:
+        # runs of years without any contributions or account deltas are fast-forwarded together
+        n_years_run = 0
+        while (i + n_years_run < n_years
+               and cpfhelpers._is_contribution_free(salary * pow(1 + yoy_increase_salary, n_years_prev + i + n_years_run))
+               and not deltas_index.has_deltas_between((year_start + i + n_years_run) * 12,
+                                                       (year_start + i + n_years_run) * 12 + 11)):
+            n_years_run += 1
+
+        if n_years_run > 0:
+            month_index_run = month_index_start if i == 0 else (year_start + i) * 12
+            logger.debug(f'Years {n_years_prev + i + 1} to {n_years_prev + i + n_years_run} projection, fast-forwarding')
+            months = cpfhelpers._fast_forward_years(state, schedule, month_index_run, n_years_run)
+            for j, month_index in enumerate(months):
+                yield i + j, month_index, salary * pow(1 + yoy_increase_salary, n_years_prev + i + j)
+            i += n_years_run
+            continue
+
         if i == 0:
             # it is the first year, so the starting month would be different
             # default day to 1 as it is not used
-            if proj_start_date is not None:
-                date_start = dt.date(proj_start_date.year, proj_start_date.month, 1)
-            else:
-                date_start = dt.date(dt.date.today().year, dt.date.today().month, 1)
+            date_start = dt.date(year_start, month_start, 1)
         else:
             # for the subsequent years, start the count from January
-            date_start = dt.date(dt.date.today().year + i, 1, 1)
+            date_start = dt.date(year_start + i, 1, 1)
 
         # calculate projected salary for this year
-        salary_proj = salary * pow(1 + yoy_increase_salary, i)
-        # get the account deltas applicable in this year
-        account_deltas_year = [e for e in account_deltas if int(e[strings.PERIOD][:4]) == date_start.year]
+        salary_proj = salary * pow(1 + yoy_increase_salary, n_years_prev + i)
 
-        logger.debug(f'Year {i + 1} projection')
-        results_annual = cpfhelpers.calc_annual_change(
+        logger.debug(f'Year {n_years_prev + i + 1} projection')
+        months = cpfhelpers._iter_annual_change(
+            state,
             salary_proj,
             bonus,
-            dob,
-            oa,
-            sa,
-            ma,
-            account_deltas_year,
-            bonus_month, 
-            date_start=date_start)
-
-        # update with the new CPF account balances
-        oa = float(results_annual[strings.OA])
-        sa = float(results_annual[strings.SA])
-        ma = float(results_annual[strings.MA])
-
-        # set key to "final" if it is the last year
-        key = strings.FINAL if i == (n_years - 1) else str(i + 1)
-        values[key] = results_annual
-
-    return {
-        strings.VALUES: values,
-    }
+            schedule,
+            deltas_index,
+            bonus_month,
+            date_start)
+        for month_index in months:
+            yield i, month_index, salary_proj
+        i += 1
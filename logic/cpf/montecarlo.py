@@ -0,0 +1,214 @@
+import concurrent.futures
+import datetime as dt
+import logging
+import os
+
+import numpy as np
+
+from . import batch, constants, genhelpers
+from utils import strings
+
+logger = logging.getLogger(__name__)
+
+"""
+Monte Carlo CPF projections, where the salary growth, bonus and interest rates vary by scenario.
+
+Scenarios are simulated in fixed-size chunks with the vectorised engine in `batch`, and the chunks
+are spread across a process pool. Each chunk draws from its own child of the root seed, so results
+are reproducible for a given seed regardless of the number of workers.
+"""
+
+# number of scenarios simulated together in one task of the process pool
+_CHUNK_SIZE = 2500
+
+###############################################################################
+#                                   SAMPLING                                  #
+###############################################################################
+
+def _sample_paths(rng: np.random.Generator,
+                  salary: float,
+                  bonus: float,
+                  yoy_increase_salary: float,
+                  n_years: int,
+                  n_scenarios: int,
+                  salary_growth_volatility: float,
+                  bonus_volatility: float,
+                  int_rate_volatility: float) -> tuple:
+    """Samples the salary, bonus and interest rate paths of a number of scenarios.
+
+    - Salary growth in each year is normally distributed around `yoy_increase_salary`.
+    - Bonus in each year is lognormally distributed with a mean of `bonus`.
+    - Interest rates follow a random walk above the rates in `constants`, which are the
+      legislated minimums, so that rates never fall below them.
+
+    Args:
+        rng (Generator): Random number generator to draw from
+        salary (float): Annual salary of employee
+        bonus (float): Bonus represented as a multiplier of monthly salary
+        yoy_increase_salary (float): Mean year-on-year percentage increase in salary
+        n_years (int): Number of years to project
+        n_scenarios (int): Number of scenarios to sample
+        salary_growth_volatility (float): Standard deviation of the yearly salary growth
+        bonus_volatility (float): Standard deviation of the log of the bonus multiplier
+        int_rate_volatility (float): Standard deviation of the yearly change in interest rates
+
+    Returns a tuple containing the salary paths, bonus paths and a tuple of OA, SA and MA interest
+    rate paths, each with shape (`n_years`, `n_scenarios`).
+    """
+
+    shape = (n_years, n_scenarios)
+
+    # salary in the first year is known, so growth only applies from the second year onwards
+    growth = rng.normal(yoy_increase_salary, salary_growth_volatility, shape)
+    growth[0] = 0
+    salary_paths = salary * np.cumprod(np.maximum(1 + growth, 0), axis=0)
+
+    bonus_paths = bonus * rng.lognormal(-bonus_volatility ** 2 / 2, bonus_volatility, shape)
+
+    int_rate_excess = np.maximum(np.cumsum(rng.normal(0, int_rate_volatility, shape), axis=0), 0)
+    int_rate_paths = (constants.INT_RATE_OA + int_rate_excess,
+                      constants.INT_RATE_SA + int_rate_excess,
+                      constants.INT_RATE_MA + int_rate_excess)
+
+    return salary_paths, bonus_paths, int_rate_paths
+
+def _simulate_chunk(args: tuple) -> np.ndarray:
+    """Simulates one chunk of scenarios; runs in a worker of the process pool.
+
+    Args:
+        args (tuple): Seed of the chunk, number of scenarios in the chunk, followed by the
+            parameters shared by every chunk
+
+    Returns an array with shape (3, n_years, n_scenarios) holding the OA, SA and MA balances.
+    """
+
+    (seed, n_scenarios, salary, bonus, yoy_increase_salary, dob, base_cpf, bonus_month,
+     n_years, proj_start_date, salary_growth_volatility, bonus_volatility, int_rate_volatility) = args
+
+    rng = np.random.default_rng(seed)
+    salary_paths, bonus_paths, int_rate_paths = _sample_paths(
+        rng, salary, bonus, yoy_increase_salary, n_years, n_scenarios,
+        salary_growth_volatility, bonus_volatility, int_rate_volatility)
+
+    results = batch._project_paths(
+        salary_paths,
+        bonus_paths,
+        [dob] * n_scenarios,
+        base_cpf[strings.OA],
+        base_cpf[strings.SA],
+        base_cpf[strings.MA],
+        bonus_month=bonus_month,
+        proj_start_date=proj_start_date,
+        int_rate_paths=int_rate_paths)
+
+    return np.stack([results[strings.OA], results[strings.SA], results[strings.MA]])
+
+def _run_chunks(tasks: list,
+                n_workers: int) -> list:
+    """Runs the chunks of scenarios, in a process pool if more than one worker is requested.
+
+    Falls back to running in the current process if a process pool cannot be created, e.g. on
+    platforms without shared memory for the inter-process queues.
+
+    Args:
+        tasks (list): Arguments of `_simulate_chunk` for each chunk
+        n_workers (int): Maximum number of worker processes
+    """
+
+    n_workers = min(n_workers, len(tasks))
+    if n_workers > 1:
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+                return list(executor.map(_simulate_chunk, tasks))
+        except (OSError, NotImplementedError) as e:
+            logger.warning(f'Process pool unavailable, running scenarios serially: {e}')
+
+    return [_simulate_chunk(task) for task in tasks]
+
+###############################################################################
+#                                  MAIN METHOD                                #
+###############################################################################
+
+def calc_cpf_projection_montecarlo(salary: float,
+                                   bonus: float,
+                                   yoy_increase_salary: float,
+                                   dob: str,
+                                   base_cpf: dict,
+                                   bonus_month: int,
+                                   n_years: int,
+                                   target_year: int,
+                                   n_scenarios: int = 1000,
+                                   percentiles: list = (5, 25, 50, 75, 95),
+                                   seed: int = None,
+                                   salary_growth_volatility: float = 0.02,
+                                   bonus_volatility: float = 0.25,
+                                   int_rate_volatility: float = 0.0025,
+                                   n_workers: int = None,
+                                   proj_start_date: dt = None) -> dict:
+    """Calculates percentile bands of the projected CPF account balances over random scenarios.
+
+    Each scenario is a projection as in `main.calc_cpf_projection` without any account deltas,
+    but with the salary growth, bonus and interest rates sampled every year (see `_sample_paths`).
+
+    Args:
+        salary (float): Annual salary of employee
+        bonus (float): Mean bonus represented as a multiplier of monthly salary
+        yoy_increase_salary (float): Mean year-on-year percentage increase in salary
+        dob (str): Date of birth of employee in YYYYMM format
+        base_cpf (dict): Contains the current balance in the CPF accounts
+            - `oa`: current amount in OA
+            - `sa`: current amount in SA
+            - `ma`: current amount in MA
+        bonus_month (int): Month where bonus is received (1-12)
+        n_years (int): Number of years into the future to project
+        target_year (int): Target end year of projection
+        n_scenarios (int): Number of scenarios to simulate
+        percentiles (list): Percentiles (0-100) of the balances to return
+        seed (int): Seed of the random scenarios; results are reproducible for the same seed
+        salary_growth_volatility (float): Standard deviation of the yearly salary growth
+        bonus_volatility (float): Standard deviation of the log of the bonus multiplier
+        int_rate_volatility (float): Standard deviation of the yearly change in interest rates
+        n_workers (int): Maximum number of worker processes; defaults to the number of CPUs
+        proj_start_date (date): Starting date of projection; defaults to today
+
+    Returns a dict:
+        - `values`: a dict containing keys (1, 2, ..., "final") corresponding to n projected years,
+                    where each child object contains the age at the end of that year, and the
+                    percentiles of the OA, SA, MA and total balances keyed by percentile
+    """
+
+    if proj_start_date is None:
+        proj_start_date = dt.date.today()
+    # as in `main._setup_projection`, `n_years` takes precedence over `target_year`
+    if n_years is None:
+        n_years = genhelpers._get_num_projection_years(target_year, proj_start_date.year)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    logger.info(f'calc_cpf_projection_montecarlo() - {n_scenarios} scenarios over {n_years} years')
+
+    base_cpf = {account: float(base_cpf[account]) for account in [strings.OA, strings.SA, strings.MA]}
+    chunk_sizes = [min(_CHUNK_SIZE, n_scenarios - i) for i in range(0, n_scenarios, _CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(seed_chunk, n, salary, bonus, yoy_increase_salary, dob, base_cpf, bonus_month,
+              n_years, proj_start_date, salary_growth_volatility, bonus_volatility, int_rate_volatility)
+             for seed_chunk, n in zip(seeds, chunk_sizes)]
+
+    balances = np.concatenate(_run_chunks(tasks, n_workers), axis=2)
+    balances = np.concatenate([balances, balances.sum(axis=0, keepdims=True)])
+    bands = np.percentile(balances, percentiles, axis=2)
+
+    month_index_start = genhelpers._get_month_index(proj_start_date.year, proj_start_date.month)
+    month_index_end = genhelpers._get_month_index(proj_start_date.year + n_years - 1, 12)
+    schedule = genhelpers._build_age_schedule(dob, month_index_start, month_index_end - month_index_start + 1)
+
+    values = {}
+    for i in range(n_years):
+        # set key to "final" if it is the last year
+        key = strings.FINAL if i == (n_years - 1) else str(i + 1)
+        values[key] = {strings.AGE: str(schedule.get(month_index_start + 11 - month_index_start % 12 + 12 * i)[0])}
+        for j, account in enumerate([strings.OA, strings.SA, strings.MA, strings.TOTAL]):
+            values[key][account] = {str(p): str(round(bands[k][j][i], 2)) for k, p in enumerate(percentiles)}
+
+    return {
+        strings.VALUES: values,
+    }
@@ -0,0 +1,327 @@
+import argparse
+import collections
+import concurrent.futures
+import csv
+import datetime as dt
+import itertools
+import json
+import logging
+import sys
+from typing import IO, Iterable, Iterator
+
+from . import constants, cpfhelpers, genhelpers
+from .state import PayrollState
+from utils import strings
+
+logger = logging.getLogger(__name__)
+
+"""
+Streaming payroll mode, computing the CPF contributions of many employees in one run.
+
+Employee records are read from a CSV or NDJSON stream in fixed-size chunks, and the contributions
+of each chunk are written out before the next chunk is read, so memory stays constant regardless
+of the number of employees. Chunks may be sharded across a process pool.
+
+For wages that vary from month to month, `PayrollEngine` carries the year-to-date wages of each
+employee across monthly runs instead.
+
+Usage:
+    python -m logic.cpf.payroll --input employees.csv --output contributions.csv --workers 4
+"""
+
+FIELDS_OUT = [strings.PARAM_EMPLOYEE_ID, strings.CONT_EMPLOYEE, strings.CONT_EMPLOYER, strings.ERROR]
+
+###############################################################################
+#                                    STREAMS                                  #
+###############################################################################
+
+def _read_records(stream: IO,
+                  fmt: str) -> Iterator[dict]:
+    """Lazily reads employee records from a CSV (with a header row) or NDJSON stream.
+
+    Args:
+        stream (IO): Input stream
+        fmt (str): Either "csv" or "ndjson"
+    """
+
+    if fmt == strings.CSV:
+        yield from csv.DictReader(stream)
+    elif fmt == strings.NDJSON:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+def _write_records(stream: IO,
+                   fmt: str,
+                   records: Iterable[dict]) -> int:
+    """Writes the contribution records to a CSV or NDJSON stream as they are produced.
+
+    Args:
+        stream (IO): Output stream
+        fmt (str): Either "csv" or "ndjson"
+        records (Iterable): Contribution records to write
+
+    Returns the number of records written.
+    """
+
+    n_records = 0
+
+    if fmt == strings.CSV:
+        writer = csv.DictWriter(stream, fieldnames=FIELDS_OUT)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            n_records += 1
+    elif fmt == strings.NDJSON:
+        for record in records:
+            stream.write(json.dumps(record) + '\n')
+            n_records += 1
+
+    return n_records
+
+def _chunk(records: Iterable[dict],
+           chunk_size: int) -> Iterator[list]:
+    """Groups the records into lists of at most `chunk_size` records."""
+
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+###############################################################################
+#                                 CONTRIBUTIONS                               #
+###############################################################################
+
+def _calc_record(record: dict,
+                 period: str,
+                 payroll_date: dt) -> dict:
+    """Calculates the contributions of a single employee record.
+
+    Records that cannot be processed are not fatal to the run; the error is returned in the
+    `errors` field of the record instead.
+
+    Args:
+        record (dict): Employee record containing `employee_id`, `salary`, `bonus` and `dob`
+        period (str): Time period of contribution; either "year" or "month"
+        payroll_date (date): Date at which the age of the employee is determined
+    """
+
+    try:
+        age = genhelpers._get_age(str(record[strings.PARAM_DOB]), payroll_date)
+        cont_employee, cont_employer = cpfhelpers._get_contribution_amounts(
+            float(record[strings.PARAM_SALARY]),
+            float(record.get(strings.PARAM_BONUS) or 0),
+            age,
+            period)
+    except (KeyError, ValueError, TypeError) as e:
+        logger.error(f'Unable to process employee "{record.get(strings.PARAM_EMPLOYEE_ID)}": {e!r}')
+        return {
+            strings.PARAM_EMPLOYEE_ID: record.get(strings.PARAM_EMPLOYEE_ID),
+            strings.CONT_EMPLOYEE: None,
+            strings.CONT_EMPLOYER: None,
+            strings.ERROR: repr(e),
+        }
+
+    return {
+        strings.PARAM_EMPLOYEE_ID: record[strings.PARAM_EMPLOYEE_ID],
+        strings.CONT_EMPLOYEE: str(round(cont_employee, 2)),
+        strings.CONT_EMPLOYER: str(round(cont_employer, 2)),
+        strings.ERROR: None,
+    }
+
+def _calc_chunk(chunk: list,
+                period: str,
+                payroll_date: dt) -> list:
+    """Calculates the contributions of a chunk of employee records; runs in a worker of the process pool."""
+
+    return [_calc_record(record, period, payroll_date) for record in chunk]
+
+###############################################################################
+#                               YEAR-TO-DATE WAGES                            #
+###############################################################################
+
+class PayrollEngine(object):
+    """Computes monthly CPF contributions from the actual wages paid, carrying the year-to-date
+    Ordinary Wages (OW) and Additional Wages (AW) subject to CPF of each employee across months.
+
+    The AW Ceiling of a month is $102k less the OW subject to CPF in the year, and less the AW
+    already subject to CPF in the year. OW of the months that are yet to be paid is estimated
+    with the OW of the current month, so for a constant salary it matches the estimate in
+    `cpfhelpers._get_monthly_contribution_amount`. Each month is computed in O(1).
+
+    Months of each employee must be processed in order; the year-to-date wages are reset when
+    a new year starts.
+
+    Attributes:
+        states (dict): Maps an employee ID to the `PayrollState` of the employee
+    """
+
+    def __init__(self, states: dict = None):
+        self.states = states if states is not None else {}
+
+    def process(self,
+                employee_id: str,
+                amount_ow: float,
+                amount_aw: float,
+                dob: str,
+                year: int,
+                month: int) -> dict:
+        """Calculates the contributions of an employee in a month, and adds the wages to the year-to-date wages.
+
+        Args:
+            employee_id (str): ID of the employee
+            amount_ow (float): Ordinary wages paid in the month
+            amount_aw (float): Additional wages paid in the month
+            dob (str): Date of birth of employee in YYYYMM format
+            year (int): Year of the payroll
+            month (int): Month of the payroll (1-12)
+
+        Returns a dict:
+            - `cont_employee`: Amount contributed by the employee in the month
+            - `cont_employer`: Amount contributed by the employer in the month
+            - `ow`: OW subject to CPF in the year so far, including this month
+            - `aw`: AW subject to CPF in the year so far, including this month
+        """
+
+        # the row is validated before the year-to-date wages are touched, so a rejected row leaves them as they are
+        state = self.states.get(employee_id)
+        if state is not None and state.year == year and month <= state.month:
+            raise ValueError(f'Month {month}/{year} of employee "{employee_id}" has already been processed')
+
+        age = genhelpers._get_age(dob, dt.date(year, month, 1))
+        age_bracket = genhelpers._get_age_bracket_index(age, strings.CONTRIBUTION)
+        if state is None or state.year != year:
+            state = PayrollState(year)
+
+        amount_ow_eligible_for_cpf = min(amount_ow, constants.CEILING_OW)
+        # OW of the remaining months is estimated with the OW of this month
+        amount_ow_in_year = state.ow + amount_ow_eligible_for_cpf * (13 - month)
+        ceiling_aw = max(constants.CEILING_AW - amount_ow_in_year - state.aw, 0)
+
+        cont_total = cpfhelpers._get_contribution_amount_for_wages(
+            amount_ow, amount_aw, ceiling_aw, age_bracket, constants.ENTITY_COMBINED)
+        cont_employee = cpfhelpers._get_contribution_amount_for_wages(
+            amount_ow, amount_aw, ceiling_aw, age_bracket, constants.ENTITY_EMPLOYEE)
+
+        state.month = month
+        state.ow += amount_ow_eligible_for_cpf
+        state.aw += min(amount_aw, ceiling_aw)
+        self.states[employee_id] = state
+
+        return {
+            strings.CONT_EMPLOYEE: cont_employee,
+            strings.CONT_EMPLOYER: cont_total - cont_employee,
+            strings.OW: state.ow,
+            strings.AW: state.aw,
+        }
+
+    def to_dict(self) -> dict:
+        """Serializes the year-to-date wages of all employees, to be restored in the next monthly run."""
+
+        return {employee_id: [state.year, state.month, state.ow, state.aw]
+                for employee_id, state in self.states.items()}
+
+    @classmethod
+    def from_dict(cls, states: dict) -> 'PayrollEngine':
+        """Restores an engine from the output of `to_dict`."""
+
+        return cls({employee_id: PayrollState(*state) for employee_id, state in states.items()})
+
+###############################################################################
+#                                  MAIN METHOD                                #
+###############################################################################
+
+def run_payroll(records: Iterable[dict],
+                period: str = strings.MONTH,
+                payroll_date: dt = None,
+                chunk_size: int = 1000,
+                n_workers: int = 1) -> Iterator[dict]:
+    """Calculates the CPF contributions of a stream of employees, yielding results in input order.
+
+    Each record is evaluated as in `main.calc_cpf_contribution`. With more than one worker, at most
+    2 chunks per worker are in flight at any time, so memory stays bounded by the chunk size.
+
+    Args:
+        records (Iterable): Employee records containing `employee_id`, `salary` (annual), `bonus`
+            (multiplier of monthly salary) and `dob` (YYYYMM)
+        period (str): Time period of contribution; either "year" or "month"
+        payroll_date (date): Date at which the age of the employees is determined; defaults to today
+        chunk_size (int): Number of records processed together
+        n_workers (int): Number of worker processes; records are processed in the current
+            process if 1
+
+    Yields a dict for each employee:
+        - `employee_id`: ID of the employee
+        - `cont_employee`: Amount contributed by the employee in the period
+        - `cont_employer`: Amount contributed by the employer in the period
+        - `errors`: Reason the record could not be processed, if any
+    """
+
+    if payroll_date is None:
+        payroll_date = dt.date.today()
+    chunks = _chunk(records, chunk_size)
+
+    if n_workers <= 1:
+        for chunk in chunks:
+            yield from _calc_chunk(chunk, period, payroll_date)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_calc_chunk, chunk, period, payroll_date))
+            if len(pending) >= 2 * n_workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def main(argv: list = None) -> int:
+    """Command line entry point of the payroll mode.
+
+    Args:
+        argv (list): Command line arguments; defaults to `sys.argv`
+
+    Returns the exit code.
+    """
+
+    parser = argparse.ArgumentParser(description='Calculates CPF contributions for a payroll file.')
+    parser.add_argument('--input', default='-', help='input file of employee records, or - for stdin')
+    parser.add_argument('--output', default='-', help='output file of contributions, or - for stdout')
+    parser.add_argument('--format', default=strings.CSV, choices=[strings.CSV, strings.NDJSON])
+    parser.add_argument('--period', default=strings.MONTH, choices=[strings.MONTH, strings.YEAR])
+    parser.add_argument('--date', default=None, help='payroll month in YYYYMM format; defaults to this month')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    # per-call logs of the contribution engine would dominate the run time
+    for module in [cpfhelpers, genhelpers]:
+        logging.getLogger(module.__name__).setLevel(logging.WARNING)
+
+    payroll_date = None
+    if args.date is not None:
+        payroll_date = dt.date(int(args.date[:4]), int(args.date[4:6]), 1)
+
+    stream_in = sys.stdin if args.input == '-' else open(args.input, newline='')
+    stream_out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        results = run_payroll(
+            _read_records(stream_in, args.format),
+            period=args.period,
+            payroll_date=payroll_date,
+            chunk_size=args.chunk_size,
+            n_workers=args.workers)
+        n_records = _write_records(stream_out, args.format, results)
+    finally:
+        if stream_in is not sys.stdin:
+            stream_in.close()
+        if stream_out is not sys.stdout:
+            stream_out.close()
+
+    logger.info(f'Processed {n_records} employee records')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
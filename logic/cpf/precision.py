@@ -0,0 +1,64 @@
+import decimal
+import logging
+from typing import Callable, Iterator, Tuple
+
+from . import main
+from utils import strings
+
+logger = logging.getLogger(__name__)
+
+"""
+Differential checker between the "exact" (Decimal) and "fast" (float) precision modes of the
+CPF module, which reports how far the fast engine strays from the exact one over a corpus.
+"""
+
+def _iter_amounts(values: dict,
+                  path: str = '') -> Iterator[Tuple[str, decimal.Decimal]]:
+    """Yields the key path and value of every amount in the `values` of a response.
+
+    Args:
+        values (dict): Possibly nested dict of amounts formatted as strings
+        path (str): Key path of `values` in the response
+    """
+
+    for key, value in values.items():
+        key_path = f'{path}.{key}' if path else key
+        if isinstance(value, dict):
+            yield from _iter_amounts(value, key_path)
+        else:
+            yield key_path, decimal.Decimal(value)
+
+def compare_precision(corpus: list,
+                      func: Callable = main.calc_cpf_projection) -> dict:
+    """Runs every case of the corpus in both precision modes, and reports the largest deviation of
+    the fast mode from the exact mode.
+
+    Args:
+        corpus (list): Keyword arguments of each call to `func`, without `precision`
+        func (callable): Either `main.calc_cpf_projection` or `main.calc_cpf_contribution`
+
+    Returns a dict:
+        - `max_deviation`: Largest absolute difference between the amounts of the two modes
+        - `case`: Index in the corpus of the case with the largest deviation, if any
+        - `field`: Key path of the amount with the largest deviation, e.g. "final.sa", if any
+        - `n_cases`: Number of cases compared
+    """
+
+    max_deviation, max_case, max_field = decimal.Decimal(0), None, None
+
+    for i, kwargs in enumerate(corpus):
+        values_exact = func(**kwargs, precision=strings.EXACT)[strings.VALUES]
+        values_fast = dict(_iter_amounts(func(**kwargs, precision=strings.FAST)[strings.VALUES]))
+
+        for field, value_exact in _iter_amounts(values_exact):
+            deviation = abs(value_exact - values_fast[field])
+            if deviation > max_deviation:
+                max_deviation, max_case, max_field = deviation, i, field
+
+    logger.debug(f'Maximum deviation of {max_deviation} in case {max_case} at {max_field}')
+    return {
+        strings.MAX_DEVIATION: str(max_deviation),
+        strings.CASE: max_case,
+        strings.FIELD: max_field,
+        strings.N_CASES: len(corpus),
+    }
@@ -0,0 +1,160 @@
+"""
+Numeric state types that flow through the CPF projection engine.
+
+Values are kept as numbers throughout the engine; they are only formatted into strings at the
+response boundary.
+"""
+
+class ProjectionState(object):
+    """Account balances and interest accumulators of a member during a projection.
+
+    Interest is accumulated monthly in `oa_interest`, `sa_interest` and `ma_interest`, and only
+    credited into the balances at the end of the year.
+
+    In exact mode, balances and interest are `decimal.Decimal`s rather than floats, and every
+    amount added to them is converted to a Decimal first (see `cpfhelpers._calc_monthly_change`).
+
+    Attributes:
+        oa (float): Current amount in OA
+        sa (float): Current amount in SA
+        ma (float): Current amount in MA
+        oa_interest (float): Interest accumulated in OA in the current year
+        sa_interest (float): Interest accumulated in SA in the current year
+        ma_interest (float): Interest accumulated in MA in the current year
+        age (int): Age of the member in the latest simulated month
+        exact (bool): Whether amounts are kept as Decimals
+        ma_cap (bool): Whether the MA is capped at the Basic Healthcare Sum (see `cpfhelpers._apply_ma_cap`)
+    """
+
+    __slots__ = ('oa', 'sa', 'ma', 'oa_interest', 'sa_interest', 'ma_interest', 'age', 'exact', 'ma_cap')
+
+    def __init__(self,
+                 oa: float,
+                 sa: float,
+                 ma: float,
+                 oa_interest: float = 0,
+                 sa_interest: float = 0,
+                 ma_interest: float = 0,
+                 age: int = None,
+                 exact: bool = False,
+                 ma_cap: bool = False):
+        self.oa = oa
+        self.sa = sa
+        self.ma = ma
+        self.oa_interest = oa_interest
+        self.sa_interest = sa_interest
+        self.ma_interest = ma_interest
+        self.age = age
+        self.exact = exact
+        self.ma_cap = ma_cap
+
+    def __repr__(self) -> str:
+        return (f'ProjectionState(oa={self.oa}, sa={self.sa}, ma={self.ma}, '
+                f'oa_interest={self.oa_interest}, sa_interest={self.sa_interest}, '
+                f'ma_interest={self.ma_interest}, age={self.age}, exact={self.exact}, ma_cap={self.ma_cap})')
+
+    def copy(self) -> 'ProjectionState':
+        """Returns a copy of the state."""
+
+        return ProjectionState(
+            self.oa, self.sa, self.ma,
+            self.oa_interest, self.sa_interest, self.ma_interest,
+            self.age, self.exact, self.ma_cap)
+
+    def reset_interest(self):
+        """Clears the interest accumulators at the start of a new year."""
+
+        self.oa_interest, self.sa_interest, self.ma_interest = 0, 0, 0
+
+    def credit_interest(self):
+        """Credits the interest accumulated in the year into the account balances."""
+
+        self.oa += self.oa_interest
+        self.sa += self.sa_interest
+        self.ma += self.ma_interest
+
+class LifetimeState(ProjectionState):
+    """Projection state of a member over the lifetime, which adds the Retirement Account (RA).
+
+    Attributes:
+        ra (float): Current amount in RA, or None before it is created
+        ra_interest (float): Interest accumulated in RA in the current year
+        ra_interest_credited (float): Part of `ra_interest` already credited into the RA ahead of
+            the end of the year, before the last payout
+        payout (float): RA payouts made in the current year
+        payout_monthly (float): Monthly RA payout, or None before the payouts start
+    """
+
+    __slots__ = ('ra', 'ra_interest', 'ra_interest_credited', 'payout', 'payout_monthly')
+
+    def __init__(self,
+                 oa: float,
+                 sa: float,
+                 ma: float,
+                 ra: float = None,
+                 **kwargs):
+        super().__init__(oa, sa, ma, **kwargs)
+        self.ra = ra
+        self.ra_interest = 0
+        self.ra_interest_credited = 0
+        self.payout = 0
+        self.payout_monthly = None
+
+    def __repr__(self) -> str:
+        return (f'LifetimeState(oa={self.oa}, sa={self.sa}, ma={self.ma}, ra={self.ra}, '
+                f'payout_monthly={self.payout_monthly}, age={self.age})')
+
+    def copy(self) -> 'LifetimeState':
+        """Returns a copy of the state."""
+
+        state = LifetimeState(
+            self.oa, self.sa, self.ma, self.ra,
+            oa_interest=self.oa_interest, sa_interest=self.sa_interest, ma_interest=self.ma_interest,
+            age=self.age, exact=self.exact, ma_cap=self.ma_cap)
+        state.ra_interest, state.ra_interest_credited = self.ra_interest, self.ra_interest_credited
+        state.payout, state.payout_monthly = self.payout, self.payout_monthly
+        return state
+
+    def reset_interest(self):
+        """Clears the interest accumulators and payouts at the start of a new year."""
+
+        super().reset_interest()
+        self.ra_interest, self.ra_interest_credited, self.payout = 0, 0, 0
+
+    def credit_interest(self):
+        """Credits the interest accumulated in the year into the account balances."""
+
+        super().credit_interest()
+        if self.ra is not None:
+            self.credit_interest_ra()
+
+    def credit_interest_ra(self):
+        """Credits the RA interest accumulated in the year that has not been credited yet into the RA."""
+
+        self.ra += self.ra_interest - self.ra_interest_credited
+        self.ra_interest_credited = self.ra_interest
+
+class PayrollState(object):
+    """Year-to-date wages of an employee that are subject to CPF, carried across monthly payroll runs.
+
+    Attributes:
+        year (int): Year of the wages
+        month (int): Latest month processed in the year (1-12)
+        ow (float): Ordinary wages subject to CPF in the year so far
+        aw (float): Additional wages subject to CPF in the year so far
+    """
+
+    __slots__ = ('year', 'month', 'ow', 'aw')
+
+    def __init__(self,
+                 year: int,
+                 month: int = 0,
+                 ow: float = 0,
+                 aw: float = 0):
+        self.year = year
+        self.month = month
+        self.ow = ow
+        self.aw = aw
+
+    def __repr__(self) -> str:
+        return f'PayrollState(year={self.year}, month={self.month}, ow={self.ow}, aw={self.aw})'
@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import logging
+import os
+import sys
+from typing import Optional, Tuple
+
+import numpy as np
+
+from . import batch, constants, timeline
+from utils import config, strings
+
+logger = logging.getLogger(__name__)
+
+"""
+Precomputed lookup tables of monthly contributions and allocations under the current rates.
+
+The tables hold the contribution of each entity and the allocation into each account for every
+monthly salary in whole dollars up to the OW Ceiling, in every age bracket, for months without
+AW. As contributions above the OW Ceiling are constant, salaries above it share the last grid point.
+All other wages, and months under rate sets with other contribution or allocation rates, are
+computed as usual by `cpfhelpers`.
+
+The tables are built once per Lambda container at cold start, or loaded from `TABLE_PATH` if it
+was built for the same rates (see `main` to package the file).
+"""
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables.npz')
+
+class LookupTable(object):
+    """Monthly contributions and allocations of a rate set, indexed by monthly salary in whole dollars.
+
+    Attributes:
+        fingerprint (str): Hash of the rates the tables were built from (see `_get_fingerprint`)
+        cont (ndarray): Contributions in cents with shape (contribution age brackets, salaries, entities),
+            for `constants.ENTITY_COMBINED` and `constants.ENTITY_EMPLOYEE`
+        alloc (ndarray): Allocations in cents with shape (contribution age brackets, allocation age brackets,
+            salaries, accounts), for the accounts in the order of `constants.ACCOUNT_INDEXES`
+    """
+
+    __slots__ = ('fingerprint', 'cont', 'alloc')
+
+    def __init__(self,
+                 fingerprint: str,
+                 cont: np.ndarray,
+                 alloc: np.ndarray):
+        self.fingerprint = fingerprint
+        self.cont = cont
+        self.alloc = alloc
+
+    def _get_salary_index(self, amount_ow: int) -> Optional[int]:
+        """Returns the grid point of the given OW, or None if it is not on the grid.
+
+        Args:
+            amount_ow (int): Ordinary wages paid in the month in cents
+        """
+
+        if amount_ow >= constants.CEILING_OW * 100:
+            return constants.CEILING_OW
+
+        salary_index, rem = divmod(amount_ow, 100)
+        return salary_index if rem == 0 and salary_index >= 0 else None
+
+    def get_contribution(self,
+                         amount_ow: int,
+                         age_bracket: int,
+                         entity: int) -> Optional[int]:
+        """Returns the contribution in cents in a month without AW, or None if the OW is not on the grid.
+
+        Args:
+            amount_ow (int): Ordinary wages paid in the month in cents
+            age_bracket (int): Contribution age bracket index of employee
+            entity (int): Either `constants.ENTITY_COMBINED` or `constants.ENTITY_EMPLOYEE`
+        """
+
+        salary_index = self._get_salary_index(amount_ow)
+        if salary_index is None:
+            return None
+
+        return int(self.cont[age_bracket, salary_index, entity])
+
+    def get_allocation(self,
+                       amount_ow: int,
+                       age_bracket_cont: int,
+                       age_bracket_alloc: int) -> Optional[Tuple[int, int, int]]:
+        """Returns the amounts allocated into the OA, SA and MA in cents in a month without AW, or None
+        if the OW is not on the grid.
+
+        Args:
+            amount_ow (int): Ordinary wages paid in the month in cents
+            age_bracket_cont (int): Contribution age bracket index of employee
+            age_bracket_alloc (int): Allocation age bracket index of employee
+        """
+
+        salary_index = self._get_salary_index(amount_ow)
+        if salary_index is None:
+            return None
+
+        oa_alloc, sa_alloc, ma_alloc = self.alloc[age_bracket_cont, age_bracket_alloc, salary_index].tolist()
+        return oa_alloc, sa_alloc, ma_alloc
+
+def _get_fingerprint(rates: timeline.RateSet) -> str:
+    """Returns a hash of everything the tables depend on, so that stale table files are not loaded.
+
+    Args:
+        rates (RateSet): Rates the tables are built from
+    """
+
+    key = (
+        rates.age_thresholds_cont,
+        rates.age_thresholds_alloc,
+        rates.coefficients_cont,
+        rates.coefficients_alloc,
+        constants.RATE_SCALE,
+        constants.INCOME_THRESHOLDS,
+        constants.INCOME_BRACKET_2,
+        constants.CEILING_OW,
+    )
+
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+def build_table(rates: timeline.RateSet = timeline.RATES_LATEST) -> LookupTable:
+    """Builds the lookup tables of a rate set with the vectorised engine.
+
+    Args:
+        rates (RateSet): Rates to build the tables from; defaults to the rates currently in force
+    """
+
+    rates_cont, rates_alloc = batch._compile_cont_rates(rates), batch._compile_alloc_rates(rates)
+    n_brackets_cont, n_brackets_alloc = len(rates_cont['thresholds']), len(rates_alloc['thresholds'])
+
+    # every (contribution age bracket, salary) grid point, flattened
+    salary = np.tile(np.arange(constants.CEILING_OW + 1, dtype=np.float64), n_brackets_cont)
+    bonus = np.zeros_like(salary)
+    bracket = np.repeat(np.arange(n_brackets_cont), constants.CEILING_OW + 1)
+
+    cont = np.stack([
+        batch._get_monthly_contribution_cents(salary, bonus, bracket, rates_cont, entity)
+        for entity in [strings.COMBINED, strings.EMPLOYEE]
+    ], axis=-1).reshape(n_brackets_cont, constants.CEILING_OW + 1, 2)
+
+    # allocations of the combined contribution, broadcast over the allocation age brackets
+    cont_combined = cont[:, np.newaxis, :, constants.ENTITY_COMBINED]
+    sa_ratio = rates_alloc['sa_ratio'][np.newaxis, :, np.newaxis]
+    ma_ratio = rates_alloc['ma_ratio'][np.newaxis, :, np.newaxis]
+    sa_alloc = sa_ratio * cont_combined // constants.RATE_SCALE
+    ma_alloc = ma_ratio * cont_combined // constants.RATE_SCALE
+    oa_alloc = cont_combined - sa_alloc - ma_alloc
+    alloc = np.stack([oa_alloc, sa_alloc, ma_alloc], axis=-1)
+
+    logger.debug(f'Built lookup tables for {n_brackets_cont}x{n_brackets_alloc} age brackets')
+    return LookupTable(_get_fingerprint(rates), cont.astype(np.int64), alloc.astype(np.int64))
+
+def save_table(table: LookupTable,
+               path: str = TABLE_PATH):
+    """Saves the lookup tables into a binary file.
+
+    Args:
+        table (LookupTable): Lookup tables to save
+        path (str): Path of the file
+    """
+
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, fingerprint=np.array(table.fingerprint), cont=table.cont, alloc=table.alloc)
+
+def load_table(path: str = TABLE_PATH,
+               rates: timeline.RateSet = timeline.RATES_LATEST) -> Optional[LookupTable]:
+    """Loads the lookup tables from a binary file, or returns None if there is no file or it was built
+    from other rates.
+
+    Args:
+        path (str): Path of the file
+        rates (RateSet): Rates the tables must have been built from
+    """
+
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path) as data:
+        fingerprint = str(data['fingerprint'])
+        if fingerprint != _get_fingerprint(rates):
+            logger.warning(f'Lookup tables in {path} were built from other rates, ignoring')
+            return None
+
+        return LookupTable(fingerprint, data['cont'], data['alloc'])
+
+def _init_table() -> Optional[LookupTable]:
+    """Returns the lookup tables of the current rates if enabled, loading them from `TABLE_PATH` if possible."""
+
+    if not config.LOOKUP_TABLES:
+        return None
+
+    table = load_table()
+    if table is None:
+        table = build_table()
+
+    return table
+
+LOOKUP_TABLE = _init_table()
+
+def main(argv: list = None) -> int:
+    """Builds the lookup tables of the current rates and saves them for packaging.
+
+    Args:
+        argv (list): Command line arguments; defaults to `sys.argv`
+
+    Returns the exit code.
+    """
+
+    parser = argparse.ArgumentParser(description='Builds the CPF lookup tables of the current rates.')
+    parser.add_argument('--output', default=TABLE_PATH, help='output file of the lookup tables')
+    args = parser.parse_args(argv)
+
+    save_table(build_table(), args.output)
+    logger.info(f'Saved lookup tables to {args.output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import bisect
+import logging
+
+from . import constants
+
+logger = logging.getLogger(__name__)
+
+"""
+Time-versioned CPF rates, so that every month of a projection uses the rates in force in that month.
+
+The effective-dated rate sets in `constants.rates_timeline` are compiled at import into
+`RateSet`s, and stored in a `RateTimeline` ordered by the month from which they apply.
+"""
+
+# contribution and allocation rates of the rate sets compiled so far, so that rate sets with the
+# same rates share one `RateSet.rates_key`, which then compares equal by identity
+_RATES_KEYS = {}
+
+class RateSet(object):
+    """Compiled contribution, allocation and interest rates that apply from a given month.
+
+    Rate sets are compared and hashed by identity. Rate sets that only differ in their interest
+    rates or BHS compute the same contributions and allocations, and share the same `rates_key`.
+
+    Attributes:
+        effective (int): Month index from which the rates apply (see `genhelpers._get_month_index`)
+        age_thresholds_cont (tuple): Upper limits of the contribution age brackets
+        age_thresholds_alloc (tuple): Upper limits of the allocation age brackets
+        coefficients_cont (tuple): Contribution rates by age bracket and income bracket, in units of
+            1/`constants.RATE_SCALE` (see `constants.COEFFICIENTS_CONT`)
+        coefficients_alloc (tuple): Allocation ratios by age bracket, in units of 1/`constants.RATE_SCALE`
+            (see `constants.COEFFICIENTS_ALLOC`)
+        int_rate_oa (float): Base interest rate of the OA
+        int_rate_sa (float): Base interest rate of the SA
+        int_rate_ma (float): Base interest rate of the MA
+        int_rate_ra (float): Base interest rate of the RA
+        int_extra (float): Extra interest rate on the first $60k of combined balance
+        bhs (int): Basic Healthcare Sum, above which MA balances overflow into the other accounts
+        rates_key (tuple): Age thresholds and coefficients of the contribution and allocation rates,
+            as a hashable tuple
+    """
+
+    __slots__ = ('effective', 'age_thresholds_cont', 'age_thresholds_alloc', 'coefficients_cont',
+                 'coefficients_alloc', 'int_rate_oa', 'int_rate_sa', 'int_rate_ma', 'int_rate_ra', 'int_extra',
+                 'bhs', 'rates_key')
+
+    def __init__(self,
+                 effective: int,
+                 age_thresholds_cont: tuple,
+                 age_thresholds_alloc: tuple,
+                 coefficients_cont: tuple,
+                 coefficients_alloc: tuple,
+                 int_rate_oa: float,
+                 int_rate_sa: float,
+                 int_rate_ma: float,
+                 int_rate_ra: float,
+                 int_extra: float,
+                 bhs: int):
+        self.effective = effective
+        self.age_thresholds_cont = age_thresholds_cont
+        self.age_thresholds_alloc = age_thresholds_alloc
+        self.coefficients_cont = coefficients_cont
+        self.coefficients_alloc = coefficients_alloc
+        self.int_rate_oa = int_rate_oa
+        self.int_rate_sa = int_rate_sa
+        self.int_rate_ma = int_rate_ma
+        self.int_rate_ra = int_rate_ra
+        self.int_extra = int_extra
+        self.bhs = bhs
+
+        rates_key = (age_thresholds_cont, age_thresholds_alloc, coefficients_cont, coefficients_alloc)
+        self.rates_key = _RATES_KEYS.setdefault(rates_key, rates_key)
+
+    def __repr__(self) -> str:
+        year, month = divmod(self.effective, 12)
+        return f'RateSet(effective={year}{str(month + 1).zfill(2)})'
+
+class RateTimeline(object):
+    """Interval index of rate sets, where each rate set applies until the next one takes effect.
+
+    Attributes:
+        starts (list): Month index from which each rate set applies, in ascending order
+        rate_sets (list): List of `RateSet`, in the same order as `starts`
+    """
+
+    __slots__ = ('starts', 'rate_sets')
+
+    def __init__(self, rate_sets: list):
+        self.rate_sets = sorted(rate_sets, key=lambda e: e.effective)
+        self.starts = [e.effective for e in self.rate_sets]
+
+    def get(self, month_index: int) -> RateSet:
+        """Returns the rate set in force in the given month, in O(log n) of the number of rate sets.
+
+        Months before the first rate set takes effect use the first rate set.
+
+        Args:
+            month_index (int): Month index (see `genhelpers._get_month_index`)
+        """
+
+        return self.rate_sets[max(bisect.bisect_right(self.starts, month_index) - 1, 0)]
+
+    def build_schedule(self,
+                       month_index_start: int,
+                       n_months: int) -> list:
+        """Returns the rate set in force in every month over `n_months` months.
+
+        Only the first month is searched for; the rest of the schedule walks the intervals in order,
+        so that the months of a projection can be looked up in O(1).
+
+        Args:
+            month_index_start (int): Month index of the first month (see `genhelpers._get_month_index`)
+            n_months (int): Number of months in the schedule
+        """
+
+        schedule = []
+        i = max(bisect.bisect_right(self.starts, month_index_start) - 1, 0)
+        month_index, month_index_end = month_index_start, month_index_start + n_months
+
+        while month_index < month_index_end:
+            # the current rate set applies until the next one takes effect
+            month_index_next = self.starts[i + 1] if i + 1 < len(self.starts) else month_index_end
+            month_index_next = min(max(month_index_next, month_index), month_index_end)
+            schedule.extend([self.rate_sets[i]] * (month_index_next - month_index))
+            month_index = month_index_next
+            i += 1
+
+        return schedule
+
+def _compile_rate_set(entry: dict) -> RateSet:
+    """Compiles an entry of `constants.rates_timeline` into a `RateSet`, in the same layout as the
+    compiled tables in `constants`.
+
+    Args:
+        entry (dict): Effective-dated rate set
+    """
+
+    rates_cont, rates_alloc = entry['rates_cont'], entry['rates_alloc']
+    keys_cont, keys_alloc = sorted(rates_cont, key=int), sorted(rates_alloc, key=int)
+    effective = entry['effective']
+
+    return RateSet(
+        int(effective[:4]) * 12 + int(effective[4:6]) - 1,
+        tuple(int(key) for key in keys_cont),
+        tuple(int(key) for key in keys_alloc),
+        constants._compile_rates_cont(rates_cont),
+        constants._compile_rates_alloc(rates_alloc),
+        entry['int_rate_oa'],
+        entry['int_rate_sa'],
+        entry['int_rate_ma'],
+        entry['int_rate_ra'],
+        entry['int_extra'],
+        entry['bhs'])
+
+def _compile_timeline(entries: list) -> RateTimeline:
+    """Compiles the entries of `constants.rates_timeline` into a `RateTimeline`.
+
+    Args:
+        entries (list): Effective-dated rate sets
+    """
+
+    return RateTimeline([_compile_rate_set(entry) for entry in entries])
+
+TIMELINE = _compile_timeline(constants.rates_timeline)
+# rates currently in force, used where no month is given
+RATES_LATEST = TIMELINE.rate_sets[-1]
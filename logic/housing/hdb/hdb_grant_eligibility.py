@@ -1,3 +1,6 @@
+import itertools
+import math
+
 from . import constants
 from utils import strings
 
@@ -9,471 +12,415 @@ Finds the eligible CPF grant schemes.
 2. prev_resale      Before Sep 2019, Resale
 3. curr_bto         Sep 2019 onwards, BTO
 4. curr_resale      Sep 2019 onwards, Resale
+
+The eligibility rules are written as a declarative table (see `grant_rules`), which is compiled
+at import into a lookup keyed by (application period, flat type, profile, estate, flat size).
+Each key holds the candidate grants with their income ceilings, so that finding the schemes
+takes one lookup and one income comparison per grant.
 """
 
-def find_grant_schemes_prev_bto(profile: str,
-                                income: float,
-                                estate: str,
-                                flat_size: str):
-    """Scenario: Before Sep 2019, BTO
+###############################################################################
+#                               ELIGIBILITY RULES                             #
+###############################################################################
+
+"""
+Eligibility rules of the grant schemes.
+
+Each rule applies to a grant scheme for the listed applicant profiles, in a given application
+period and flat type, and lists its conditions in the order that they are checked. The remarks
+of the first condition that is not met are returned. Conditions are one of:
+    - (`ESTATE_NONMATURE`, remarks): flat must be in a non-mature estate
+    - (`FLAT_SIZES`, flat sizes, remarks): flat must be one of the flat sizes
+    - (`INCOME`, income ceiling, remarks): monthly household income must not exceed the ceiling
+
+1. AHG = Additional CPF Housing Grant
+    - <=$5k income, or <=$2.5k income for Singles variant
+    - (Non-SC spouse, SG single, SG JSS) Non-mature estate, 2-room Flexi
+2. EHG = Enhanced CPF Housing Grant
+    - <=$9k income, or <=$4.5k income for Singles variant
+    - (SG JSS) Non-mature estate, 2-room Flexi
+3. SHG = Special CPF Housing Grant
+    - <=$8.5k income, or <=$4.25k income for Singles variant
+    - Non-mature estate
+    - (Both FT, FT/ST, SG orphan) 2-room Flexi, 3-room or 4-room flat
+    - (Non-SC spouse, SG single, SG JSS) 2-room Flexi
+4. Step-up CPF Housing Grant
+    - <=$7k income
+    - Non-mature estate
+    - (before Sep 2019) 3-room flat
+    - (from Sep 2019 onwards) 2-room or 3-room flat
+
+The income of SG singles is compared against half of the income ceilings of the Singles variants,
+as only half of the monthly household income counts for the other profiles.
+"""
+
+ESTATE_NONMATURE = 'estate_nonmature'
+FLAT_SIZES = 'flat_sizes'
+INCOME = 'income'
+
+# Actually the changeover time period of the Step-up CPF Housing Grant seems to be May 2019
+# https://www.hdb.gov.sg/cs/infoweb/residential/buying-a-flat/new/schemes-and-grants/cpf-housing-grants-for-hdb-flats/second-timer-applicants
+# will worry about this in the future
+# Also, it is stated that
+# "income ceiling is $6,000 for applications received from May 2019 sales exercise to 10 Sep 2019."
+# But it doesn't mention about applications before May 2019...
+# So this is ignored for now and the income ceiling is just taken as $7,000
+
+_SIZES_SHG = [constants.SIZE_2RM, constants.SIZE_3RM, constants.SIZE_4RM]
+
+grant_rules = [
+    # Before Sep 2019, BTO
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_AHG,
+        'profiles': [constants.PROFILE_BOTH_FT, constants.PROFILE_SG_ORPHAN],
+        'conditions': [
+            (INCOME, constants.INCOME_CEILING_AHG, constants.REMARKS_AHG_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_AHG,
+        'profiles': [constants.PROFILE_SG_JSS],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_2RM], constants.REMARKS_AHG_FLAT_SIZE_NA_2RM),
+            (INCOME, constants.INCOME_CEILING_AHG, constants.REMARKS_AHG_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_AHG_SINGLES,
+        'profiles': [constants.PROFILE_FT_ST],
+        'conditions': [
+            (INCOME, constants.INCOME_CEILING_AHG, constants.REMARKS_AHG_SINGLES_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_AHG_SINGLES,
+        'profiles': [constants.PROFILE_NONSC_SPOUSE],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_2RM], constants.REMARKS_AHG_FLAT_SIZE_NA_2RM),
+            (INCOME, constants.INCOME_CEILING_AHG, constants.REMARKS_AHG_SINGLES_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_AHG_SINGLES,
+        'profiles': [constants.PROFILE_SG_SINGLE],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_2RM], constants.REMARKS_AHG_FLAT_SIZE_NA_2RM),
+            (INCOME, constants.INCOME_CEILING_AHG / 2, constants.REMARKS_AHG_SINGLES_INCOME_ABOVE_SINGLE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_SHG,
+        'profiles': [constants.PROFILE_BOTH_FT, constants.PROFILE_SG_ORPHAN],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, _SIZES_SHG, constants.REMARKS_SHG_FLAT_SIZE_NA),
+            (INCOME, constants.INCOME_CEILING_SHG, constants.REMARKS_SHG_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_SHG,
+        'profiles': [constants.PROFILE_SG_JSS],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_2RM], constants.REMARKS_SHG_FLAT_SIZE_NA_2RM),
+            (INCOME, constants.INCOME_CEILING_SHG, constants.REMARKS_SHG_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_SHG_SINGLES,
+        'profiles': [constants.PROFILE_FT_ST],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, _SIZES_SHG, constants.REMARKS_SHG_FLAT_SIZE_NA),
+            (INCOME, constants.INCOME_CEILING_SHG, constants.REMARKS_SHG_SINGLES_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_SHG_SINGLES,
+        'profiles': [constants.PROFILE_NONSC_SPOUSE],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_2RM], constants.REMARKS_SHG_FLAT_SIZE_NA_2RM),
+            (INCOME, constants.INCOME_CEILING_SHG, constants.REMARKS_SHG_SINGLES_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_SHG_SINGLES,
+        'profiles': [constants.PROFILE_SG_SINGLE],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_2RM], constants.REMARKS_SHG_FLAT_SIZE_NA_2RM),
+            (INCOME, constants.INCOME_CEILING_SHG / 2, constants.REMARKS_SHG_SINGLES_INCOME_ABOVE_SINGLE),
+        ],
+    },
+    {
+        'period': strings.BEFORE_SEP_2019,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_STEPUP,
+        'profiles': [constants.PROFILE_BOTH_ST],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_3RM], constants.REMARKS_STEPUP_FLAT_SIZE_NA_PREV),
+            (INCOME, constants.INCOME_CEILING_STEPUP, constants.REMARKS_STEPUP_INCOME_ABOVE),
+        ],
+    },
+    # Sep 2019 onwards, BTO
+    {
+        'period': strings.SEP_2019_ONWARDS,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_EHG,
+        'profiles': [constants.PROFILE_BOTH_FT, constants.PROFILE_SG_ORPHAN],
+        'conditions': [
+            (INCOME, constants.INCOME_CEILING_EHG, constants.REMARKS_EHG_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.SEP_2019_ONWARDS,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_EHG,
+        'profiles': [constants.PROFILE_SG_JSS],
+        'conditions': [
+            (INCOME, constants.INCOME_CEILING_EHG, constants.REMARKS_EHG_INCOME_ABOVE),
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_2RM], constants.REMARKS_EHG_FLAT_SIZE_NA),
+        ],
+    },
+    {
+        'period': strings.SEP_2019_ONWARDS,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_EHG_SINGLES,
+        'profiles': [constants.PROFILE_FT_ST, constants.PROFILE_NONSC_SPOUSE],
+        'conditions': [
+            (INCOME, constants.INCOME_CEILING_EHG, constants.REMARKS_EHG_SINGLES_INCOME_ABOVE),
+        ],
+    },
+    {
+        'period': strings.SEP_2019_ONWARDS,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_EHG_SINGLES,
+        'profiles': [constants.PROFILE_SG_SINGLE],
+        'conditions': [
+            (INCOME, constants.INCOME_CEILING_EHG / 2, constants.REMARKS_EHG_SINGLES_INCOME_ABOVE_SINGLE),
+        ],
+    },
+    {
+        'period': strings.SEP_2019_ONWARDS,
+        'flat_type': strings.BTO,
+        'grant': constants.GRANT_STEPUP,
+        'profiles': [constants.PROFILE_BOTH_ST],
+        'conditions': [
+            (ESTATE_NONMATURE, constants.REMARKS_GEN_MATURE_ESTATE_NA),
+            (FLAT_SIZES, [constants.SIZE_2RM, constants.SIZE_3RM], constants.REMARKS_STEPUP_FLAT_SIZE_NA_CURR),
+            (INCOME, constants.INCOME_CEILING_STEPUP, constants.REMARKS_STEPUP_INCOME_ABOVE),
+        ],
+    },
+]
+
+###############################################################################
+#                                COMPILED TABLE                               #
+###############################################################################
+
+# estates and flat sizes are keyed by the values that the rules tell apart, where any estate
+# other than a mature one counts as non-mature, and any other flat size is keyed as None
+_ESTATE_KEYS = [strings.MATURE, strings.NONMATURE]
+_FLAT_SIZE_KEYS = constants.HDB_FLAT_SIZES + [None]
+_FLAT_SIZES = frozenset(constants.HDB_FLAT_SIZES)
+
+def _compile_conditions(conditions: list,
+                        estate: str,
+                        flat_size: str) -> tuple:
+    """Evaluates the conditions of a rule that do not depend on the income for an estate and flat size.
 
     Args:
-        profile (str): Applicant profile to match to available HDB grant scheme
-        income (float): Monthly household income
+        conditions (list): Conditions of the rule, in the order that they are checked
         estate (str): Either mature or non-mature
-        flat_size (str): Either 2-room, 3-room, 4-room, 5-room, 3gen or executive
+        flat_size (str): One of `constants.HDB_FLAT_SIZES`, or None
+
+    Returns a tuple containing the income ceiling (infinite if a condition fails before the income
+    is checked), the remarks if the income is above the ceiling, and the remarks of the first
+    condition that fails after the income is checked, if any.
     """
 
-    schemes = {}
+    income_ceiling, remarks_income = None, None
 
-    if profile == constants.PROFILE_BOTH_FT:
-        schemes = {
-            constants.GRANT_AHG: _check_eligibility_ahg(
-                profile,
-                income,
-                estate,
-                flat_size),
-            constants.GRANT_SHG: _check_eligibility_shg(
-                profile,
-                income,
-                estate,
-                flat_size),
-        }
-    elif profile == constants.PROFILE_FT_ST:
-        schemes = {
-            constants.GRANT_AHG_SINGLES: _check_eligibility_ahg(
-                profile,
-                income,
-                estate,
-                flat_size,
-                singles=True),
-            constants.GRANT_SHG_SINGLES: _check_eligibility_shg(
-                profile,
-                income,
-                estate,
-                flat_size,
-                singles=True),
-        }
-    elif profile == constants.PROFILE_BOTH_ST:
-        schemes = {
-            constants.GRANT_STEPUP: _check_eligibility_stepup(
-                strings.BEFORE_SEP_2019,
-                income,
-                estate,
-                flat_size)
-        }
-    elif profile == constants.PROFILE_NONSC_SPOUSE:
-        schemes = {
-            constants.GRANT_AHG_SINGLES: _check_eligibility_ahg(
-                profile,
-                income,
-                estate,
-                flat_size,
-                singles=True),
-            constants.GRANT_SHG_SINGLES: _check_eligibility_shg(
-                profile,
-                income,
-                estate,
-                flat_size,
-                singles=True),
-        }
-    elif profile == constants.PROFILE_SG_SINGLE:
-        schemes = {
-            constants.GRANT_AHG_SINGLES: _check_eligibility_ahg(
-                profile,
-                income * 2,
-                estate,
-                flat_size,
-                singles=True),
-            constants.GRANT_SHG_SINGLES: _check_eligibility_shg(
-                profile,
-                income * 2,
-                estate,
-                flat_size,
-                singles=True),
-        }
-    elif profile in [constants.PROFILE_SG_JSS, constants.PROFILE_SG_ORPHAN]:
-        schemes = {
-            constants.GRANT_AHG: _check_eligibility_ahg(
-                profile,
-                income,
-                estate,
-                flat_size),
-            constants.GRANT_SHG: _check_eligibility_shg(
-                profile,
-                income,
-                estate,
-                flat_size),
-        }
+    for condition in conditions:
+        if condition[0] == INCOME:
+            _, income_ceiling, remarks_income = condition
+            continue
 
-    return schemes
+        if condition[0] == ESTATE_NONMATURE:
+            _, remarks = condition
+            is_met = estate != strings.MATURE
+        else:
+            _, flat_sizes, remarks = condition
+            is_met = flat_size in flat_sizes
 
-def find_grant_schemes_prev_resale():
-    schemes = {}
+        if not is_met:
+            if income_ceiling is None:
+                # the income is never checked
+                return math.inf, None, remarks
+            return income_ceiling, remarks_income, remarks
 
-    # if profile == constants.PROFILE_BOTH_FT:
-    
-    # elif profile == constants.PROFILE_FT_ST:
+    return income_ceiling, remarks_income, None
 
-    # elif profile == constants.PROFILE_BOTH_ST:
-        
-    # elif profile == constants.PROFILE_NONSC_SPOUSE:
-        
-    # elif profile == constants.PROFILE_SG_SINGLE:
-        
-    # elif profile == constants.PROFILE_SG_SINGLE_ORPHAN:
+def _compile_rules(rules: list) -> dict:
+    """Compiles the eligibility rules into the candidate grants of every application period, flat type,
+    profile, estate and flat size.
 
-    return schemes
-    
-def find_grant_schemes_curr_bto(profile: str,
-                                income: float,
-                                estate: str = None,
-                                flat_size: str = None):
-    """Scenario: Sep 2019 onwards, BTO
+    Args:
+        rules (list): Eligibility rules (see `grant_rules`)
+
+    Returns a dict keyed by (application period, flat type, profile, estate, flat size), where each
+    value is a tuple of (grant, income ceiling, remarks if the income is above the ceiling,
+    remarks if ineligible otherwise) in the order of the rules.
+    """
+
+    table = {}
+
+    for rule in rules:
+        for profile, estate, flat_size in itertools.product(rule['profiles'], _ESTATE_KEYS, _FLAT_SIZE_KEYS):
+            key = (rule['period'], rule['flat_type'], profile, estate, flat_size)
+            candidate = (rule['grant'], *_compile_conditions(rule['conditions'], estate, flat_size))
+            table[key] = table.get(key, ()) + (candidate,)
+
+    return table
+
+GRANT_TABLE = _compile_rules(grant_rules)
+
+def _find_grant_schemes(application_period: str,
+                        flat_type: str,
+                        profile: str,
+                        income: float,
+                        estate: str = None,
+                        flat_size: str = None) -> dict:
+    """Finds the candidate grant schemes in the compiled table, and checks the income against their ceilings.
 
     Args:
+        application_period (str): Either before Sep 2019, or Sep 2019 onwards
+        flat_type (str): Either BTO or resale
         profile (str): Applicant profile to match to available HDB grant scheme
         income (float): Monthly household income
+        estate (str): Either mature or non-mature
+        flat_size (str): Either 2-room, 3-room, 4-room, 5-room, 3gen or executive
+
+    Returns a dict of the eligibility of each grant scheme, in the following structure:
+    {
+        {grant}: {
+            "eligibility": {True/False},
+            "remarks": {remarks}
+        }
+    }
     """
 
+    key = (
+        application_period,
+        flat_type,
+        profile,
+        strings.MATURE if estate == strings.MATURE else strings.NONMATURE,
+        flat_size if flat_size in _FLAT_SIZES else None,
+    )
+
     schemes = {}
+    for grant, income_ceiling, remarks_income, remarks in GRANT_TABLE.get(key, ()):
+        if income > income_ceiling:
+            eligibility, remarks = False, remarks_income
+        else:
+            eligibility = remarks is None
 
-    if profile == constants.PROFILE_BOTH_FT:
-        schemes = {
-            constants.GRANT_EHG: _check_eligibility_ehg(
-                profile,
-                income),
-        }
-    elif profile == constants.PROFILE_FT_ST:
-        schemes = {
-            constants.GRANT_EHG_SINGLES: _check_eligibility_ehg(
-                profile,
-                income,
-                singles=True),
-        }
-    elif profile == constants.PROFILE_BOTH_ST:
-        schemes = {
-            constants.GRANT_STEPUP: _check_eligibility_stepup(
-                strings.SEP_2019_ONWARDS,
-                income,
-                estate,
-                flat_size)
-        }
-    elif profile == constants.PROFILE_NONSC_SPOUSE:
-        schemes = {
-            constants.GRANT_EHG_SINGLES: _check_eligibility_ehg(
-                profile,
-                income,
-                singles=True),
-        }
-    elif profile == constants.PROFILE_SG_SINGLE:
-        schemes = {
-            constants.GRANT_EHG_SINGLES: _check_eligibility_ehg(
-                profile,
-                income * 2,
-                singles=True),
-        }
-    elif profile in [constants.PROFILE_SG_JSS, constants.PROFILE_SG_ORPHAN]:
-        schemes = {
-            constants.GRANT_EHG: _check_eligibility_ehg(
-                profile,
-                income,
-                estate=estate,
-                flat_size=flat_size),
+        schemes[grant] = {
+            strings.ELIGIBILITY: eligibility,
+            strings.REMARKS: remarks,
         }
 
     return schemes
 
-def find_grant_schemes_curr_resale():
+###############################################################################
+#                                  SCENARIOS                                  #
+###############################################################################
+
+def find_grant_schemes_prev_bto(profile: str,
+                                income: float,
+                                estate: str,
+                                flat_size: str):
+    """Scenario: Before Sep 2019, BTO
+
+    Args:
+        profile (str): Applicant profile to match to available HDB grant scheme
+        income (float): Monthly household income
+        estate (str): Either mature or non-mature
+        flat_size (str): Either 2-room, 3-room, 4-room, 5-room, 3gen or executive
+    """
+
+    return _find_grant_schemes(strings.BEFORE_SEP_2019, strings.BTO, profile, income, estate, flat_size)
+
+def find_grant_schemes_prev_resale():
     schemes = {}
 
     # if profile == constants.PROFILE_BOTH_FT:
-    
+
     # elif profile == constants.PROFILE_FT_ST:
 
     # elif profile == constants.PROFILE_BOTH_ST:
-        
+
     # elif profile == constants.PROFILE_NONSC_SPOUSE:
-        
+
     # elif profile == constants.PROFILE_SG_SINGLE:
-        
+
     # elif profile == constants.PROFILE_SG_SINGLE_ORPHAN:
 
     return schemes
-    
-"""
-Checks for the eligibility on the individual grant schemes.
-
-These methods will return a dict in the following structure:
-{
-    "eligibility": {True/False},
-    "remarks": {remarks}
-}
-
-1. AHG
-2. Citizen Top Up Grant
-3. EHG
-4. Half Housing Grant
-5. PHG
-6. SHG
-7. Singles Grant
-8. Step Up Grant
-"""
-
-def _check_eligibility_ahg(profile: str,
-                           income: float,
-                           estate: str,
-                           flat_size: str,
-                           singles: bool = False) -> dict:
-    """Checks on eligibility for the AHG or AHG (Singles).
-    
-    AHG = Additional CPF Housing Grant
-        
-    Requirements:
-        - <=$5k income, or <=$2.5k income for Singles variant
-        - (flat size requirements vary depending on profile)
-            - (Both FT) 2-room Flexi or larger
-            - (1 FT, 1 ST) 2-room Flexi or larger
-            - (Non-SC spouse) Non-mature estate, 2-room Flexi
-            - (SG single) Non-mature estate, 2-room Flexi
-            - (SG JSS) Non-mature estate, 2-room Flexi
-            - (SG orphan) 2-room Flexi or larger
-
-    Args:
-        profile (str): Applicant profile to match to available HDB grant scheme
-        income (float): Monthly household income (for 2 pax)
-        estate (str): Either mature or non-mature
-        flat_size (str): Either 2-room, 3-room, 4-room, 5-room, 3gen or executive
-        singles (bool): Denotes if it is the AHG (Singles) variant
-    """
-
-    eligibility, remarks = None, None
-
-    if (profile in [
-            constants.PROFILE_NONSC_SPOUSE,
-            constants.PROFILE_SG_SINGLE,
-            constants.PROFILE_SG_JSS,
-        ]
-        and estate == strings.MATURE
-    ):
-        eligibility = False
-        remarks = constants.REMARKS_GEN_MATURE_ESTATE_NA
-    elif (profile in [
-            constants.PROFILE_NONSC_SPOUSE,
-            constants.PROFILE_SG_SINGLE,
-            constants.PROFILE_SG_JSS,
-        ]
-        and flat_size != constants.SIZE_2RM
-    ):
-        eligibility = False
-        remarks = constants.REMARKS_AHG_FLAT_SIZE_NA_2RM
-    else:
-        if income <= constants.INCOME_CEILING_AHG:
-            eligibility = True
-        else:
-            eligibility = False
-            if singles:
-                if profile in [
-                    constants.PROFILE_BOTH_FT,
-                    constants.PROFILE_FT_ST,
-                    constants.PROFILE_NONSC_SPOUSE,
-                ]:
-                    remarks = constants.REMARKS_AHG_SINGLES_INCOME_ABOVE
-                elif profile == constants.PROFILE_SG_SINGLE:
-                    remarks = constants.REMARKS_AHG_SINGLES_INCOME_ABOVE_SINGLE
-            else:
-                remarks = constants.REMARKS_AHG_INCOME_ABOVE
-
-    return {
-        strings.ELIGIBILITY: eligibility,
-        strings.REMARKS: remarks,
-    }
 
-def _check_eligibility_ehg(profile: str,
-                           income: float,
-                           estate: str = None,
-                           flat_size: str = None,
-                           singles: bool = False) -> dict:
-    """Checks on eligibility for the EHG or EHG (Singles).
-
-    EHG = Enhanced CPF Housing Grant
-
-    Requirements:
-        - <=$9k income, or <=$4.5k income for Singles variant
-        - (JSS) Non-mature estate, 2-room Flexi
+def find_grant_schemes_curr_bto(profile: str,
+                                income: float,
+                                estate: str = None,
+                                flat_size: str = None):
+    """Scenario: Sep 2019 onwards, BTO
 
     Args:
         profile (str): Applicant profile to match to available HDB grant scheme
-        income (float): Monthly household income (for 2 pax)
+        income (float): Monthly household income
         estate (str): Either mature or non-mature
         flat_size (str): Either 2-room, 3-room, 4-room, 5-room, 3gen or executive
-        singles (bool): Denotes if it is the EHG (Singles) variant
     """
 
-    eligibility, remarks = None, None
-
-    if income <= constants.INCOME_CEILING_EHG:
-        if profile == constants.PROFILE_SG_JSS:
-            if estate == strings.MATURE:
-                eligibility = False
-                remarks = constants.REMARKS_GEN_MATURE_ESTATE_NA
-            elif flat_size != constants.SIZE_2RM:
-                eligibility = False
-                remarks = constants.REMARKS_EHG_FLAT_SIZE_NA
-            else:
-                eligibility = True    
-        else:
-            eligibility = True
-    else:
-        eligibility = False
-        if singles:
-            if profile in [
-                constants.PROFILE_FT_ST,
-                constants.PROFILE_NONSC_SPOUSE,
-            ]:
-                remarks = constants.REMARKS_EHG_SINGLES_INCOME_ABOVE
-            elif profile == constants.PROFILE_SG_SINGLE:
-                remarks = constants.REMARKS_EHG_SINGLES_INCOME_ABOVE_SINGLE
-        else:
-            remarks = constants.REMARKS_EHG_INCOME_ABOVE
+    return _find_grant_schemes(strings.SEP_2019_ONWARDS, strings.BTO, profile, income, estate, flat_size)
 
-    return {
-        strings.ELIGIBILITY: eligibility,
-        strings.REMARKS: remarks,
-    }
+def find_grant_schemes_curr_resale():
+    schemes = {}
 
-def _check_eligibility_shg(profile: str,
-                           income: float,
-                           estate: str,
-                           flat_size: str,
-                           singles: bool = False) -> dict:
-    """Checks on eligibility for the SHG or SHG (Singles).
-    
-    SHG = Special CPF Housing Grant
-    
-    Requirements:
-        - <=$8.5k income, or <=$4.25k income for Singles variant
-        - Non-mature estate
-        - (flat size requirements vary depending on profile)
-            - (Both FT) 2-room Flexi, 3-room or 4-room flat
-            - (1 FT, 1 ST) 2-room Flexi, 3-room or 4-room flat
-            - (Non-SC spouse) 2-room Flexi
-            - (SG single) 2-room Flexi
-            - (SG JSS) 2-room Flexi
-            - (SG orphan) 2-room Flexi, 3-room or 4-room flat
+    # if profile == constants.PROFILE_BOTH_FT:
 
-    Args:
-        profile (str): Applicant profile to match to available HDB grant scheme
-        income (float): Monthly household income (for 2 pax)
-        estate (str): Either mature or non-mature
-        flat_size (str): Either 2-room, 3-room, 4-room, 5-room, 3gen or executive
-        singles (bool): Denotes if it is the SHG (Singles) variant
-    """
+    # elif profile == constants.PROFILE_FT_ST:
 
-    eligibility, remarks = None, None
-
-    if estate == strings.MATURE:
-        eligibility = False
-        remarks = constants.REMARKS_GEN_MATURE_ESTATE_NA
-    else:
-        if (profile in [
-                constants.PROFILE_BOTH_FT, 
-                constants.PROFILE_FT_ST,
-                constants.PROFILE_SG_ORPHAN,
-            ]
-            and flat_size not in [
-                constants.SIZE_2RM,
-                constants.SIZE_3RM,
-                constants.SIZE_4RM,
-            ]
-        ):
-            eligibility = False
-            remarks = constants.REMARKS_SHG_FLAT_SIZE_NA
-        elif (profile in [
-                constants.PROFILE_NONSC_SPOUSE,
-                constants.PROFILE_SG_SINGLE,
-                constants.PROFILE_SG_JSS,
-            ]
-            and flat_size != constants.SIZE_2RM
-        ):
-            eligibility = False
-            remarks = constants.REMARKS_SHG_FLAT_SIZE_NA_2RM
-        else:
-            if income <= constants.INCOME_CEILING_SHG:
-                eligibility = True
-            else:
-                eligibility = False
-                if singles:
-                    if profile in [
-                        constants.PROFILE_BOTH_FT,
-                        constants.PROFILE_FT_ST,
-                        constants.PROFILE_NONSC_SPOUSE,
-                    ]:
-                        remarks = constants.REMARKS_SHG_SINGLES_INCOME_ABOVE
-                    elif profile == constants.PROFILE_SG_SINGLE:
-                        remarks = constants.REMARKS_SHG_SINGLES_INCOME_ABOVE_SINGLE
-                else:
-                    remarks = constants.REMARKS_SHG_INCOME_ABOVE
-
-    return {
-        strings.ELIGIBILITY: eligibility,
-        strings.REMARKS: remarks,
-    }
+    # elif profile == constants.PROFILE_BOTH_ST:
 
-def _check_eligibility_stepup(application_period: str,
-                              income: float,
-                              estate: str,
-                              flat_size: str) -> dict:
-    """Checks on eligibility for the Step-up CPF Housing Grant.
+    # elif profile == constants.PROFILE_NONSC_SPOUSE:
 
-    Requirements:
-        - <=$7k income
-        - Non-mature estate
-        - (flat size requirements vary depending on application period)
-            - (before Sep 2019) 3-room flat
-            - (from Sep 2019 onwards) 2-room or 3-room flat 
+    # elif profile == constants.PROFILE_SG_SINGLE:
 
-    Args:
-        application_period (str): Either before Sep 2019, or Sep 2019 onwards
-        income (float): Monthly household income
-        estate (str): Either mature or non-mature
-        flat_size (str): Either 2-room, 3-room, 4-room, 5-room, 3gen or executive
-    """
+    # elif profile == constants.PROFILE_SG_SINGLE_ORPHAN:
 
-    # Actually the changeover time period seems to be May 2019
-    # https://www.hdb.gov.sg/cs/infoweb/residential/buying-a-flat/new/schemes-and-grants/cpf-housing-grants-for-hdb-flats/second-timer-applicants
-    # will worry about this in the future
-    # Also, it is stated that 
-    # "income ceiling is $6,000 for applications received from May 2019 sales exercise to 10 Sep 2019."
-    # But it doesn't mention about applications before May 2019...
-    # So this is ignored for now and the income ceiling is just taken as $7,000
-
-    eligibility, remarks = None, None
-
-    if estate == strings.MATURE:
-        eligibility = False
-        remarks = constants.REMARKS_GEN_MATURE_ESTATE_NA
-    else:
-        if (application_period == strings.BEFORE_SEP_2019
-            and flat_size != constants.SIZE_3RM):
-            eligibility = False
-            remarks = constants.REMARKS_STEPUP_FLAT_SIZE_NA_PREV
-        elif (application_period == strings.SEP_2019_ONWARDS
-            and flat_size not in [
-                constants.SIZE_2RM, 
-                constants.SIZE_3RM,
-            ]):
-            eligibility = False
-            remarks = constants.REMARKS_STEPUP_FLAT_SIZE_NA_CURR
-        else:
-            if eligibility is None and remarks is None:
-                if income <= constants.INCOME_CEILING_STEPUP:
-                    eligibility = True
-                else:
-                    eligibility = False
-                    remarks = constants.REMARKS_STEPUP_INCOME_ABOVE
-
-    return {
-        strings.ELIGIBILITY: eligibility,
-        strings.REMARKS: remarks,
-    }
+    return schemes
@@ -1,3 +1,5 @@
+from logic.cpf import cache as cpf_cache
+from logic.cpf import lifetime as cpf_lifetime
 from logic.cpf import main as cpf_main
 from logic.housing import main as housing_main
 from logic.housing.hdb import main as housing_hdb_main
@@ -18,7 +20,8 @@ def execute(endpoint: str, params: dict) -> dict:
             params[strings.PARAM_SALARY],
             params[strings.PARAM_BONUS],
             params[strings.PARAM_DOB],
-            params[strings.PARAM_PERIOD])
+            params[strings.PARAM_PERIOD],
+            params[strings.PARAM_PRECISION])
 
     elif endpoint == endpoints.CPF_ALLOCATION:
         results = cpf_main.calc_cpf_allocation(
@@ -36,7 +39,64 @@ def execute(endpoint: str, params: dict) -> dict:
             params[strings.PARAM_BONUS_MONTH],
             params[strings.PARAM_N_YEARS],
             params[strings.PARAM_TARGET_YEAR],
-            params[strings.PARAM_ACCOUNT_DELTAS])
+            params[strings.PARAM_ACCOUNT_DELTAS],
+            params[strings.PARAM_CHECKPOINT_YEARS],
+            params[strings.PARAM_CHECKPOINT],
+            params[strings.PARAM_PRECISION],
+            params[strings.PARAM_MA_CAP])
+
+    elif endpoint == endpoints.CPF_PROJECTION_SWEEP:
+        results = cpf_main.calc_cpf_projection_sweep(
+            params[strings.PARAM_SALARY],
+            params[strings.PARAM_BONUS_GRID],
+            params[strings.PARAM_YOY_INCREASE_SALARY_GRID],
+            params[strings.PARAM_DOB],
+            params[strings.PARAM_BASE_CPF],
+            params[strings.PARAM_BONUS_MONTH],
+            params[strings.PARAM_N_YEARS],
+            params[strings.PARAM_TARGET_YEAR],
+            params[strings.PARAM_ACCOUNT_DELTAS],
+            params[strings.PARAM_MA_CAP])
+
+    elif endpoint == endpoints.CPF_PROJECTION_HOUSEHOLD:
+        results = cpf_main.calc_cpf_projection_household(
+            params[strings.PARAM_MEMBERS],
+            params[strings.PARAM_TRANSFERS],
+            params[strings.PARAM_N_YEARS],
+            params[strings.PARAM_TARGET_YEAR])
+
+    elif endpoint == endpoints.CPF_PROJECTION_LIFETIME:
+        results = cpf_lifetime.calc_cpf_lifetime(
+            params[strings.PARAM_SALARY],
+            params[strings.PARAM_BONUS],
+            params[strings.PARAM_YOY_INCREASE_SALARY],
+            params[strings.PARAM_DOB],
+            params[strings.PARAM_BASE_CPF],
+            params[strings.PARAM_BONUS_MONTH],
+            params[strings.PARAM_RETIREMENT_AGE],
+            params[strings.PARAM_RETIREMENT_SUM],
+            params[strings.PARAM_MA_CAP])
+
+    elif endpoint == endpoints.CPF_GOAL_SEEK:
+        results = cpf_main.calc_cpf_goal_seek(
+            params[strings.PARAM_SALARY],
+            params[strings.PARAM_BONUS],
+            params[strings.PARAM_YOY_INCREASE_SALARY],
+            params[strings.PARAM_DOB],
+            params[strings.PARAM_BASE_CPF],
+            params[strings.PARAM_BONUS_MONTH],
+            params[strings.PARAM_ACCOUNT_DELTAS],
+            params[strings.PARAM_VARIABLE],
+            params[strings.PARAM_TARGET_ACCOUNT],
+            params[strings.PARAM_TARGET_AMOUNT],
+            params[strings.PARAM_TARGET_YEAR],
+            params[strings.PARAM_TARGET_AGE],
+            params[strings.PARAM_TOPUP_START],
+            params[strings.PARAM_MAX_EVALUATIONS],
+            params[strings.PARAM_MA_CAP])
+
+    elif endpoint == endpoints.CPF_CACHE_STATS:
+        results = cpf_cache.get_cache_stats()
 
     elif endpoint == endpoints.HOUSING_MAX_MORTGAGE:
         results = housing_main.calc_max_mortgage(